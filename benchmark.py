@@ -17,6 +17,18 @@ Each configuration is warmed up before timing (the first call to a given
 message/tweak length builds a small parameter cache), then every op is timed
 individually so we can report the median, min, and p95 latency alongside
 throughput. All results are validated with an encrypt/decrypt round-trip.
+
+The sweep includes long messages (n=64..512, where each round's CBC-MAC
+covers several blocks, and n up to 100,000, where the halves are kept as
+gmpy2.mpz) to track how latency scales with message length.
+
+Each configuration is also timed through the lockstep batch API
+(``encrypt_many``/``decrypt_many``) on one batch of --batch messages, and the
+batch throughput is reported next to the scalar loop. Pass --batch 0 to skip.
+
+Configurations inside FF3-1's domain (radix ** n >= 10 ** 6 and short enough
+for its 96-bit halves) are repeated with ``mode='ff3-1'`` and a random 7-byte
+tweak, and the "ff3-1" row shows its latency next to FFX-A2's.
 """
 
 import argparse
@@ -37,6 +49,27 @@ SWEEP_CONFIGS = [
     (16, 8, 16, "hex, 16-digit"),
     (36, 16, 16, "base36, 16-char"),
     (10, 10, 64, "decimal, 64-digit"),
+    (10, 10, 128, "decimal, 128-digit"),
+    (10, 10, 256, "decimal, 256-digit"),
+    (10, 10, 512, "decimal, 512-digit"),
+    (2, 8, 4096, "binary, 4096-bit"),
+    (10, 10, 10000, "decimal, 10k-digit"),
+    (10, 10, 100000, "decimal, 100k-digit"),
+]
+
+# Long configs get fewer iterations (at least LONG_MIN_ITERATIONS) so the
+# sweep stays quick; batch timing is skipped above BATCH_MAX_MESSAGESIZE.
+LONG_ITERATION_BUDGET = 2_000_000
+LONG_MIN_ITERATIONS = 20
+BATCH_MAX_MESSAGESIZE = 512
+
+# (radix, tweak size, message size) shapes interleaved by the mixed-batch row:
+# 15/16-digit cards, 5/9-digit ZIPs, tweaks of different lengths.
+MIXED_SHAPES = [
+    (10, 10, 16),
+    (10, 10, 15),
+    (10, 0, 5),
+    (10, 4, 9),
 ]
 
 
@@ -46,6 +79,21 @@ def _random_ffx(radix, size):
     return FFXInteger(value, radix=radix, blocksize=size)
 
 
+def _random_tweak(ffx_obj, radix, tweaksize):
+    """Random tweak: 7 bytes for FF3-1, else `tweaksize` radix digits (0 = none)."""
+    if ffx_obj.MODE == 'ff3-1':
+        return random.randbytes(7)
+    return _random_ffx(radix, tweaksize) if tweaksize > 0 else 0
+
+
+def _ff3_supports(radix, messagesize):
+    """Whether FF3-1 accepts `messagesize`-digit messages in `radix`."""
+    half = 0
+    while radix ** (half + 1) <= 2 ** 96:
+        half += 1
+    return radix ** messagesize >= 10 ** 6 and messagesize <= 2 * half
+
+
 def time_config(ffx_obj, radix, tweaksize, messagesize, iterations, warmup):
     """Time one configuration.
 
@@ -55,11 +103,7 @@ def time_config(ffx_obj, radix, tweaksize, messagesize, iterations, warmup):
     # Pre-generate inputs so timing excludes RNG / object construction.
     samples = []
     for _ in range(iterations):
-        if tweaksize > 0:
-            tweak = _random_ffx(radix, tweaksize)
-        else:
-            tweak = 0
-        samples.append((tweak, _random_ffx(radix, messagesize)))
+        samples.append((_random_tweak(ffx_obj, radix, tweaksize), _random_ffx(radix, messagesize)))
 
     # Warmup: build the per-length parameter cache and prime the interpreter.
     for tweak, msg in samples[: max(1, min(warmup, len(samples)))]:
@@ -95,16 +139,96 @@ def time_config(ffx_obj, radix, tweaksize, messagesize, iterations, warmup):
     return {"encrypt": stats(enc_times, enc_total), "decrypt": stats(dec_times, dec_total)}
 
 
+def time_batch(ffx_obj, radix, tweaksize, messagesize, batch):
+    """Time one configuration through encrypt_many/decrypt_many.
+
+    Returns encrypt/decrypt throughput (ops/sec) for a single batch of
+    `batch` messages sharing one tweak. Raises AssertionError if the batch
+    round-trip fails.
+    """
+    tweak = _random_tweak(ffx_obj, radix, tweaksize)
+    msgs = [_random_ffx(radix, messagesize) for _ in range(batch)]
+
+    # Warm the parameter cache outside the timed region.
+    ffx_obj.encrypt_many(tweak, msgs[:1])
+
+    start = time.perf_counter()
+    ciphers = ffx_obj.encrypt_many(tweak, msgs)
+    enc_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plains = ffx_obj.decrypt_many(tweak, ciphers)
+    dec_total = time.perf_counter() - start
+
+    assert plains == msgs, "batch round-trip failed"
+    return {
+        "encrypt_ops_per_sec": batch / enc_total if enc_total else float("inf"),
+        "decrypt_ops_per_sec": batch / dec_total if dec_total else float("inf"),
+    }
+
+
+def time_mixed(ffx_obj, radix, batch):
+    """Time a heterogeneous batch through BatchScheduler vs per-item encrypt.
+
+    Rows are drawn round-robin from MIXED_SHAPES. Returns throughput (ops/sec)
+    for both paths and the scheduler's per-bucket sizes.
+    """
+    pairs = []
+    for k in range(batch):
+        _, tweaksize, messagesize = MIXED_SHAPES[k % len(MIXED_SHAPES)]
+        tweak = _random_ffx(radix, tweaksize) if tweaksize > 0 else 0
+        pairs.append((tweak, _random_ffx(radix, messagesize)))
+
+    scheduler = ffx.BatchScheduler(ffx_obj)
+    scheduler.encrypt(pairs[:len(MIXED_SHAPES)])
+
+    start = time.perf_counter()
+    scalar = [ffx_obj.encrypt(tweak, msg) for tweak, msg in pairs]
+    scalar_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduled = scheduler.encrypt(pairs)
+    scheduled_total = time.perf_counter() - start
+
+    assert scheduled == scalar, "scheduled batch does not match per-item encrypt"
+    return {
+        "scalar_ops_per_sec": batch / scalar_total if scalar_total else float("inf"),
+        "scheduled_ops_per_sec": batch / scheduled_total if scheduled_total else float("inf"),
+        "buckets": scheduler.last_buckets,
+    }
+
+
 def _print_row(label, radix, tweaksize, messagesize, result):
     e, d = result["encrypt"], result["decrypt"]
     print(
-        f"{label:24s} r={radix:<2d} t={tweaksize:<3d} n={messagesize:<3d} | "
+        f"{label:24s} r={radix:<2d} t={tweaksize:<3d} n={messagesize:<6d} | "
         f"enc {e['median_us']:6.1f}us (min {e['min_us']:5.1f}, p95 {e['p95_us']:6.1f}) "
         f"{e['ops_per_sec']:8,.0f}/s | "
         f"dec {d['median_us']:6.1f}us {d['ops_per_sec']:8,.0f}/s"
     )
 
 
+def _print_batch_row(batch, scalar, result):
+    enc_speedup = result["encrypt_ops_per_sec"] / scalar["encrypt"]["ops_per_sec"]
+    dec_speedup = result["decrypt_ops_per_sec"] / scalar["decrypt"]["ops_per_sec"]
+    print(
+        f"{'  batch of ' + format(batch, ','):24s} {'':20s}| "
+        f"enc {result['encrypt_ops_per_sec']:10,.0f}/s ({enc_speedup:4.1f}x scalar) {'':13s} | "
+        f"dec {result['decrypt_ops_per_sec']:10,.0f}/s ({dec_speedup:4.1f}x)"
+    )
+
+
+def _print_mode_row(mode, ffx_result, result):
+    e, d = result["encrypt"], result["decrypt"]
+    speedup = ffx_result["encrypt"]["median_us"] / e["median_us"]
+    print(
+        f"{'  ' + mode:24s} {'':20s}| "
+        f"enc {e['median_us']:6.1f}us ({speedup:4.1f}x ffx-a2) {'':10s}"
+        f"{e['ops_per_sec']:8,.0f}/s | "
+        f"dec {d['median_us']:6.1f}us {d['ops_per_sec']:8,.0f}/s"
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Benchmark FFX encryption/decryption")
     parser.add_argument("--radix", type=int, help="Radix for FFX (2-36); single-config mode")
@@ -112,6 +236,7 @@ def main():
     parser.add_argument("--messagesize", type=int, help="Message size in radix digits; single-config mode")
     parser.add_argument("--iterations", type=int, default=5000, help="Timed iterations per config")
     parser.add_argument("--warmup", type=int, default=200, help="Warmup iterations per config")
+    parser.add_argument("--batch", type=int, default=10000, help="Batch size for encrypt_many (0 to skip)")
     parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducibility")
     args = parser.parse_args()
 
@@ -133,8 +258,30 @@ def main():
 
     for radix, tweaksize, messagesize, label in configs:
         ffx_obj = ffx.new(key.to_bytes(16), radix)
-        result = time_config(ffx_obj, radix, tweaksize, messagesize, args.iterations, args.warmup)
+        iterations = args.iterations
+        if not single:
+            iterations = min(iterations, max(LONG_MIN_ITERATIONS, LONG_ITERATION_BUDGET // messagesize))
+        warmup = min(args.warmup, iterations)
+        result = time_config(ffx_obj, radix, tweaksize, messagesize, iterations, warmup)
         _print_row(label, radix, tweaksize, messagesize, result)
+        if args.batch > 0 and (single or messagesize <= BATCH_MAX_MESSAGESIZE):
+            batch_result = time_batch(ffx_obj, radix, tweaksize, messagesize, args.batch)
+            _print_batch_row(args.batch, result, batch_result)
+        if _ff3_supports(radix, messagesize):
+            ff3_obj = ffx.new(key.to_bytes(16), radix, mode='ff3-1')
+            ff3_result = time_config(ff3_obj, radix, tweaksize, messagesize, iterations, warmup)
+            _print_mode_row('ff3-1', result, ff3_result)
+
+    if not single and args.batch > 0:
+        mixed = time_mixed(ffx.new(key.to_bytes(16), 10), 10, args.batch)
+        speedup = mixed["scheduled_ops_per_sec"] / mixed["scalar_ops_per_sec"]
+        buckets = ", ".join(f"n={n}/t={t}:{b.rows}" for (n, t), b in mixed["buckets"].items())
+        print("-" * 100)
+        print(
+            f"{'mixed batch of ' + format(args.batch, ','):24s} {'':20s}| "
+            f"per-item {mixed['scalar_ops_per_sec']:8,.0f}/s | "
+            f"scheduled {mixed['scheduled_ops_per_sec']:8,.0f}/s ({speedup:4.1f}x) | {buckets}"
+        )
 
 
 if __name__ == "__main__":
@@ -7,132 +7,130 @@ Encrypts bank account and routing numbers while preserving:
 - Common formatting (spaces, dashes)
 """
 
+import string
+from functools import lru_cache
+
 import ffx
 
 
-def encrypt_account_number(account: str, ffx_obj) -> str:
+ROUTING_FORMAT = 'DDDDDDDDD'
+
+# Digits become 'D' slots; every other character stays a literal (mask
+# letters are escaped so they are not slots).
+_SHAPE = str.maketrans({**dict.fromkeys(string.digits, 'D'), **{c: '\\' + c for c in 'DLlXxHh'}})
+
+
+@lru_cache(maxsize=None)
+def _format(key: bytes, mask: str):
+    return ffx.compile_format(mask, key)
+
+
+def encrypt_account_number(account: str, key: bytes) -> str:
     """Encrypt a bank account number.
     
+    The account's own layout becomes a format mask, compiled once per
+    layout, so spaces and dashes stay where they are.
+    
     Args:
         account: Account number (digits only or with formatting)
-        ffx_obj: FFX encrypter configured with radix=10
+        key: 16-byte AES key
     
     Returns:
-        Encrypted account number with same length
+        Encrypted account number with the same layout
     """
-    digits = ''.join(c for c in account if c.isdigit())
-    
-    if len(digits) < 4:
+    mask = account.translate(_SHAPE)
+    if mask.count('D') < 4:
         raise ValueError("Account number too short")
     
-    plain = ffx.FFXInteger(digits, radix=10, blocksize=len(digits))
-    encrypted = ffx_obj.encrypt(0, plain)
-    
-    return str(encrypted).zfill(len(digits))
+    return _format(key, mask).encrypt(0, account)
 
 
-def decrypt_account_number(encrypted: str, ffx_obj) -> str:
+def decrypt_account_number(encrypted: str, key: bytes) -> str:
     """Decrypt a bank account number."""
-    cipher = ffx.FFXInteger(encrypted, radix=10, blocksize=len(encrypted))
-    decrypted = ffx_obj.decrypt(0, cipher)
-    return str(decrypted).zfill(len(encrypted))
+    return _format(key, encrypted.translate(_SHAPE)).decrypt(0, encrypted)
 
 
-def encrypt_routing_number(routing: str, ffx_obj) -> str:
-    """Encrypt a 9-digit ABA routing number."""
-    digits = ''.join(c for c in routing if c.isdigit())
-    
-    if len(digits) != 9:
-        raise ValueError("Routing number must be 9 digits")
+def encrypt_routing_number(routing: str, key: bytes) -> str:
+    """Encrypt a 9-digit ABA routing number.
     
-    plain = ffx.FFXInteger(digits, radix=10, blocksize=9)
-    encrypted = ffx_obj.encrypt(0, plain)
-    
-    return str(encrypted).zfill(9)
+    Raises:
+        ValueError: If the routing number is not 9 digits
+    """
+    return _format(key, ROUTING_FORMAT).encrypt(0, routing)
 
 
-def decrypt_routing_number(encrypted: str, ffx_obj) -> str:
+def decrypt_routing_number(encrypted: str, key: bytes) -> str:
     """Decrypt a routing number."""
-    cipher = ffx.FFXInteger(encrypted, radix=10, blocksize=9)
-    decrypted = ffx_obj.decrypt(0, cipher)
-    return str(decrypted).zfill(9)
+    return _format(key, ROUTING_FORMAT).decrypt(0, encrypted)
+
+
+@lru_cache(maxsize=None)
+def _layout_encrypter(key: bytes, layout: str):
+    """Mixed-radix encrypter for one letter/digit layout, e.g. 'DDLLLLDDDD'."""
+    alphabets = [string.ascii_uppercase if c == 'L' else string.digits for c in layout]
+    return ffx.mixed_radix(key, alphabets)
+
+
+def _iban_encrypter(key: bytes, rest: str):
+    """Encrypter for the part of an IBAN after the country code."""
+    return _layout_encrypter(key, ''.join('L' if c.isalpha() else 'D' for c in rest))
 
 
-def encrypt_iban(iban: str, ffx_obj_alpha, ffx_obj_num) -> str:
+def encrypt_iban(iban: str, key: bytes) -> str:
     """Encrypt an IBAN (International Bank Account Number).
     
-    Preserves the country code (first 2 letters) and encrypts the rest.
+    Preserves the country code (first 2 letters) and encrypts the rest in
+    one FFX call: letters stay letters and digits stay digits.
     """
     clean = iban.upper().replace(' ', '')
     country = clean[:2]  # Preserve country code
     rest = clean[2:]
     
-    # Separate letters and digits
-    result = country
-    for char in rest:
-        if char.isdigit():
-            plain = ffx.FFXInteger(char, radix=10, blocksize=1)
-            enc = ffx_obj_num.encrypt(0, plain)
-            result += str(enc)
-        elif char.isalpha():
-            plain = ffx.FFXInteger(char.lower(), radix=36, blocksize=1)
-            enc = ffx_obj_alpha.encrypt(0, plain)
-            result += str(enc).upper()
+    result = country + _iban_encrypter(key, rest).encrypt(0, rest)
     
     # Format with spaces every 4 characters
     return ' '.join(result[i:i+4] for i in range(0, len(result), 4))
 
 
-def decrypt_iban(encrypted: str, ffx_obj_alpha, ffx_obj_num) -> str:
+def decrypt_iban(encrypted: str, key: bytes) -> str:
     """Decrypt an IBAN."""
     clean = encrypted.upper().replace(' ', '')
     country = clean[:2]
     rest = clean[2:]
     
-    result = country
-    for char in rest:
-        if char.isdigit():
-            cipher = ffx.FFXInteger(char, radix=10, blocksize=1)
-            dec = ffx_obj_num.decrypt(0, cipher)
-            result += str(dec)
-        elif char.isalpha():
-            cipher = ffx.FFXInteger(char.lower(), radix=36, blocksize=1)
-            dec = ffx_obj_alpha.decrypt(0, cipher)
-            result += str(dec).upper()
+    result = country + _iban_encrypter(key, rest).decrypt(0, rest)
     
     return ' '.join(result[i:i+4] for i in range(0, len(result), 4))
 
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_num = ffx.new(key.to_bytes(16), radix=10)
-    ffx_alpha = ffx.new(key.to_bytes(16), radix=36)
     
     print("Bank Account Format-Preserving Encryption")
     print("=" * 60)
     
     # Account numbers
-    accounts = ["1234567890", "9876543210123", "00001111222233"]
+    accounts = ["1234567890", "9876-5432-10123", "0000 1111 2222 33"]
     print("\n--- Account Numbers ---")
     for acct in accounts:
-        encrypted = encrypt_account_number(acct, ffx_num)
-        decrypted = decrypt_account_number(encrypted, ffx_num)
+        encrypted = encrypt_account_number(acct, key.to_bytes(16))
+        decrypted = decrypt_account_number(encrypted, key.to_bytes(16))
         print(f"Original: {acct:20} → Encrypted: {encrypted:20} → Verified: {'✓' if acct == decrypted else '✗'}")
     
     # Routing numbers
     routings = ["021000021", "121042882", "322271627"]
     print("\n--- Routing Numbers ---")
     for routing in routings:
-        encrypted = encrypt_routing_number(routing, ffx_num)
-        decrypted = decrypt_routing_number(encrypted, ffx_num)
+        encrypted = encrypt_routing_number(routing, key.to_bytes(16))
+        decrypted = decrypt_routing_number(encrypted, key.to_bytes(16))
         print(f"Original: {routing} → Encrypted: {encrypted} → Verified: {'✓' if routing == decrypted else '✗'}")
     
     # IBANs
     ibans = ["DE89 3704 0044 0532 0130 00", "GB82 WEST 1234 5698 7654 32"]
     print("\n--- IBANs ---")
     for iban in ibans:
-        encrypted = encrypt_iban(iban, ffx_alpha, ffx_num)
-        decrypted = decrypt_iban(encrypted, ffx_alpha, ffx_num)
+        encrypted = encrypt_iban(iban, key.to_bytes(16))
+        decrypted = decrypt_iban(encrypted, key.to_bytes(16))
         print(f"Original:  {iban}")
         print(f"Encrypted: {encrypted}")
         print(f"Verified:  {'✓' if iban == decrypted else '✗'}")
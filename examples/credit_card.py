@@ -1,58 +1,62 @@
 #!/usr/bin/env python3
 """Example: Format-preserving encryption of credit card numbers.
 
-Encrypts 16-digit credit card numbers while preserving:
-- The format (groups of 4 digits)
-- The length (16 digits)
+Encrypts 13- to 19-digit credit card numbers while preserving:
+- The layout (digit groups and separators)
+- The length
 - Numeric-only output
 """
 
+import string
+from functools import lru_cache
+
 import ffx
 
 
-def encrypt_credit_card(card_number: str, ffx_obj) -> str:
+# Digits become 'D' slots; every other character stays a literal (mask
+# letters are escaped so that, e.g., an 'x' extension marker is not a slot).
+_SHAPE = str.maketrans({**dict.fromkeys(string.digits, 'D'), **{c: '\\' + c for c in 'DLlXxHh'}})
+
+
+@lru_cache(maxsize=None)
+def _card_format(key: bytes, mask: str):
+    return ffx.compile_format(mask, key)
+
+
+def encrypt_credit_card(card_number: str, key: bytes) -> str:
     """Encrypt a credit card number, preserving format.
     
+    The card's own layout (e.g. 4-4-4-4 or Amex 4-6-5) becomes a format
+    mask, compiled once per layout; the digits are encrypted as one message
+    and the separators are kept.
+    
     Args:
         card_number: Card number (13-19 digits, with or without dashes/spaces)
-        ffx_obj: FFX encrypter configured with radix=10
+        key: 16-byte AES key
     
     Returns:
-        Encrypted card number with same length
+        Encrypted card number with the same layout
     """
-    # Remove formatting, keep only digits
-    digits = ''.join(c for c in card_number if c.isdigit())
-    
-    if len(digits) < 13 or len(digits) > 19:
-        raise ValueError(f"Credit card must be 13-19 digits, got {len(digits)}")
-    
-    plain = ffx.FFXInteger(digits, radix=10, blocksize=len(digits))
-    encrypted = ffx_obj.encrypt(0, plain)
+    mask = card_number.translate(_SHAPE)
+    digits = mask.count('D')
+    if digits < 13 or digits > 19:
+        raise ValueError(f"Credit card must be 13-19 digits, got {digits}")
     
-    # Return with standard formatting (groups of 4)
-    result = str(encrypted).zfill(len(digits))
-    return '-'.join(result[i:i+4] for i in range(0, len(result), 4))
+    return _card_format(key, mask).encrypt(0, card_number)
 
 
-def decrypt_credit_card(encrypted_card: str, ffx_obj) -> str:
+def decrypt_credit_card(encrypted_card: str, key: bytes) -> str:
     """Decrypt a credit card number."""
-    digits = ''.join(c for c in encrypted_card if c.isdigit())
-    
-    cipher = ffx.FFXInteger(digits, radix=10, blocksize=len(digits))
-    decrypted = ffx_obj.decrypt(0, cipher)
-    
-    result = str(decrypted).zfill(len(digits))
-    return '-'.join(result[i:i+4] for i in range(0, len(result), 4))
+    return _card_format(key, encrypted_card.translate(_SHAPE)).decrypt(0, encrypted_card)
 
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_obj = ffx.new(key.to_bytes(16), radix=10)
     
     cards = [
         "4111-1111-1111-1111",  # Test Visa
         "5500-0000-0000-0004",  # Test Mastercard
-        "3400-000000-00009",    # Test Amex (will be reformatted)
+        "3400-000000-00009",    # Test Amex (4-6-5 layout kept)
         "6011-0000-0000-0004",  # Test Discover
     ]
     
@@ -60,15 +64,13 @@ def main():
     print("=" * 50)
     
     for card in cards:
-        encrypted = encrypt_credit_card(card, ffx_obj)
-        decrypted = decrypt_credit_card(encrypted, ffx_obj)
-        original_digits = ''.join(c for c in card if c.isdigit())
-        decrypted_digits = ''.join(c for c in decrypted if c.isdigit())
+        encrypted = encrypt_credit_card(card, key.to_bytes(16))
+        decrypted = decrypt_credit_card(encrypted, key.to_bytes(16))
         
         print(f"\nOriginal:  {card}")
         print(f"Encrypted: {encrypted}")
         print(f"Decrypted: {decrypted}")
-        print(f"Verified:  {'✓' if original_digits == decrypted_digits else '✗'}")
+        print(f"Verified:  {'✓' if card == decrypted else '✗'}")
 
 
 if __name__ == "__main__":
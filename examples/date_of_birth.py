@@ -3,62 +3,59 @@
 
 Encrypts dates while preserving:
 - The format (YYYY-MM-DD, MM/DD/YYYY, etc.)
-- Valid-looking date structure
-- Numeric content
+- Calendar validity: every encrypted date is a real date
+- The supported range (1900-01-01 to 2099-12-31)
 
-Note: Encrypted dates may not be calendar-valid dates, but will
-have the same format and numeric structure.
+The date is converted to its day number within the range and encrypted
+with an integer domain of exactly that many values, which cycle-walks
+results that fall past the last day back into the range.
 """
 
-import re
+from datetime import date, datetime, timedelta
 
 import ffx
 
 
-def encrypt_date(date: str, ffx_obj) -> str:
-    """Encrypt a date, preserving format.
+FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y']
+
+FIRST_DAY = date(1900, 1, 1)
+DAYS = (date(2100, 1, 1) - FIRST_DAY).days
+
+
+def _parse(text: str) -> tuple[date, str]:
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date(), fmt
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognized date: {text}")
+
+
+def encrypt_date(text: str, days) -> str:
+    """Encrypt a date, preserving format and calendar validity.
     
     Args:
-        date: Date string in any format (YYYY-MM-DD, MM/DD/YYYY, etc.)
-        ffx_obj: FFX encrypter configured with radix=10
+        text: Date string in one of FORMATS
+        days: Integer domain of size DAYS (see ffx.domain)
     
     Returns:
-        Encrypted date with same format
+        Encrypted date in the same format
     """
-    # Split into digit groups and separators
-    parts = re.split(r'(\d+)', date)
-    
-    result = []
-    for part in parts:
-        if part.isdigit():
-            plain = ffx.FFXInteger(part, radix=10, blocksize=len(part))
-            encrypted = ffx_obj.encrypt(0, plain)
-            result.append(str(encrypted).zfill(len(part)))
-        else:
-            result.append(part)
-    
-    return ''.join(result)
+    day, fmt = _parse(text)
+    encrypted = days.encrypt(0, (day - FIRST_DAY).days)
+    return (FIRST_DAY + timedelta(days=encrypted)).strftime(fmt)
 
 
-def decrypt_date(encrypted_date: str, ffx_obj) -> str:
+def decrypt_date(text: str, days) -> str:
     """Decrypt a date."""
-    parts = re.split(r'(\d+)', encrypted_date)
-    
-    result = []
-    for part in parts:
-        if part.isdigit():
-            cipher = ffx.FFXInteger(part, radix=10, blocksize=len(part))
-            decrypted = ffx_obj.decrypt(0, cipher)
-            result.append(str(decrypted).zfill(len(part)))
-        else:
-            result.append(part)
-    
-    return ''.join(result)
+    day, fmt = _parse(text)
+    decrypted = days.decrypt(0, (day - FIRST_DAY).days)
+    return (FIRST_DAY + timedelta(days=decrypted)).strftime(fmt)
 
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_obj = ffx.new(key.to_bytes(16), radix=10)
+    days = ffx.domain(key.to_bytes(16), DAYS)
     
     dates = [
         "1990-05-15",      # ISO format
@@ -71,14 +68,18 @@ def main():
     print("Date Format-Preserving Encryption")
     print("=" * 50)
     
-    for date in dates:
-        encrypted = encrypt_date(date, ffx_obj)
-        decrypted = decrypt_date(encrypted, ffx_obj)
+    for text in dates:
+        encrypted = encrypt_date(text, days)
+        decrypted = decrypt_date(encrypted, days)
         
-        print(f"\nOriginal:  {date}")
+        print(f"\nOriginal:  {text}")
         print(f"Encrypted: {encrypted}")
         print(f"Decrypted: {decrypted}")
-        print(f"Verified:  {'✓' if date == decrypted else '✗'}")
+        print(f"Verified:  {'✓' if text == decrypted else '✗'}")
+    
+    stats = days.stats()
+    print(f"\nCycle-walking: {stats.walks} extra cipher calls for {stats.calls} dates "
+          f"(expected at most {stats.expected_walks:.3f} per date)")
 
 
 if __name__ == "__main__":
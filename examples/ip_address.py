@@ -7,50 +7,30 @@ Encrypts IP addresses while preserving:
 - Dot/colon separators
 """
 
+import ipaddress
+
 import ffx
 
 
-def encrypt_ipv4(ip: str, ffx_obj) -> str:
+def encrypt_ipv4(ip: str, addresses) -> str:
     """Encrypt an IPv4 address, preserving format.
     
-    Each octet is encrypted separately to maintain valid-looking output.
-    Note: Encrypted octets may exceed 255.
+    The address is encrypted as one 32-bit integer, so every encrypted
+    address is a valid IPv4 address (all octets 0-255).
     
     Args:
         ip: IPv4 address (e.g., "192.168.1.1")
-        ffx_obj: FFX encrypter configured with radix=10
+        addresses: Integer domain of size 2**32 (see ffx.domain)
     
     Returns:
-        Encrypted IPv4-like address
+        Encrypted IPv4 address
     """
-    octets = ip.split('.')
-    if len(octets) != 4:
-        raise ValueError("Invalid IPv4 address")
-    
-    encrypted_octets = []
-    for octet in octets:
-        # Pad to 3 digits for consistent encryption
-        padded = octet.zfill(3)
-        plain = ffx.FFXInteger(padded, radix=10, blocksize=3)
-        encrypted = ffx_obj.encrypt(0, plain)
-        # Keep as 3 digits, strip leading zeros for display
-        encrypted_octets.append(str(int(str(encrypted).zfill(3))))
-    
-    return '.'.join(encrypted_octets)
+    return str(ipaddress.IPv4Address(addresses.encrypt(0, int(ipaddress.IPv4Address(ip)))))
 
 
-def decrypt_ipv4(encrypted_ip: str, ffx_obj) -> str:
+def decrypt_ipv4(encrypted_ip: str, addresses) -> str:
     """Decrypt an IPv4 address."""
-    octets = encrypted_ip.split('.')
-    
-    decrypted_octets = []
-    for octet in octets:
-        padded = octet.zfill(3)
-        cipher = ffx.FFXInteger(padded, radix=10, blocksize=3)
-        decrypted = ffx_obj.decrypt(0, cipher)
-        decrypted_octets.append(str(int(str(decrypted).zfill(3))))
-    
-    return '.'.join(decrypted_octets)
+    return str(ipaddress.IPv4Address(addresses.decrypt(0, int(ipaddress.IPv4Address(encrypted_ip)))))
 
 
 def encrypt_ipv6(ip: str, ffx_obj) -> str:
@@ -100,7 +80,7 @@ def decrypt_ipv6(encrypted_ip: str, ffx_obj) -> str:
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_decimal = ffx.new(key.to_bytes(16), radix=10)
+    ipv4_space = ffx.domain(key.to_bytes(16), 2 ** 32)
     ffx_hex = ffx.new(key.to_bytes(16), radix=16)
     
     print("IP Address Format-Preserving Encryption")
@@ -110,8 +90,8 @@ def main():
     ipv4_addrs = ["192.168.1.1", "10.0.0.1", "172.16.254.1", "8.8.8.8"]
     print("\n--- IPv4 Addresses ---")
     for ip in ipv4_addrs:
-        encrypted = encrypt_ipv4(ip, ffx_decimal)
-        decrypted = decrypt_ipv4(encrypted, ffx_decimal)
+        encrypted = encrypt_ipv4(ip, ipv4_space)
+        decrypted = decrypt_ipv4(encrypted, ipv4_space)
         print(f"Original: {ip:15} → Encrypted: {encrypted:15} → Verified: {'✓' if ip == decrypted else '✗'}")
     
     # IPv6 addresses
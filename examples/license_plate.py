@@ -2,56 +2,56 @@
 """Example: Format-preserving encryption of license plate numbers.
 
 Encrypts license plates while preserving:
-- Alphanumeric format
+- Alphanumeric format: letters stay letters and digits stay digits
 - Length and structure
 - Regional formatting (US, EU, etc.)
 """
 
 import re
+import string
+from functools import lru_cache
 
 import ffx
 
 
-def encrypt_license_plate(plate: str, ffx_obj) -> str:
+@lru_cache(maxsize=None)
+def _plate_encrypter(key: bytes, pattern: str):
+    """Mixed-radix encrypter for one letter/digit pattern, e.g. 'DLLLDDD'."""
+    alphabets = [string.ascii_uppercase if p == 'L' else string.digits for p in pattern]
+    return ffx.mixed_radix(key, alphabets)
+
+
+def _convert(plate: str, key: bytes, decrypt: bool) -> str:
+    plate = plate.upper()
+    chars = [c for c in plate if c.isalnum()]
+    pattern = ''.join('L' if c.isalpha() else 'D' for c in chars)
+    encrypter = _plate_encrypter(key, pattern)
+    run = encrypter.decrypt if decrypt else encrypter.encrypt
+    result = iter(run(0, ''.join(chars)))
+    # Put the separators back where they were.
+    return ''.join(next(result) if c.isalnum() else c for c in plate)
+
+
+def encrypt_license_plate(plate: str, key: bytes) -> str:
     """Encrypt a license plate, preserving format.
     
-    Encrypts alphanumeric characters separately to maintain format.
-    Spaces and dashes are preserved.
+    All letters and digits are encrypted together in one FFX call over the
+    plate's mixed-radix domain (26 values per letter position, 10 per digit
+    position). Spaces and dashes are preserved.
     
     Args:
         plate: License plate string
-        ffx_obj: FFX encrypter configured with radix=36
+        key: 16-byte AES key
     
     Returns:
         Encrypted license plate
     """
-    result = []
-    
-    for char in plate.upper():
-        if char.isalnum():
-            plain = ffx.FFXInteger(char.lower(), radix=36, blocksize=1)
-            encrypted = ffx_obj.encrypt(0, plain)
-            result.append(str(encrypted).upper())
-        else:
-            # Preserve spaces, dashes, etc.
-            result.append(char)
-    
-    return ''.join(result)
+    return _convert(plate, key, False)
 
 
-def decrypt_license_plate(encrypted_plate: str, ffx_obj) -> str:
+def decrypt_license_plate(encrypted_plate: str, key: bytes) -> str:
     """Decrypt a license plate."""
-    result = []
-    
-    for char in encrypted_plate.upper():
-        if char.isalnum():
-            cipher = ffx.FFXInteger(char.lower(), radix=36, blocksize=1)
-            decrypted = ffx_obj.decrypt(0, cipher)
-            result.append(str(decrypted).upper())
-        else:
-            result.append(char)
-    
-    return ''.join(result)
+    return _convert(encrypted_plate, key, True)
 
 
 def encrypt_plate_segments(plate: str, ffx_obj) -> str:
@@ -106,13 +106,13 @@ def main():
         "AA-123-AA",      # French style
     ]
     
-    print("\n--- Character-by-character encryption ---")
+    print("\n--- Mixed-radix encryption (one FFX call per plate) ---")
     for plate in plates:
-        encrypted = encrypt_license_plate(plate, ffx_obj)
-        decrypted = decrypt_license_plate(encrypted, ffx_obj)
+        encrypted = encrypt_license_plate(plate, key.to_bytes(16))
+        decrypted = decrypt_license_plate(encrypted, key.to_bytes(16))
         print(f"Original: {plate:12} → Encrypted: {encrypted:12} → Verified: {'✓' if plate.upper() == decrypted else '✗'}")
     
-    print("\n--- Segment-based encryption (more secure) ---")
+    print("\n--- Segment-based encryption (radix 36 per segment) ---")
     for plate in plates:
         encrypted = encrypt_plate_segments(plate, ffx_obj)
         decrypted = decrypt_plate_segments(encrypted, ffx_obj)
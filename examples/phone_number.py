@@ -7,70 +7,60 @@ Encrypts phone numbers while preserving:
 - Country code (optionally preserved or encrypted)
 """
 
-import re
+import string
+from functools import lru_cache
 
 import ffx
 
 
-def encrypt_phone(phone: str, ffx_obj, preserve_country_code: bool = True) -> str:
+# Digits become 'D' slots; every other character stays a literal (mask
+# letters are escaped so that, e.g., an 'x' extension marker is not a slot).
+_SHAPE = str.maketrans({**dict.fromkeys(string.digits, 'D'), **{c: '\\' + c for c in 'DLlXxHh'}})
+
+
+@lru_cache(maxsize=None)
+def _phone_format(key: bytes, mask: str):
+    return ffx.compile_format(mask, key)
+
+
+def _mask(phone: str, preserve_country_code: bool) -> str:
+    """The phone number's format mask, compiled once per distinct mask."""
+    mask = phone.translate(_SHAPE)
+    if preserve_country_code and phone.startswith('+'):
+        # Keep a 1- or 2-digit country code as literal digits.
+        end = 1
+        while end < len(phone) and phone[end].isdigit():
+            end += 1
+        if end <= 3:
+            mask = phone[:end] + mask[end:]
+    return mask
+
+
+def encrypt_phone(phone: str, key: bytes, preserve_country_code: bool = True) -> str:
     """Encrypt a phone number, preserving format.
     
+    All digits (after the country code, if it is kept) are encrypted as
+    one message; parentheses, dashes and spaces stay where they are.
+    
     Args:
         phone: Phone number in any format
-        ffx_obj: FFX encrypter configured with radix=10
+        key: 16-byte AES key
         preserve_country_code: If True, keeps +1, +44, etc unchanged
     
     Returns:
         Encrypted phone number with same format
     """
-    # Find all digit sequences and their positions
-    parts = re.split(r'(\d+)', phone)
-    
-    result = []
-    first_digits = True
-    
-    for part in parts:
-        if part.isdigit():
-            if first_digits and preserve_country_code and len(part) <= 2:
-                # Preserve short country codes
-                result.append(part)
-            else:
-                # Encrypt digit sequences
-                plain = ffx.FFXInteger(part, radix=10, blocksize=len(part))
-                encrypted = ffx_obj.encrypt(0, plain)
-                result.append(str(encrypted).zfill(len(part)))
-            first_digits = False
-        else:
-            result.append(part)
-    
-    return ''.join(result)
+    return _phone_format(key, _mask(phone, preserve_country_code)).encrypt(0, phone)
 
 
-def decrypt_phone(encrypted_phone: str, ffx_obj, preserve_country_code: bool = True) -> str:
+def decrypt_phone(encrypted_phone: str, key: bytes, preserve_country_code: bool = True) -> str:
     """Decrypt a phone number."""
-    parts = re.split(r'(\d+)', encrypted_phone)
-    
-    result = []
-    first_digits = True
-    
-    for part in parts:
-        if part.isdigit():
-            if first_digits and preserve_country_code and len(part) <= 2:
-                result.append(part)
-            else:
-                cipher = ffx.FFXInteger(part, radix=10, blocksize=len(part))
-                decrypted = ffx_obj.decrypt(0, cipher)
-                result.append(str(decrypted).zfill(len(part)))
-            first_digits = False
-        else:
-            result.append(part)
-    
-    return ''.join(result)
+    mask = _mask(encrypted_phone, preserve_country_code)
+    return _phone_format(key, mask).decrypt(0, encrypted_phone)
 
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_obj = ffx.new(key.to_bytes(16), radix=10)
     
     phones = [
         "(555) 123-4567",
@@ -84,8 +74,8 @@ def main():
     print("=" * 50)
     
     for phone in phones:
-        encrypted = encrypt_phone(phone, ffx_obj)
-        decrypted = decrypt_phone(encrypted, ffx_obj)
+        encrypted = encrypt_phone(phone, key.to_bytes(16))
+        decrypted = decrypt_phone(encrypted, key.to_bytes(16))
         
         print(f"\nOriginal:  {phone}")
         print(f"Encrypted: {encrypted}")
@@ -10,42 +10,33 @@ Encrypts SSNs while preserving:
 import ffx
 
 
-def encrypt_ssn(ssn: str, ffx_obj) -> str:
+SSN_FORMAT = 'DDD-DD-DDDD'
+
+
+def encrypt_ssn(ssn: str, ssn_format) -> str:
     """Encrypt a Social Security Number, preserving format.
     
     Args:
-        ssn: SSN in XXX-XX-XXXX format (dashes optional)
-        ffx_obj: FFX encrypter configured with radix=10
+        ssn: SSN in XXX-XX-XXXX format
+        ssn_format: ffx.compile_format(SSN_FORMAT, key)
     
     Returns:
         Encrypted SSN in XXX-XX-XXXX format
-    """
-    digits = ''.join(c for c in ssn if c.isdigit())
-    
-    if len(digits) != 9:
-        raise ValueError(f"SSN must be 9 digits, got {len(digits)}")
-    
-    plain = ffx.FFXInteger(digits, radix=10, blocksize=9)
-    encrypted = ffx_obj.encrypt(0, plain)
     
-    result = str(encrypted).zfill(9)
-    return f"{result[0:3]}-{result[3:5]}-{result[5:9]}"
+    Raises:
+        ValueError: If the SSN does not match the format
+    """
+    return ssn_format.encrypt(0, ssn)
 
 
-def decrypt_ssn(encrypted_ssn: str, ffx_obj) -> str:
+def decrypt_ssn(encrypted_ssn: str, ssn_format) -> str:
     """Decrypt a Social Security Number."""
-    digits = ''.join(c for c in encrypted_ssn if c.isdigit())
-    
-    cipher = ffx.FFXInteger(digits, radix=10, blocksize=9)
-    decrypted = ffx_obj.decrypt(0, cipher)
-    
-    result = str(decrypted).zfill(9)
-    return f"{result[0:3]}-{result[3:5]}-{result[5:9]}"
+    return ssn_format.decrypt(0, encrypted_ssn)
 
 
 def main():
     key = ffx.FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
-    ffx_obj = ffx.new(key.to_bytes(16), radix=10)
+    ssn_format = ffx.compile_format(SSN_FORMAT, key.to_bytes(16))
     
     ssns = [
         "123-45-6789",
@@ -58,13 +49,17 @@ def main():
     print("=" * 50)
     
     for ssn in ssns:
-        encrypted = encrypt_ssn(ssn, ffx_obj)
-        decrypted = decrypt_ssn(encrypted, ffx_obj)
+        encrypted = encrypt_ssn(ssn, ssn_format)
+        decrypted = decrypt_ssn(encrypted, ssn_format)
         
         print(f"\nOriginal:  {ssn}")
         print(f"Encrypted: {encrypted}")
         print(f"Decrypted: {decrypted}")
         print(f"Verified:  {'✓' if ssn == decrypted else '✗'}")
+    
+    # Whole files of SSNs go through the batch rounds in one call.
+    encrypted = ssn_format.encrypt_many(0, ssns)
+    assert ssn_format.decrypt_many(0, encrypted) == ssns
 
 
 if __name__ == "__main__":
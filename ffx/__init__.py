@@ -19,22 +19,58 @@ Example:
     True
 """
 
+from typing import Optional, Sequence, Union
+
 from .exceptions import (
     FFXException,
     InvalidRadixException,
     UnknownTypeException,
 )
 from .integer import FFXInteger
-from .encrypter import FFXEncrypter
+from .base import BaseEncrypter
+from .encrypter import FFXEncrypter, Tweak, TweakLike
+from .ff3 import FF3Encrypter
+from .power_of_two import POWER_OF_TWO_RADICES, PowerOfTwoEncrypter
+from .shape import ShapeEncrypter
+from .domain import MAX_EXPECTED_WALKS, IntegerDomain, WalkStats, covering_length, covering_radix
+from .mixed_radix import MixedRadix, MixedRadixEncrypter
+from .formats import CompiledFormat, slot_alphabets
+from .batch import BatchScheduler, BucketStats
+from .cache import CacheStats
+from .calibration import Profile, calibrate
+from .planner import Plan
+from .tables import Codebook, RoundTable
 from .utils import long_to_bytes, bytes_to_long
 
 
 __all__ = [
     # Factory function
     'new',
+    'domain',
+    'mixed_radix',
+    'compile_format',
+    'calibrate',
     # Classes
     'FFXInteger',
+    'BaseEncrypter',
     'FFXEncrypter',
+    'FF3Encrypter',
+    'Tweak',
+    'TweakLike',
+    'PowerOfTwoEncrypter',
+    'ShapeEncrypter',
+    'IntegerDomain',
+    'WalkStats',
+    'MixedRadix',
+    'MixedRadixEncrypter',
+    'CompiledFormat',
+    'BatchScheduler',
+    'BucketStats',
+    'CacheStats',
+    'Plan',
+    'Profile',
+    'Codebook',
+    'RoundTable',
     # Exceptions
     'FFXException',
     'InvalidRadixException',
@@ -47,24 +83,207 @@ __all__ = [
 __version__ = '1.1.0'
 
 
-def new(key: bytes, radix: int) -> FFXEncrypter:
+def new(
+    key: bytes,
+    radix: int,
+    length: Optional[int] = None,
+    tweak_length: Optional[int] = None,
+    mode: str = 'ffx-a2',
+    **options,
+) -> Union[BaseEncrypter, ShapeEncrypter]:
     """Create a new FFX encrypter with the given key and radix.
     
-    This is the main entry point for creating an FFX encrypter.
+    This is the main entry point for creating an FFX encrypter. For radix 2,
+    4, 8, 16 and 32 it returns a PowerOfTwoEncrypter, which produces the same
+    results using shifts and masks and also accepts raw integers and bytes.
+
+    Passing ``length`` (and ``tweak_length`` if tweaks are used) returns a
+    ShapeEncrypter compiled for that one shape, which skips the per-call
+    shape lookups and branches of the general encrypter.
+
+    ``mode='ff3-1'`` returns an FF3Encrypter instead: NIST SP 800-38G FF3-1,
+    with 8 rounds of one AES call each and 7-byte tweaks.
     
     Args:
         key: 16-byte AES-128 key
         radix: Base for the message alphabet (2-36)
+        length: Fix the message length, in radix digits, and return a
+            ShapeEncrypter for it
+        tweak_length: Tweak length for ``length`` (default 0, no tweak)
+        mode: ``'ffx-a2'`` (default) or ``'ff3-1'``
+        **options: Keyword options forwarded to FFXEncrypter (e.g.
+            ``codebook_threshold``) or FF3Encrypter
     
     Returns:
-        FFXEncrypter instance ready for encryption/decryption
+        FFXEncrypter (or FF3Encrypter) instance ready for
+        encryption/decryption, or a ShapeEncrypter if ``length`` was given
     
     Raises:
         InvalidRadixException: If radix is not in range 2-36
+        ValueError: If ``mode`` is unknown, or ``length`` is given with FF3-1
     
     Example:
         >>> import ffx
         >>> key = bytes.fromhex('2b7e151628aed2a6abf7158809cf4f3c')
         >>> encrypter = ffx.new(key, radix=10)
     """
-    return FFXEncrypter(key, radix)
+    encrypter = _encrypter(key, radix, mode, options)
+    if length is not None:
+        if not isinstance(encrypter, FFXEncrypter):
+            raise ValueError(f"ShapeEncrypter needs an FFX-A2 encrypter, got {encrypter.MODE}")
+        return ShapeEncrypter(encrypter, length, tweak_length or 0)
+    if tweak_length is not None:
+        raise ValueError("tweak_length requires length")
+    return encrypter
+
+
+def _encrypter(key: bytes, radix: int, mode: str, options: dict) -> BaseEncrypter:
+    """The general encrypter for ``mode`` (see :func:`new`)."""
+    if mode == 'ff3-1':
+        return FF3Encrypter(key, radix, **options)
+    if mode != 'ffx-a2':
+        raise ValueError(f"Unknown mode {mode!r}; choose 'ffx-a2' or 'ff3-1'")
+    if radix in POWER_OF_TWO_RADICES:
+        return PowerOfTwoEncrypter(key, radix, **options)
+    return FFXEncrypter(key, radix, **options)
+
+
+def domain(
+    key: bytes,
+    size: int,
+    radix: Optional[int] = None,
+    mode: str = 'ffx-a2',
+    max_expected_walks: Optional[float] = MAX_EXPECTED_WALKS,
+    **options,
+) -> IntegerDomain:
+    """Create an encrypter for the integers in ``[0, size)``, for any size.
+
+    Runs FFX on the smallest ``radix ** n >= size`` and cycle-walks results
+    that fall outside the range back into it (see :class:`IntegerDomain`).
+    Without ``radix``, the radix from 2 to 36 with the tightest covering
+    domain is chosen, which keeps the expected walk count as low as it goes.
+
+    The cover is never below two digits, nor below the mode's minimum
+    domain (``10 ** 6`` for FF3-1), so a small range can cost many cipher
+    calls per value: ``size=256`` in FF3-1 walks about 3900 times. Such a
+    domain is refused unless ``max_expected_walks`` allows it.
+
+    Args:
+        key: AES key (as for :func:`new`)
+        size: Number of values in the domain
+        radix: Radix of the covering domain (default: the tightest)
+        mode: ``'ffx-a2'`` (default) or ``'ff3-1'``
+        max_expected_walks: Largest accepted average number of extra cipher
+            calls per value (see :attr:`WalkStats.expected_walks`), or
+            ``None`` for no limit
+        **options: Keyword options forwarded to the encrypter
+
+    Returns:
+        IntegerDomain instance
+
+    Raises:
+        ValueError: If ``size`` is less than 1, ``mode`` is unknown, or the
+            cover would need more than ``max_expected_walks`` walks per value
+
+    Example:
+        >>> days = ffx.domain(key, 73049)   # 1900-01-01 .. 2099-12-31
+        >>> days.radix, days.length
+        (5, 7)
+    """
+    if size < 1:
+        raise ValueError(f"Domain size must be at least 1, got {size}")
+    min_domain = FF3Encrypter.MIN_DOMAIN if mode == 'ff3-1' else 1
+    if radix is None:
+        radix = covering_radix(size, min_domain)
+    if max_expected_walks is not None:
+        walks = radix ** covering_length(radix, size, min_domain) / size - 1
+        if walks > max_expected_walks:
+            raise ValueError(
+                f"A {mode} domain of {size} values in radix {radix} needs {walks:.1f} "
+                f"extra cipher calls per value on average (limit {max_expected_walks}); "
+                f"pass max_expected_walks=None to allow it"
+            )
+    return IntegerDomain(_encrypter(key, radix, mode, options), size)
+
+
+def mixed_radix(
+    key: bytes,
+    alphabets: Sequence[str],
+    radix: Optional[int] = None,
+    mode: str = 'ffx-a2',
+    **options,
+) -> MixedRadixEncrypter:
+    """Create an encrypter for records whose positions use different alphabets.
+
+    The whole record is ranked into one integer, encrypted once in a
+    :func:`domain` of exactly as many values as there are records, and
+    unranked (see :class:`MixedRadixEncrypter`).
+
+    Args:
+        key: AES key (as for :func:`new`)
+        alphabets: One string of allowed characters per position
+        radix: Radix of the covering domain (default: the tightest)
+        mode: ``'ffx-a2'`` (default) or ``'ff3-1'``
+        **options: Keyword options forwarded to the encrypter
+
+    Returns:
+        MixedRadixEncrypter instance
+
+    Raises:
+        ValueError: If an alphabet is empty or repeats a character
+
+    Example:
+        >>> import string
+        >>> plates = ffx.mixed_radix(key, [string.ascii_uppercase] * 2 + [string.digits] * 3)
+        >>> len(plates.encrypt(0, 'AB123'))
+        5
+    """
+    codec = MixedRadix(alphabets)
+    return MixedRadixEncrypter(domain(key, codec.size, radix, mode, **options), codec)
+
+
+def compile_format(
+    mask: str,
+    key: bytes,
+    mode: str = 'ffx-a2',
+    **options,
+) -> CompiledFormat:
+    """Compile a format mask such as ``'DDD-DD-DDDD'`` into an encrypter.
+
+    Slot characters (``D`` digit, ``L``/``l`` upper/lower-case letter,
+    ``X``/``x`` letter or digit, ``H``/``h`` hex digit) are encrypted
+    together; everything else is a literal kept in place (escape a slot
+    character with a backslash to make it literal). Separator positions are
+    worked out once, here, not per call (see :class:`CompiledFormat`).
+
+    A mask with a single slot is encrypted in a cycle-walking :func:`domain`
+    of its alphabet's size, since a one-digit Feistel network only adds a
+    per-tweak constant.
+
+    Args:
+        mask: The format
+        key: AES key (as for :func:`new`)
+        mode: ``'ffx-a2'`` (default) or ``'ff3-1'``
+        **options: Keyword options forwarded to the encrypter
+
+    Returns:
+        CompiledFormat instance
+
+    Raises:
+        ValueError: If the mask has no slot characters, or is too short for
+            ``mode`` (with FF3-1, ``radix ** slots`` below ``10 ** 6``)
+
+    Example:
+        >>> ssn = ffx.compile_format('DDD-DD-DDDD', key)
+        >>> len(ssn.encrypt(0, '123-45-6789'))
+        11
+    """
+    alphabets = slot_alphabets(mask)
+    if not alphabets:
+        raise ValueError(f"Format mask {mask!r} has no slot characters")
+    encrypter: Union[BaseEncrypter, MixedRadixEncrypter]
+    if len(set(alphabets)) == 1 and len(alphabets) > 1:
+        encrypter = _encrypter(key, len(alphabets[0]), mode, options)
+    else:
+        encrypter = mixed_radix(key, alphabets, mode=mode, **options)
+    return CompiledFormat(mask, encrypter)
@@ -0,0 +1,195 @@
+"""Interchangeable AES-128 implementations for the FFX round function.
+
+The round function makes many tiny ECB calls, so the fixed cost of a call
+into the cipher matters as much as its throughput. Every backend offers the
+same two keyed primitives, each an object with a pycryptodome-style
+``encrypt(data, output=None)`` method over whole 16-byte blocks:
+
+- ``ecb(key)``: AES-ECB;
+- ``cbc(key)``: AES-CBC from a zero IV, whose chain carries over from one
+  call to the next (see :meth:`FFXEncrypter._cbc_mac`).
+
+A backend whose cheapest call is not the ``output=`` form can also offer
+``ecb_block(key)``, a bare ``bytes -> bytes`` ECB function that the scalar
+round loop uses for its single-block MACs.
+
+``pycryptodome`` is always available; ``openssl`` needs the optional
+``cryptography`` package. :func:`select_backends` picks between them without
+timing anything; :func:`ffx.calibrate` times them and records the winners.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable, Optional, Union
+
+from Crypto.Cipher import AES
+
+
+class AESBackend:
+    """One AES implementation. Subclasses set ``name`` and the two factories."""
+
+    name = ''
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the library behind this backend can be imported."""
+        return True
+
+    def ecb(self, key: bytes):
+        """Keyed AES-ECB object with ``encrypt(data, output=None)``."""
+        raise NotImplementedError
+
+    def cbc(self, key: bytes):
+        """Keyed AES-CBC object with a zero IV and ``encrypt(data, output=None)``."""
+        raise NotImplementedError
+
+    def ecb_block(self, key: bytes) -> Optional[Callable[[bytes], bytes]]:
+        """Bare ECB function for single blocks, or None to use ``ecb(key).encrypt``."""
+        return None
+
+
+class PyCryptodomeBackend(AESBackend):
+    """pycryptodome's AES; its cipher objects already have the right interface."""
+
+    name = 'pycryptodome'
+
+    def ecb(self, key: bytes):
+        return AES.new(key, AES.MODE_ECB)
+
+    def cbc(self, key: bytes):
+        return AES.new(key, AES.MODE_CBC, b'\x00' * 16)
+
+
+class _OpenSSLCipher:
+    """Adapts a ``cryptography`` encryptor context to ``encrypt(data, output=None)``.
+
+    ECB and CBC contexts return exactly the input length for whole blocks,
+    and a CBC context keeps its chain across ``update`` calls.
+    """
+
+    __slots__ = ('_update',)
+
+    def __init__(self, context):
+        self._update = context.update
+
+    def encrypt(self, data: Union[bytes, bytearray, memoryview], output=None):
+        if output is None:
+            return self._update(data)
+        output[:] = self._update(data)
+        return None
+
+
+class OpenSSLBackend(AESBackend):
+    """OpenSSL's AES through the ``cryptography`` package."""
+
+    name = 'openssl'
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import cryptography.hazmat.primitives.ciphers  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def ecb(self, key: bytes):
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        return _OpenSSLCipher(Cipher(algorithms.AES(key), modes.ECB()).encryptor())
+
+    def cbc(self, key: bytes):
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        return _OpenSSLCipher(Cipher(algorithms.AES(key), modes.CBC(b'\x00' * 16)).encryptor())
+
+    def ecb_block(self, key: bytes) -> Callable[[bytes], bytes]:
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        # The adapter's extra Python frame costs more than the AES call.
+        # Typed here: without cryptography installed mypy sees it as Any.
+        encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+        update: Callable[[bytes], bytes] = encryptor.update
+        return update
+
+
+BACKENDS: dict[str, AESBackend] = {
+    backend.name: backend for backend in (PyCryptodomeBackend(), OpenSSLBackend())
+}
+
+
+def available_backends() -> list[str]:
+    """Names of the backends that can be used in this environment."""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name: str) -> AESBackend:
+    """Look up a backend by name.
+
+    Raises:
+        ValueError: If ``name`` is unknown or its library is not installed
+    """
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown AES backend {name!r}; choose from {sorted(BACKENDS)}")
+    if not backend.available():
+        raise ValueError(f"AES backend {name!r} is not installed")
+    return backend
+
+
+def _call_us(encrypt, data: bytes, out: Optional[bytearray], number: int) -> float:
+    """Fastest of three runs of ``number`` calls, in microseconds per call."""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            encrypt(data, output=out)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6 / number
+
+
+def fastest_backends() -> tuple[str, str]:
+    """Time every available backend and return the fastest for small and bulk calls.
+
+    One-block ECB calls are made the way the scalar round loop makes them,
+    and 64 KiB ECB calls returning bytes as lockstep batches and table
+    builds make them. Takes a few milliseconds and varies from run to run,
+    so only :func:`ffx.calibrate` uses it.
+    """
+    key = os.urandom(16)
+    small = {}
+    bulk = {}
+    for name in available_backends():
+        backend = BACKENDS[name]
+        ecb = backend.ecb(key).encrypt
+        block = backend.ecb_block(key)
+        if block is None:
+            small[name] = _call_us(ecb, bytes(16), bytearray(16), 2000)
+        else:
+            small[name] = _call_us(lambda data, output: block(data), bytes(16), None, 2000)
+        bulk[name] = _call_us(ecb, bytes(1 << 16), None, 20)
+    return min(small, key=small.__getitem__), min(bulk, key=bulk.__getitem__)
+
+
+# Preferred backend when no profile records one: OpenSSL's per-call overhead
+# is several times lower wherever it is installed.
+_PREFERENCE = ('openssl', 'pycryptodome')
+
+
+def select_backends(recorded: str = '') -> tuple[str, str]:
+    """The backends for single-block calls and for bulk calls.
+
+    ``recorded`` is a profile's backend identifier (``'openssl'`` or
+    ``'openssl+pycryptodome'``, see :func:`ffx.calibration.backend_id`); its
+    backends are used when they are installed. Otherwise both are the
+    first installed backend of ``openssl`` and ``pycryptodome``. Nothing is
+    timed, so every process makes the same choice.
+    """
+    if recorded:
+        small, _, bulk = recorded.partition('+')
+        bulk = bulk or small
+        if all(name in BACKENDS and BACKENDS[name].available() for name in (small, bulk)):
+            return small, bulk
+    name = next(name for name in _PREFERENCE if BACKENDS[name].available())
+    return name, name
@@ -0,0 +1,506 @@
+"""Radix, string, integer and batch API shared by the FFX-A2 and FF3-1 encrypters."""
+
+from __future__ import annotations
+
+import string
+import sys
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Sequence, Union
+
+import gmpy2
+
+from .backends import get_backend, select_backends
+from .cache import CacheStats, LRUCache
+from .calibration import Profile, backend_id, load_profile
+from .exceptions import InvalidRadixException
+from .integer import FFXInteger
+
+if TYPE_CHECKING:
+    from .encrypter import TweakLike
+
+
+# Bytes a memo entry costs besides its key's message and its value: the key
+# tuple, the shared tweak reference and the LRU's dict and list links.
+_MEMO_ENTRY_OVERHEAD = 200
+
+
+def _memo_nbytes(value: Union[str, int]) -> int:
+    """Approximate memory of one memo entry, whose key holds a message of the same size."""
+    return 2 * sys.getsizeof(value) + _MEMO_ENTRY_OVERHEAD
+
+
+class BaseEncrypter:
+    """Message handling shared by every mode of operation.
+
+    Holds the radix, the AES backends, the optional result memo and the
+    host profile, and implements the public message API on top of a few
+    hooks: messages as :class:`FFXInteger`, radix strings or integers, one at
+    a time (:meth:`encrypt`, :meth:`encrypt_str`, :meth:`encrypt_int`), in
+    batches (:meth:`encrypt_many`) and over integer ranges
+    (:meth:`encrypt_range`).
+
+    Subclasses supply the cipher itself: :meth:`_tweak_bytes`,
+    :meth:`_feistel_str`, :meth:`_feistel_int`, :meth:`_run_rows`,
+    :meth:`_run_values` and :meth:`warm`. See :class:`FFXEncrypter` and
+    :class:`FF3Encrypter`.
+    """
+
+    # Mode of operation; BatchScheduler and the specialized engines need FFX-A2.
+    MODE = ''
+
+    # Number of Feistel rounds.
+    NUM_ROUNDS = 0
+
+    # Smallest message domain, radix ** n, the mode accepts.
+    MIN_DOMAIN = 1
+
+    # Rows per lockstep pass of the batch round loop. Bounds the size of the
+    # whole-batch buffers so they stay in cache; a calibration profile
+    # overrides this per host.
+    _BATCH_CHUNK = 1 << 14
+
+    def __init__(
+        self,
+        key: bytes,
+        radix: int,
+        *,
+        memo_size: int = 0,
+        memo_bytes: int = 0,
+        profile: Optional[Profile] = None,
+        backend: Optional[str] = None,
+    ):
+        """Check the radix, pick the AES backends and set up the memo.
+
+        Args:
+            key: AES key
+            radix: Base for the message alphabet (2-36)
+            memo_size: Maximum number of memoized results; 0 disables the
+                memo unless ``memo_bytes`` is set. Every computed result is
+                stored in both directions, so it takes two entries.
+            memo_bytes: Approximate memory limit for memoized results; 0
+                means no byte limit.
+            profile: Host calibration to use (see :func:`ffx.calibrate`).
+                Defaults to the saved profile for this host, if there is one;
+                pass ``Profile()`` for the built-in defaults. A profile
+                measured with other AES backends is not used.
+            backend: AES implementation to use for every call (see
+                :mod:`ffx.backends`). By default the backends recorded in
+                the profile are used, and without one OpenSSL when the
+                ``cryptography`` package is installed, else pycryptodome.
+
+        Raises:
+            InvalidRadixException: If radix is not in range 2-36
+            ValueError: If ``backend`` is unknown or not installed
+        """
+        if radix not in range(2, 37):
+            raise InvalidRadixException(f"Radix must be between 2 and 36, got {radix}")
+
+        self._radix = radix
+        self._chars = (string.digits + string.ascii_lowercase)[:radix]
+        # int() also takes '_' separators, signs, spaces and non-ASCII digits;
+        # only these are digits of the radix, in either case.
+        self._digit_chars = self._chars + self._chars.upper()
+
+        self._key = key
+        # The profile is read first, since it records the backends it measured.
+        if profile is None:
+            profile = load_profile()
+        if backend is None:
+            small, bulk = select_backends(profile.backend if profile is not None else '')
+        else:
+            small = bulk = backend
+        self._backend = get_backend(small)
+        self._bulk_backend = get_backend(bulk)
+
+        # Opt-in memo of whole results, for workloads that encrypt the same
+        # values over and over. Keyed by (tweak bytes, decrypt, message) for
+        # strings and (tweak bytes, decrypt, n, value) for integers. Messages
+        # are checked and canonicalized first, so every key and stored value
+        # is a string _to_digits could have produced.
+        if memo_size or memo_bytes:
+            self._memo: Optional[LRUCache] = LRUCache(
+                memo_size or sys.maxsize, sizeof=_memo_nbytes, max_bytes=memo_bytes or None
+            )
+        else:
+            self._memo = None
+
+        # Crossover thresholds and cost-model factors measured on this host,
+        # unless they were measured with other AES backends.
+        if profile is not None and profile.backend and profile.backend != backend_id(small, bulk):
+            profile = None
+        if profile is not None:
+            self._BATCH_CHUNK = profile.batch_chunk
+        self._profile = profile
+
+    @staticmethod
+    def _tweak_bytes(tweak: TweakLike) -> bytes:
+        """The canonical bytes of a tweak, as used in cache and memo keys."""
+        raise NotImplementedError
+
+    def _feistel_str(self, tweak: TweakLike, s: str, decrypt: bool) -> str:
+        """Encrypt or decrypt the radix string ``s``."""
+        raise NotImplementedError
+
+    def _feistel_int(self, tweak: TweakLike, value: int, n: int, decrypt: bool) -> int:
+        """Encrypt or decrypt the ``n``-digit message whose integer value is ``value``."""
+        raise NotImplementedError
+
+    def _run_rows(self, tweaks, texts: Sequence[FFXInteger], decrypt: bool) -> list[FFXInteger]:
+        """Run every row of a batch; per-row tweaks arrive as their bytes."""
+        raise NotImplementedError
+
+    def _run_values(
+        self, tweak: TweakLike, n: int, xs: Sequence[int], decrypt: bool
+    ) -> list[int]:
+        """Encrypt or decrypt ``n``-digit integer values under one tweak, no FFXIntegers.
+
+        Used by :meth:`encrypt_range`, :class:`~ffx.domain.IntegerDomain` and
+        :class:`~ffx.formats.CompiledFormat`; values must already be in range.
+        """
+        raise NotImplementedError
+
+    def warm(self, shapes: Iterable[tuple[int, int]]) -> int:
+        """Precompute the per-shape state for every ``(n, t)`` in ``shapes``.
+
+        Returns:
+            The number of shapes that were not already cached
+        """
+        raise NotImplementedError
+
+    def cache_stats(self) -> dict[str, CacheStats]:
+        """Size and hit/miss/eviction counters of each of the encrypter's caches.
+
+        Here only ``'memo'``, when the memo is enabled; subclasses add their own.
+        """
+        return {'memo': self._memo.stats()} if self._memo is not None else {}
+
+    def _to_digits(self, value: int, width: int) -> str:
+        """Render ``value`` as a radix string, left zero-padded to ``width``."""
+        if width <= 0:
+            return ''
+        s: str = gmpy2.digits(value, self._radix)
+        if len(s) < width:
+            return '0' * (width - len(s)) + s
+        return s
+
+    def _canonical(self, s: str) -> str:
+        """``s`` as :meth:`_to_digits` renders it, for memo keys: letter digits in lower case.
+
+        Parsing ignores case, so ``'AB'`` and ``'ab'`` are the same message;
+        keying the memo by the raw input would make a later decrypt return
+        whichever spelling was encrypted first.
+        """
+        return s.lower() if self._radix > 10 else s
+
+    def _check_digits(self, s: str) -> None:
+        """Check that every character of ``s`` is a digit of the radix."""
+        if s.strip(self._digit_chars):
+            raise ValueError(f"{s!r} is not a string of radix-{self._radix} digits")
+
+    def _check_int(self, value: int, length: int) -> None:
+        if value < 0 or value >= self._radix ** length:
+            raise ValueError(f"Value must be in [0, {self._radix}**{length})")
+
+    def _check_many(self, tweaks, texts: Sequence[FFXInteger]) -> None:
+        """Check that the rows of a batch share a message and tweak length."""
+        n = len(texts[0])
+        if isinstance(tweaks, (list, tuple)):
+            if len(tweaks) != len(texts):
+                raise ValueError(f"Got {len(tweaks)} tweaks for {len(texts)} messages")
+            if len({len(self._tweak_bytes(tweak)) for tweak in tweaks}) > 1:
+                raise ValueError(
+                    "All tweaks in a batch must have the same length; "
+                    "use BatchScheduler for mixed shapes"
+                )
+        if any(len(text._x) != n for text in texts):
+            raise ValueError(
+                "All messages in a batch must have the same length; "
+                "use BatchScheduler for mixed shapes"
+            )
+
+    def _in_chunks(
+        self, rows, state, keys: Sequence, A: list[int], B: list[int]
+    ) -> tuple[list[int], list[int]]:
+        """Run ``rows`` over ``_BATCH_CHUNK`` rows at a time and join the results.
+
+        ``state`` is shared by every row and ``keys`` has one entry per row,
+        as for the subclass's ``_encrypt_rows`` and ``_decrypt_rows``.
+        """
+        chunk = self._BATCH_CHUNK
+        out_a: list[int] = []
+        out_b: list[int] = []
+        for start in range(0, len(A), chunk):
+            stop = start + chunk
+            a, b = rows(state, keys[start:stop], A[start:stop], B[start:stop])
+            out_a += a
+            out_b += b
+        return out_a, out_b
+
+    def encrypt_range(
+        self,
+        start: int,
+        stop: int,
+        length: int,
+        tweak: TweakLike = 0,
+        *,
+        chunk_size: Optional[int] = None,
+        shard: tuple[int, int] = (0, 1),
+    ) -> Iterator[tuple[int, int]]:
+        """Encrypt every ``length``-digit value in ``[start, stop)``, lazily.
+
+        Yields ``(plaintext, ciphertext)`` integer pairs in plaintext order.
+        Values are encrypted ``chunk_size`` at a time through the lockstep
+        batch rounds, or through whatever strategy the cost model picks for
+        the shape, with no FFXInteger objects. Only one chunk is held at a
+        time.
+
+        ``shard=(index, count)`` restricts the call to the ``index``-th of
+        ``count`` contiguous, near-equal slices of the range. Workers given
+        the same arguments and shards ``0..count-1`` together cover the
+        range exactly once.
+
+        Args:
+            start: First plaintext value
+            stop: End of the range (exclusive), at most ``radix ** length``
+            length: Message length in radix digits
+            tweak: The tweak value (as for :meth:`encrypt`)
+            chunk_size: Values per batch (default ``_BATCH_CHUNK``)
+            shard: ``(index, count)`` of the slice to encrypt
+
+        Returns:
+            An iterator of ``(plaintext, ciphertext)`` pairs
+
+        Raises:
+            ValueError: If the range or shard is invalid
+        """
+        if not 0 <= start <= stop <= self._radix ** length:
+            raise ValueError(f"Range [{start}, {stop}) is not within [0, {self._radix}**{length}]")
+        index, count = shard
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index must be in [0, {count}), got {index}")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+        span = stop - start
+        return self._range_chunks(
+            tweak, length,
+            start + span * index // count, start + span * (index + 1) // count,
+            chunk_size or self._BATCH_CHUNK,
+        )
+
+    def _range_chunks(
+        self, tweak: TweakLike, n: int, start: int, stop: int, chunk: int
+    ) -> Iterator[tuple[int, int]]:
+        for lo in range(start, stop, chunk):
+            xs = range(lo, min(stop, lo + chunk))
+            yield from zip(xs, self._run_values(tweak, n, xs, False))
+
+    def encrypt_many(
+        self, tweaks, plaintexts: Sequence[FFXInteger]
+    ) -> list[FFXInteger]:
+        """Encrypt a batch of same-length plaintexts.
+
+        The Feistel rounds normally run in lockstep across the batch, so
+        each round makes one AES call (or one per Q block) for the whole
+        batch instead of one or more per message. When another strategy is
+        expected to be cheaper for the shape (a batch of one or two, a
+        codebook, very long messages) the rows are run one by one instead.
+        A repeated (tweak, plaintext) row is computed once, and with the memo
+        enabled, rows it already holds are not computed at all. Results are
+        identical to calling :meth:`encrypt` on each row.
+
+        Args:
+            tweaks: One tweak for every row, or a list/tuple of per-row tweaks
+                (all of the same length)
+            plaintexts: Messages to encrypt, all of the same length
+
+        Returns:
+            List of encrypted messages, in input order
+
+        Raises:
+            ValueError: If the rows do not share a message and tweak length
+        """
+        return self._run_many(tweaks, plaintexts, False)
+
+    def decrypt_many(
+        self, tweaks, ciphertexts: Sequence[FFXInteger]
+    ) -> list[FFXInteger]:
+        """Decrypt a batch of same-length ciphertexts.
+
+        The inverse of :meth:`encrypt_many`; see there for the batching rules.
+        """
+        return self._run_many(tweaks, ciphertexts, True)
+
+    def _run_many(self, tweaks, texts: Sequence[FFXInteger], decrypt: bool) -> list[FFXInteger]:
+        """Run a batch, computing each distinct (tweak, message) row once.
+
+        Repeated rows, and rows the memo already holds, are filled in without
+        any AES work; the remaining rows go through :meth:`_run_rows` as one
+        smaller batch.
+        """
+        if not texts:
+            return []
+        count = len(texts)
+        for text in texts:
+            self._check_digits(text._x)
+        memo = self._memo
+        per_row = isinstance(tweaks, (list, tuple))
+        keys: list
+        if per_row:
+            if len(tweaks) != count:
+                raise ValueError(f"Got {len(tweaks)} tweaks for {count} messages")
+            tweaks = [self._tweak_bytes(tweak) for tweak in tweaks]
+            keys = list(zip(tweaks, [self._canonical(text._x) for text in texts]))
+        else:
+            keys = [self._canonical(text._x) for text in texts]
+        if memo is None and len(set(keys)) == count:
+            return self._run_rows(tweaks, texts, decrypt)
+
+        # Check the whole batch, since skipped rows never reach _run_rows.
+        self._check_many(tweaks, texts)
+        shared = None if per_row else self._tweak_bytes(tweaks)
+        radix = self._radix
+        results: dict = {}
+        todo: dict = {}
+        for index, key in enumerate(keys):
+            if key in results or key in todo:
+                continue
+            if memo is not None:
+                tweak_bytes, s = key if per_row else (shared, key)
+                hit = memo.get((tweak_bytes, decrypt, s))
+                if hit is not None:
+                    results[key] = FFXInteger(hit, radix=radix)
+                    continue
+            todo[key] = index
+
+        if todo:
+            rows = list(todo.values())
+            values = self._run_rows(
+                [tweaks[i] for i in rows] if per_row else tweaks, [texts[i] for i in rows], decrypt
+            )
+            for key, value in zip(todo, values):
+                results[key] = value
+                if memo is not None:
+                    tweak_bytes, s = key if per_row else (shared, key)
+                    memo.put((tweak_bytes, decrypt, s), value._x)
+                    memo.put((tweak_bytes, not decrypt, value._x), s)
+        return [results[key] for key in keys]
+
+    def _memo_str(
+        self, tweak: TweakLike, s: str, decrypt: bool
+    ) -> str:
+        """:meth:`_feistel_str` through the memo; a computed result is stored both ways."""
+        memo = self._memo
+        if memo is None:
+            return self._feistel_str(tweak, s, decrypt)
+        s = self._canonical(s)
+        tweak_bytes = self._tweak_bytes(tweak)
+        result: Optional[str] = memo.get((tweak_bytes, decrypt, s))
+        if result is None:
+            result = self._feistel_str(tweak, s, decrypt)
+            memo.put((tweak_bytes, decrypt, s), result)
+            memo.put((tweak_bytes, not decrypt, result), s)
+        return result
+
+    def _memo_int(
+        self, tweak: TweakLike, value: int, n: int, decrypt: bool
+    ) -> int:
+        """:meth:`_feistel_int` through the memo; a computed result is stored both ways."""
+        memo = self._memo
+        if memo is None:
+            return self._feistel_int(tweak, value, n, decrypt)
+        tweak_bytes = self._tweak_bytes(tweak)
+        result: Optional[int] = memo.get((tweak_bytes, decrypt, n, value))
+        if result is None:
+            result = self._feistel_int(tweak, value, n, decrypt)
+            memo.put((tweak_bytes, decrypt, n, value), result)
+            memo.put((tweak_bytes, not decrypt, n, result), value)
+        return result
+
+    def encrypt_str(self, tweak: TweakLike, plaintext: str) -> str:
+        """Encrypt a message given as a plain radix string.
+
+        Same result as :meth:`encrypt`, without building FFXInteger objects
+        for the message or the result.
+
+        Args:
+            tweak: The tweak value (as for :meth:`encrypt`)
+            plaintext: The message, as a string of radix digits
+
+        Returns:
+            The ciphertext, as a string of the same length
+        """
+        self._check_digits(plaintext)
+        if self._memo is not None:
+            return self._memo_str(tweak, plaintext, False)
+        return self._feistel_str(tweak, plaintext, False)
+
+    def decrypt_str(self, tweak: TweakLike, ciphertext: str) -> str:
+        """Decrypt a string produced by :meth:`encrypt_str`."""
+        self._check_digits(ciphertext)
+        if self._memo is not None:
+            return self._memo_str(tweak, ciphertext, True)
+        return self._feistel_str(tweak, ciphertext, True)
+
+    def encrypt_int(
+        self, tweak: TweakLike, value: int, length: int
+    ) -> int:
+        """Encrypt the ``length``-digit message whose integer value is ``value``.
+
+        Args:
+            tweak: The tweak value (as for :meth:`encrypt`)
+            value: Message as an integer in ``[0, radix ** length)``
+            length: Message length in radix digits
+
+        Returns:
+            Ciphertext as an integer in the same range
+
+        Raises:
+            ValueError: If ``value`` is out of range
+        """
+        if self._memo is not None:
+            return self._memo_int(tweak, value, length, False)
+        return self._feistel_int(tweak, value, length, False)
+
+    def decrypt_int(
+        self, tweak: TweakLike, value: int, length: int
+    ) -> int:
+        """Decrypt an integer produced by :meth:`encrypt_int`."""
+        if self._memo is not None:
+            return self._memo_int(tweak, value, length, True)
+        return self._feistel_int(tweak, value, length, True)
+
+    def encrypt(
+        self, tweak: TweakLike, plaintext: FFXInteger
+    ) -> FFXInteger:
+        """Encrypt a plaintext.
+
+        Args:
+            tweak: The tweak value. FFX-A2 takes an FFXInteger, string, raw
+                bytes, a handle from :meth:`FFXEncrypter.compile_tweak`, or 0
+                for no tweak; FF3-1 takes 7 bytes or an integer below
+                ``2 ** 56``.
+            plaintext: The message to encrypt as FFXInteger
+
+        Returns:
+            Encrypted message as FFXInteger
+        """
+        self._check_digits(plaintext._x)
+        if self._memo is not None:
+            return FFXInteger(self._memo_str(tweak, plaintext._x, False), radix=self._radix)
+        return FFXInteger(self._feistel_str(tweak, plaintext._x, False), radix=self._radix)
+
+    def decrypt(
+        self, tweak: TweakLike, ciphertext: FFXInteger
+    ) -> FFXInteger:
+        """Decrypt a ciphertext.
+
+        Args:
+            tweak: The tweak value (must match the one used for encryption)
+            ciphertext: The encrypted message as FFXInteger
+
+        Returns:
+            Decrypted message as FFXInteger
+        """
+        self._check_digits(ciphertext._x)
+        if self._memo is not None:
+            return FFXInteger(self._memo_str(tweak, ciphertext._x, True), radix=self._radix)
+        return FFXInteger(self._feistel_str(tweak, ciphertext._x, True), radix=self._radix)
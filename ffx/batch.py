@@ -0,0 +1,196 @@
+"""Batch scheduler for heterogeneous FFX workloads."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, NamedTuple
+
+from .integer import FFXInteger
+
+if TYPE_CHECKING:
+    from .encrypter import FFXEncrypter, TweakLike, _FParams, _TweakChain
+
+
+class BucketStats(NamedTuple):
+    """Size of one ``(n, t)`` bucket from the most recent scheduled batch."""
+
+    rows: int     # messages computed in the bucket (repeats and memo hits excluded)
+    tweaks: int   # distinct tweaks among those messages
+
+
+class _Bucket:
+    """Rows that share a message length ``n`` and tweak length ``t``."""
+
+    __slots__ = ('params', 'indices', 'tweaks', 'tweak_bytes', 'chains', 'texts', 'chain_by_tweak')
+
+    def __init__(self, params: '_FParams'):
+        self.params = params
+        self.indices: list[int] = []
+        self.tweaks: list = []
+        self.tweak_bytes: list[bytes] = []
+        self.chains: list['_TweakChain'] = []
+        self.texts: list[str] = []
+        # Rows sharing a tweak share one cached CBC-MAC chain state.
+        self.chain_by_tweak: dict[bytes, '_TweakChain'] = {}
+
+
+class BatchScheduler:
+    """Encrypt or decrypt a mixed list of (tweak, message) pairs.
+
+    Real batches mix shapes: 15- and 16-digit cards, 5- and 9-digit ZIPs,
+    tweaks of different lengths. ``FFXEncrypter.encrypt_many`` needs every row
+    to share a message length and tweak length, so the scheduler buckets rows
+    by the same ``(n, t)`` key the encrypter's parameter cache uses, resolves
+    the cached parameters once per bucket and the CBC-MAC tweak state once per
+    distinct tweak, runs each bucket with the strategy the encrypter's cost
+    model picks for its size (usually the lockstep round loop), and scatters
+    the results back into input order. A repeated (tweak, message) pair is
+    computed once, and pairs in the encrypter's memo (see ``memo_size``) are
+    not computed at all.
+
+    The size of every bucket from the most recent call is kept in
+    :attr:`last_buckets` so the batching efficiency of a workload can be
+    observed.
+
+    Example:
+        >>> scheduler = BatchScheduler(ffx.new(key, radix=10))
+        >>> ciphertexts = scheduler.encrypt([(tweak, card), (0, zip_code)])
+        >>> scheduler.last_buckets
+        {(16, 10): BucketStats(rows=1, tweaks=1), (5, 0): BucketStats(rows=1, tweaks=1)}
+    """
+
+    def __init__(self, encrypter: 'FFXEncrypter'):
+        """Initialize the scheduler.
+
+        Args:
+            encrypter: The encrypter whose key and radix are used for every row
+
+        Raises:
+            ValueError: If the encrypter is not in FFX-A2 mode
+        """
+        if encrypter.MODE != 'ffx-a2':
+            raise ValueError(f"BatchScheduler needs an FFX-A2 encrypter, got {encrypter.MODE}")
+        self._encrypter = encrypter
+        self.last_buckets: dict[tuple[int, int], BucketStats] = {}
+
+    def encrypt(
+        self, pairs: Iterable[tuple[TweakLike, FFXInteger]]
+    ) -> list[FFXInteger]:
+        """Encrypt every (tweak, plaintext) pair.
+
+        Returns:
+            Ciphertexts in the same order as ``pairs``
+        """
+        return self._run(pairs, decrypt=False)
+
+    def decrypt(
+        self, pairs: Iterable[tuple[TweakLike, FFXInteger]]
+    ) -> list[FFXInteger]:
+        """Decrypt every (tweak, ciphertext) pair.
+
+        Returns:
+            Plaintexts in the same order as ``pairs``
+        """
+        return self._run(pairs, decrypt=True)
+
+    def _bucket(
+        self, pairs: Iterable[tuple[TweakLike, FFXInteger]], decrypt: bool
+    ) -> tuple[int, dict[tuple[int, int], _Bucket], dict[int, FFXInteger], list[tuple[int, int]]]:
+        """Group every row to compute into its ``(n, t)`` bucket.
+
+        Also returns the rows answered by the memo, by index, and the
+        ``(index, earlier index)`` of every repeated row.
+        """
+        encrypter = self._encrypter
+        memo = encrypter._memo
+        radix = encrypter._radix
+        buckets: dict[tuple[int, int], _Bucket] = {}
+        first: dict[tuple[bytes, str], int] = {}
+        memoized: dict[int, FFXInteger] = {}
+        repeats: list[tuple[int, int]] = []
+        canonical = encrypter._canonical
+
+        count = 0
+        for count, (tweak, text) in enumerate(pairs, 1):
+            tweak_bytes = encrypter._tweak_bytes(tweak)
+            encrypter._check_digits(text._x)
+            s = canonical(text._x)
+            earlier = first.get((tweak_bytes, s))
+            if earlier is not None:
+                repeats.append((count - 1, earlier))
+                continue
+            first[tweak_bytes, s] = count - 1
+            if memo is not None:
+                hit = memo.get((tweak_bytes, decrypt, s))
+                if hit is not None:
+                    memoized[count - 1] = FFXInteger(hit, radix=radix)
+                    continue
+
+            n = len(s)
+            shape = (n, len(tweak_bytes))
+
+            bucket = buckets.get(shape)
+            if bucket is None:
+                bucket = buckets[shape] = _Bucket(encrypter._params(*shape))
+
+            chain = bucket.chain_by_tweak.get(tweak_bytes)
+            if chain is None:
+                chain = encrypter._chain(bucket.params, n, tweak_bytes)
+                bucket.chain_by_tweak[tweak_bytes] = chain
+
+            bucket.indices.append(count - 1)
+            bucket.tweaks.append(tweak)
+            bucket.tweak_bytes.append(tweak_bytes)
+            bucket.chains.append(chain)
+            bucket.texts.append(s)
+
+        return count, buckets, memoized, repeats
+
+    def _run(
+        self, pairs: Iterable[tuple[TweakLike, FFXInteger]], decrypt: bool
+    ) -> list[FFXInteger]:
+        encrypter = self._encrypter
+        count, buckets, memoized, repeats = self._bucket(pairs, decrypt)
+        rows = encrypter._decrypt_rows if decrypt else encrypter._encrypt_rows
+        radix = encrypter._radix
+        memo = encrypter._memo
+
+        results: list[FFXInteger] = [None] * count  # type: ignore[list-item]
+        for index, value in memoized.items():
+            results[index] = value
+        for (n, _), bucket in buckets.items():
+            strategy = encrypter._planned_rows(n, bucket.tweak_bytes)
+            if strategy == 'batch':
+                l = n // 2
+                A, B = rows(
+                    bucket.params,
+                    bucket.chains,
+                    [int(s[:l], radix) if l else 0 for s in bucket.texts],
+                    [int(s[l:], radix) for s in bucket.texts],
+                )
+                values = encrypter._join_many(n, A, B)
+            else:
+                # Row by row, each tweak may also be served by a loaded table file.
+                mapped = encrypter._mapped_strategy if encrypter._mapped else None
+                values = [
+                    FFXInteger(
+                        encrypter._run_str(
+                            mapped(n, tweak, strategy) if mapped else strategy, tweak, s, decrypt
+                        ),
+                        radix=radix,
+                    )
+                    for tweak, s in zip(bucket.tweaks, bucket.texts)
+                ]
+            for index, value in zip(bucket.indices, values):
+                results[index] = value
+            if memo is not None:
+                for tweak_bytes, s, value in zip(bucket.tweak_bytes, bucket.texts, values):
+                    memo.put((tweak_bytes, decrypt, s), value._x)
+                    memo.put((tweak_bytes, not decrypt, value._x), s)
+        for index, earlier in repeats:
+            results[index] = results[earlier]
+
+        self.last_buckets = {
+            shape: BucketStats(len(bucket.indices), len(bucket.chain_by_tweak))
+            for shape, bucket in buckets.items()
+        }
+        return results
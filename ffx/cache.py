@@ -0,0 +1,128 @@
+"""Small bounded caches used by the FFX encrypter."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+
+class CacheStats(NamedTuple):
+    """A snapshot of one cache's size and counters."""
+
+    entries: int              # entries currently held
+    capacity: int             # maximum number of entries
+    hits: int                 # get() calls that found their key
+    misses: int               # get() calls that did not
+    evictions: int            # entries dropped to stay within capacity
+    nbytes: Optional[int]     # approximate memory held by the entries (None if not sized)
+
+
+class LRUCache:
+    """A mapping with a fixed entry capacity and least-recently-used eviction.
+
+    Looking an entry up with :meth:`get` marks it as most recently used; once
+    :meth:`put` pushes the size past ``capacity`` the least recently used
+    entry is dropped.
+
+    One cache can be shared by several threads. Lookups take no lock, since
+    they sit on every encrypt call and each ``OrderedDict`` operation is
+    atomic; inserts and evictions are serialized. The hit and miss counters
+    are plain increments, so under heavy contention they may undercount
+    slightly.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """Initialize an empty cache.
+
+        Args:
+            capacity: Maximum number of entries to keep (must be >= 1)
+            sizeof: Approximate size of an entry in bytes; when given, the
+                cache keeps a running total (see :meth:`stats`)
+            max_bytes: Also evict once that total exceeds this (needs ``sizeof``)
+        """
+        if capacity < 1:
+            raise ValueError(f"Cache capacity must be at least 1, got {capacity}")
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("A byte capacity needs a sizeof function")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._sizeof = sizeof
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the entry for ``key`` (marking it recently used), or ``default``."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            pass  # evicted by another thread since the lookup
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the entry for ``key``, or ``default``, leaving the order and counters alone."""
+        return self._data.get(key, default)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or replace ``key``, evicting the least recently used entry if full."""
+        sizeof = self._sizeof
+        with self._lock:
+            data = self._data
+            if sizeof is not None:
+                old = data.get(key)
+                if old is not None:
+                    self._nbytes -= sizeof(old)
+                self._nbytes += sizeof(value)
+            data[key] = value
+            data.move_to_end(key)
+            max_bytes = self.max_bytes
+            while len(data) > self.capacity or (
+                max_bytes is not None and self._nbytes > max_bytes and len(data) > 1
+            ):
+                _, evicted = data.popitem(last=False)
+                self.evictions += 1
+                if sizeof is not None:
+                    self._nbytes -= sizeof(evicted)
+
+    def clear(self) -> None:
+        """Drop every entry. The counters are kept."""
+        with self._lock:
+            self._data.clear()
+            self._nbytes = 0
+
+    def items(self) -> list[tuple[Any, Any]]:
+        """Snapshot of the entries, least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def stats(self) -> CacheStats:
+        """Current size, hit/miss/eviction counters and approximate memory."""
+        return CacheStats(
+            entries=len(self._data),
+            capacity=self.capacity,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            nbytes=self._nbytes if self._sizeof is not None else None,
+        )
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,321 @@
+"""Host calibration of the encrypter's crossover thresholds."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import Crypto
+
+from .integer import FFXInteger
+
+
+# Bumped whenever the meaning of a profile field changes; older files are ignored.
+PROFILE_VERSION = 2
+
+# Environment variable naming the profile file; set it to '' to disable profiles.
+PROFILE_ENV = 'FFX_PROFILE'
+
+# Largest CBC-MAC length, in blocks, that calibrate() tries folding inline.
+_MAX_INLINE_BLOCKS = 8
+
+# Candidate lockstep chunk sizes, and the batch they are timed on.
+_CHUNK_CANDIDATES = tuple(1 << k for k in range(10, 17))
+_CHUNK_ROWS = 1 << 16
+
+# Timed repeats per measurement; the fastest is kept.
+_REPEAT = 5
+
+# Where host_id() reads the CPU model and feature flags on Linux.
+_CPUINFO = '/proc/cpuinfo'
+
+
+class Profile(NamedTuple):
+    """Thresholds and cost-model factors measured on one host.
+
+    Produced by :func:`calibrate` and loaded by every new encrypter. The
+    defaults are the built-in values, so ``Profile()`` is an uncalibrated
+    host.
+    """
+
+    mac_inline_max_blocks: int = 1               # see FFXEncrypter._MAC_INLINE_MAX_BLOCKS
+    batch_chunk: int = 1 << 14                   # see FFXEncrypter._BATCH_CHUNK
+    cost_factors: Optional[dict[str, float]] = None  # strategy -> seed correction factor
+    host: str = ''                               # host_id() of the machine measured
+    backend: str = ''                            # backend_id() of the AES code measured
+
+
+def _cpu() -> str:
+    """The CPU model, whether it has AES instructions and a digest of its flags.
+
+    Read from ``/proc/cpuinfo`` where there is one; elsewhere only the model
+    from ``platform.processor()`` is known.
+    """
+    model = flags = ''
+    try:
+        with open(_CPUINFO) as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                name = name.strip()
+                if name == 'model name' and not model:
+                    model = value.strip()
+                elif name in ('flags', 'Features') and not flags:
+                    flags = value.strip()
+                if model and flags:
+                    break
+    except OSError:
+        pass
+    model = model or platform.processor()
+    if not flags:
+        return model
+    features = sorted(set(flags.split()))
+    digest = hashlib.sha256(' '.join(features).encode()).hexdigest()[:12]
+    return '%s-%s-flags%s' % (model, 'aes' if 'aes' in features else 'noaes', digest)
+
+
+def host_id() -> str:
+    """Identify the things a profile depends on: CPU, Python and AES builds."""
+    host = '%s-%s-%s%d.%d-pycryptodome%s' % (
+        platform.machine(),
+        _cpu(),
+        platform.python_implementation(),
+        sys.version_info[0],
+        sys.version_info[1],
+        Crypto.__version__,
+    )
+    try:
+        import cryptography
+    except ImportError:
+        return host
+    return f'{host}-cryptography{cryptography.__version__}'
+
+
+def backend_id(small: str, bulk: str) -> str:
+    """Identify the AES backends an encrypter uses for single-block and bulk calls."""
+    return small if small == bulk else f'{small}+{bulk}'
+
+
+def default_profile_path() -> Optional[Path]:
+    """The profile file: ``$FFX_PROFILE``, else under the user cache directory.
+
+    Returns ``None`` when ``FFX_PROFILE`` is set to an empty string.
+    """
+    path = os.environ.get(PROFILE_ENV)
+    if path is not None:
+        return Path(path) if path else None
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(cache) / 'libffx' / 'profile.json'
+
+
+# Profiles already read, by path, so constructing an encrypter reads no files.
+_loaded: dict[Path, Optional[Profile]] = {}
+
+
+def load_profile(path: Optional[Path] = None) -> Optional[Profile]:
+    """Read the saved profile, if there is one for this host.
+
+    A missing, unreadable or outdated file, or one measured on a different
+    host, gives ``None``.
+    """
+    if path is None:
+        path = default_profile_path()
+        if path is None:
+            return None
+    path = Path(path)
+    if path in _loaded:
+        return _loaded[path]
+
+    profile = None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') == PROFILE_VERSION and data.get('host') == host_id():
+            profile = Profile(
+                mac_inline_max_blocks=int(data['mac_inline_max_blocks']),
+                batch_chunk=int(data['batch_chunk']),
+                cost_factors={str(k): float(v) for k, v in data['cost_factors'].items()},
+                host=data['host'],
+                backend=str(data['backend']),
+            )
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        profile = None
+    _loaded[path] = profile
+    return profile
+
+
+def save_profile(profile: Profile, path: Optional[Path] = None) -> Path:
+    """Write ``profile`` to ``path`` (default: :func:`default_profile_path`).
+
+    Raises:
+        ValueError: If no path is given and profiles are disabled
+    """
+    if path is None:
+        path = default_profile_path()
+        if path is None:
+            raise ValueError(f"Profiles are disabled (${PROFILE_ENV} is empty); pass a path")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = dict(profile._asdict(), version=PROFILE_VERSION)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    _loaded.pop(path, None)
+    return path
+
+
+def _best_us(fn: Callable[[], object], number: int) -> float:
+    """Fastest of ``_REPEAT`` runs of ``number`` calls, in microseconds per call."""
+    best = float('inf')
+    for _ in range(_REPEAT):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6 / number
+
+
+def _inline_max_blocks(encrypter) -> int:
+    """Largest Q tail, in blocks, for which folding through ECB beats one CBC call."""
+    best = 1
+    n = 2
+    for blocks in range(2, _MAX_INLINE_BLOCKS + 1):
+        # Shortest decimal message whose round MAC covers ``blocks`` blocks.
+        while -(-(1 + encrypter._params(n, 0).b_bytes) // 16) < blocks:
+            n += 1
+        params = encrypter._params(n, 0)
+        chain = encrypter._chain(params, n, b'')
+        buf = encrypter._round_buffer(params)
+        b = params.mod_odd - 1
+
+        def run_round():
+            encrypter._F(params, chain, buf, 1, b)
+
+        encrypter._MAC_INLINE_MAX_BLOCKS = blocks
+        inline = _best_us(run_round, 2000)
+        encrypter._MAC_INLINE_MAX_BLOCKS = blocks - 1
+        cbc = _best_us(run_round, 2000)
+        if inline >= cbc:
+            break
+        best = blocks
+    return best
+
+
+def _batch_chunk(encrypter) -> int:
+    """Lockstep chunk size with the lowest per-row cost on a large batch."""
+    params = encrypter._params(16, 0)
+    chain = encrypter._chain(params, 16, b'')
+    split = params.mod_odd
+    chains = [chain] * _CHUNK_ROWS
+    A = [(x * 7919) // split % params.mod_even for x in range(_CHUNK_ROWS)]
+    B = [(x * 7919) % split for x in range(_CHUNK_ROWS)]
+
+    timings = dict.fromkeys(_CHUNK_CANDIDATES, float('inf'))
+    for _ in range(2):
+        for chunk in _CHUNK_CANDIDATES:
+            encrypter._BATCH_CHUNK = chunk
+            start = time.perf_counter()
+            encrypter._encrypt_rows(params, chains, A, B)
+            timings[chunk] = min(timings[chunk], time.perf_counter() - start)
+    return min(timings, key=timings.__getitem__)
+
+
+def _cost_factors(encrypter) -> dict[str, float]:
+    """Ratio of measured to seed-estimated cost for every strategy.
+
+    Each strategy is timed on a shape it is built for, through the same entry
+    point the dispatcher uses.
+    """
+    model = encrypter._cost_model
+
+    def ratio(strategy: str, n: int, measured_us: float, batch: int = 1) -> float:
+        estimate: float = model.raw_estimate(strategy, encrypter, n, encrypter._params(n, 0), batch)
+        return measured_us / estimate
+
+    factors = {}
+    short = '4111111111111111'
+    factors['scalar'] = ratio('scalar', 16, _best_us(
+        lambda: encrypter._run_str('scalar', 0, short, False), 2000))
+
+    long_text = '1234567890' * 51
+    factors['mpz'] = ratio('mpz', 510, _best_us(
+        lambda: encrypter._run_str('mpz', 0, long_text, False), 50))
+
+    rows = 1024
+    plains = [FFXInteger(short, radix=10)] * rows
+
+    def run_batch():
+        n, params, chains, A, B = encrypter._prepare_many(0, plains)
+        encrypter._join_many(n, *encrypter._encrypt_rows(params, chains, A, B))
+
+    factors['batch'] = ratio('batch', 16, _best_us(run_batch, 3) / rows, rows)
+
+    encrypter.codebook(3, 0)
+    factors['codebook'] = ratio('codebook', 3, _best_us(
+        lambda: encrypter._run_str('codebook', 0, '123', False), 2000))
+
+    encrypter.round_table(4, 0)
+    factors['round_table'] = ratio('round_table', 4, _best_us(
+        lambda: encrypter._run_str('round_table', 0, '1234', False), 2000))
+
+    return {strategy: round(factor, 3) for strategy, factor in factors.items()}
+
+
+def calibrate(path: Optional[Path] = None, *, save: bool = True) -> Profile:
+    """Measure this host's crossover thresholds and save them as its profile.
+
+    Micro-benchmarks the competing code paths with a throwaway key:
+
+    - the largest round MAC, in blocks, that is faster folded through the
+      ECB cipher in Python than passed to one CBC call
+      (``_MAC_INLINE_MAX_BLOCKS``);
+    - the lockstep chunk size with the fastest per-row batch rounds, which
+      also sizes table-build chunks (``_BATCH_CHUNK``);
+    - a correction factor per execution strategy for the cost model that
+      picks between them (see :meth:`FFXEncrypter.explain`).
+
+    It also times the installed AES backends and records the fastest for
+    single-block and for bulk calls. Encrypters created afterwards load the
+    profile automatically and use those backends, unless they are given a
+    different ``backend``. Takes a few seconds; rerun it after changing CPU,
+    Python, pycryptodome or cryptography.
+
+    Args:
+        path: Where to save the profile (default: ``$FFX_PROFILE``, else
+            ``~/.cache/libffx/profile.json``)
+        save: Write the profile to ``path``; if False it is only returned
+
+    Returns:
+        The measured :class:`Profile`
+    """
+    from .backends import fastest_backends
+    from .encrypter import FFXEncrypter
+
+    # The backends are timed here, once, and recorded; encrypters then pick
+    # them from the profile instead of timing anything themselves.
+    backend = backend_id(*fastest_backends())
+    encrypter = FFXEncrypter(
+        os.urandom(16), 10, codebook_threshold=10 ** 3, round_table_threshold=10 ** 2,
+        profile=Profile(backend=backend),
+    )
+    profile = Profile(
+        mac_inline_max_blocks=_inline_max_blocks(encrypter),
+        batch_chunk=_batch_chunk(encrypter),
+        cost_factors=None,
+        host=host_id(),
+        backend=backend,
+    )
+    # The factors are measured against the calibrated thresholds.
+    encrypter._MAC_INLINE_MAX_BLOCKS = profile.mac_inline_max_blocks
+    encrypter._BATCH_CHUNK = profile.batch_chunk
+    profile = profile._replace(cost_factors=_cost_factors(encrypter))
+
+    if save:
+        save_profile(profile, path)
+    return profile
@@ -0,0 +1,232 @@
+"""Format-preserving encryption of integers in ``[0, size)`` for any size."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Sequence
+
+from .power_of_two import POWER_OF_TWO_RADICES
+
+if TYPE_CHECKING:
+    from .base import BaseEncrypter
+    from .encrypter import TweakLike
+
+
+# A one-digit message has an empty left half, and its rounds reduce to adding
+# a per-tweak constant, so covering domains have at least two digits.
+_MIN_LENGTH = 2
+
+# Default limit on expected_walks for ffx.domain. The tightest FFX-A2 cover
+# never needs more than 3 (size 1 in a radix-2, two-digit cover); a mode's
+# minimum domain or a fixed radix can need far more.
+MAX_EXPECTED_WALKS = 15.0
+
+
+class WalkStats(NamedTuple):
+    """Cycle-walking counters for one :class:`IntegerDomain`."""
+
+    calls: int             # values encrypted or decrypted
+    walks: int             # cipher calls beyond the first one per value
+    max_walk: int          # most extra cipher calls spent on a single value
+    expected_walks: float  # cover / size - 1, the mean extra calls per value over the range
+
+
+def covering_length(radix: int, size: int, min_domain: int = 1) -> int:
+    """Smallest message length ``n >= 2`` with ``radix ** n >= max(size, min_domain)``."""
+    target = max(size, min_domain)
+    n = _MIN_LENGTH
+    while radix ** n < target:
+        n += 1
+    return n
+
+
+def covering_radix(size: int, min_domain: int = 1, radices: Iterable[int] = range(2, 37)) -> int:
+    """The radix whose covering domain for ``size`` is smallest.
+
+    Cycle-walking costs ``radix ** n / size`` cipher calls per value on
+    average, so the tightest cover is the cheapest. For ``size >= 3`` and no
+    ``min_domain`` that is under 2 calls, since radix 2 alone covers within
+    a factor of 2; smaller sizes still get a two-digit cover (4 calls for
+    size 1), and a ``min_domain`` far above ``size`` costs about
+    ``min_domain / size`` calls whatever the radix. Ties go to a power-of-two
+    radix (see :class:`PowerOfTwoEncrypter`), then to the larger radix, whose
+    messages are shorter.
+    """
+    def cost(radix: int) -> tuple[int, bool, int]:
+        return (
+            radix ** covering_length(radix, size, min_domain),
+            radix not in POWER_OF_TWO_RADICES,
+            -radix,
+        )
+
+    return min(radices, key=cost)
+
+
+class IntegerDomain:
+    """Permutation of ``[0, size)`` built from an encrypter by cycle-walking.
+
+    FFX permutes ``radix ** n`` values, so a range such as IPv4 octets
+    (256) or the days of a century does not fit a decimal message without
+    ciphertexts escaping the range. This class runs the encrypter on the
+    smallest covering domain, ``radix ** length >= size``, and re-encrypts
+    any result at or above ``size`` until it falls inside. Every value of
+    the range then maps to another value of the range, and decryption walks
+    back the same way.
+
+    The number of cipher calls per value is variable but averages exactly
+    ``radix ** length / size`` over the range. That is under 2 for the
+    tightest FFX-A2 cover of 3 or more values, which :func:`ffx.domain`
+    picks, but not in general: covers have at least two digits (4 calls
+    for ``size=1`` in radix 2), and FF3-1's minimum domain of ``10 ** 6``
+    makes a 256-value domain cost about 3900 calls per value.
+    :meth:`stats` reports what was actually spent. Walk lengths depend on
+    the value, so calls on different values take different times.
+
+    The counters are plain increments shared by all threads, so under heavy
+    contention they may undercount slightly.
+
+    Example:
+        >>> octets = ffx.domain(key, 256)
+        >>> octets.decrypt(0, octets.encrypt(0, 192))
+        192
+    """
+
+    def __init__(self, encrypter: 'BaseEncrypter', size: int):
+        """Choose the covering length for ``size`` in the encrypter's radix.
+
+        Args:
+            encrypter: Encrypter supplying the key, radix and mode
+            size: Number of values in the domain (at least 1)
+
+        Raises:
+            ValueError: If ``size`` is less than 1
+        """
+        if size < 1:
+            raise ValueError(f"Domain size must be at least 1, got {size}")
+        self._encrypter = encrypter
+        self._size = size
+        self._length = covering_length(encrypter._radix, size, encrypter.MIN_DOMAIN)
+        self._domain = encrypter._radix ** self._length
+        encrypter.warm([(self._length, 0)])
+
+        self._calls = 0
+        self._walks = 0
+        self._max_walk = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"IntegerDomain(size={self._size}, radix={self._encrypter._radix}, "
+            f"length={self._length})"
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of values in the domain."""
+        return self._size
+
+    @property
+    def radix(self) -> int:
+        """Radix of the covering domain."""
+        return self._encrypter._radix
+
+    @property
+    def length(self) -> int:
+        """Message length, in radix digits, of the covering domain."""
+        return self._length
+
+    @property
+    def encrypter(self) -> 'BaseEncrypter':
+        """The underlying encrypter."""
+        return self._encrypter
+
+    def stats(self) -> WalkStats:
+        """Values processed, cipher calls spent walking and the expected cost."""
+        return WalkStats(
+            calls=self._calls,
+            walks=self._walks,
+            max_walk=self._max_walk,
+            expected_walks=self._domain / self._size - 1,
+        )
+
+    def _check(self, value: int) -> None:
+        if value < 0 or value >= self._size:
+            raise ValueError(f"Value must be in [0, {self._size}), got {value}")
+
+    def _walk(self, tweak: TweakLike, value: int, decrypt: bool) -> int:
+        self._check(value)
+        run = self._encrypter.decrypt_int if decrypt else self._encrypter.encrypt_int
+        size = self._size
+        n = self._length
+        value = run(tweak, value, n)
+        walks = 0
+        while value >= size:
+            value = run(tweak, value, n)
+            walks += 1
+        self._calls += 1
+        if walks:
+            self._walks += walks
+            if walks > self._max_walk:
+                self._max_walk = walks
+        return value
+
+    def _walk_many(
+        self, tweak: TweakLike, values: Sequence[int], decrypt: bool
+    ) -> list[int]:
+        """Walk every value in lockstep: each pass re-runs only those still outside."""
+        for value in values:
+            self._check(value)
+        if not values:
+            return []
+        run = self._encrypter._run_values
+        size = self._size
+        n = self._length
+
+        out = run(tweak, n, values, decrypt)
+        pending = [i for i, y in enumerate(out) if y >= size]
+        walk = 0
+        while pending:
+            walk += 1
+            self._walks += len(pending)
+            ys = run(tweak, n, [out[i] for i in pending], decrypt)
+            for i, y in zip(pending, ys):
+                out[i] = y
+            pending = [i for i in pending if out[i] >= size]
+        self._calls += len(out)
+        if walk > self._max_walk:
+            self._max_walk = walk
+        return out
+
+    def encrypt(self, tweak: TweakLike, value: int) -> int:
+        """Encrypt an integer in ``[0, size)`` to another integer in ``[0, size)``.
+
+        Args:
+            tweak: The tweak value (as for :meth:`FFXEncrypter.encrypt`)
+            value: The plaintext
+
+        Raises:
+            ValueError: If ``value`` is out of range
+        """
+        return self._walk(tweak, value, False)
+
+    def decrypt(self, tweak: TweakLike, value: int) -> int:
+        """Decrypt an integer produced by :meth:`encrypt`."""
+        return self._walk(tweak, value, True)
+
+    def encrypt_many(
+        self, tweak: TweakLike, values: Sequence[int]
+    ) -> list[int]:
+        """Encrypt many values under one tweak; same results as :meth:`encrypt`.
+
+        All values go through the lockstep batch rounds together, then the
+        ones that landed outside the range are walked again as a smaller
+        batch, until none are left.
+
+        Raises:
+            ValueError: If any value is out of range
+        """
+        return self._walk_many(tweak, values, False)
+
+    def decrypt_many(
+        self, tweak: TweakLike, values: Sequence[int]
+    ) -> list[int]:
+        """Decrypt many values produced by :meth:`encrypt` or :meth:`encrypt_many`."""
+        return self._walk_many(tweak, values, True)
@@ -3,18 +3,29 @@
 from __future__ import annotations
 
 import math
-import string
-from typing import NamedTuple, Union
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from operator import attrgetter
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Sequence, Union
 
 import gmpy2
 
-from Crypto.Cipher import AES
-
-from .exceptions import InvalidRadixException
+from .base import BaseEncrypter
+from .cache import CacheStats, LRUCache
+from .calibration import Profile
 from .integer import FFXInteger
+from .planner import CostModel, Plan, make_plan
+from .tables import Codebook, RoundTable, map_table_file, write_table_file
 from .utils import long_to_bytes
 
 
+# Format of export_params() output; bumped whenever the layout fields change.
+_PARAMS_VERSION = 1
+
 class _FParams(NamedTuple):
     """Cached, (n, t)-dependent parameters for the round function ``_F``.
 
@@ -31,9 +42,86 @@ class _FParams(NamedTuple):
     b_mask: int       # (1 << 8*b_bytes) - 1, to take b's low b_bytes bytes
     mod_even: int     # radix ** (n // 2), used on even rounds
     mod_odd: int      # radix ** ceil(n / 2), used on odd rounds
+    ext_counters: int  # blocks 1..k of the d+4 extension, as one big int (0 if unused)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this entry, in bytes."""
+        return sys.getsizeof(self) + sum(sys.getsizeof(field) for field in self)
+
+
+class _TweakChain(NamedTuple):
+    """Cached, (n, tweak)-dependent CBC-MAC state for the round function.
+
+    Q is the tweak, zero padding, the round byte and b. Every whole 16-byte
+    block of Q that lies inside the tweak-plus-padding prefix is the same in
+    all 10 rounds and every call with this tweak, so the CBC-MAC chain value
+    after ``P`` and those blocks is computed once. Each round then only MACs
+    ``q_tail || round byte || b``, starting from ``chain``.
+    """
+
+    chain: int          # CBC-MAC chain value after P and the whole prefix blocks
+    chain_bytes: bytes  # ``chain`` as 16 big-endian bytes
+    q_tail: bytes       # prefix bytes sharing a block with the round byte (< 16)
+
+
+class Tweak:
+    """A tweak resolved ahead of time for one message length.
+
+    Built by :meth:`FFXEncrypter.compile_tweak`. It holds the encoded tweak,
+    the cached (n, t) round-function parameters and the CBC-MAC state after
+    the tweak blocks, so passing it to ``encrypt``/``decrypt`` skips all of
+    the per-call tweak handling. A handle used with a different message
+    length or a different encrypter still gives correct results; it is then
+    treated as its raw ``value``.
+
+    Attributes:
+        value: the tweak as the raw bytes that are MACed
+        n: message length the handle was compiled for
+    """
 
+    __slots__ = ('value', 'n', 'params', 'chain', '_encrypter')
 
-class FFXEncrypter:
+    def __init__(
+        self, encrypter: 'FFXEncrypter', value: bytes, n: int,
+        params: '_FParams', chain: '_TweakChain',
+    ):
+        self._encrypter = encrypter
+        self.value = value
+        self.n = n
+        self.params = params
+        self.chain = chain
+
+    def __repr__(self) -> str:
+        return f"Tweak({self.value!r}, n={self.n})"
+
+
+# Any value accepted as a tweak: a compiled Tweak, raw bytes, or a value that
+# is MACed as its string form (0 for no tweak).
+TweakLike = Union[FFXInteger, Tweak, str, bytes, int]
+
+
+class _RoundBuffer:
+    """Per-thread, per-(n, t) scratch space for the round function.
+
+    The varying part of Q (``q_tail || round byte || b``) always has the same
+    length for a given (n, t), so it is assembled in place in ``q`` instead of
+    by concatenation. Multi-block CBC-MACs and the d+4 extension write into
+    ``mac`` and ``ext`` through ``output=``, so their payload-sized results
+    are not allocated on every round; a single-block MAC returns its 16 bytes,
+    which is cheaper in Python than the ``output=`` call.
+    """
+
+    __slots__ = ('q', 'mac', 'ext', 'round_off')
+
+    def __init__(self, params: '_FParams'):
+        self.round_off = (-(1 + params.b_bytes)) % 16
+        self.q = bytearray(self.round_off + 1 + params.b_bytes)
+        self.mac = bytearray(len(self.q))
+        self.ext = bytearray(-(-max(params.d4 - 16, 0) // 16) * 16)
+
+
+class FFXEncrypter(BaseEncrypter):
     """FFX Mode of Operation Encrypter.
     
     Implements the FFX-A2 algorithm for format-preserving encryption as specified in:
@@ -56,39 +144,177 @@ class FFXEncrypter:
         True
     """
     
+    # Mode of operation; BatchScheduler and the specialized engines need FFX-A2.
+    MODE = 'ffx-a2'
+
     # Number of Feistel rounds (constant per FFX-A2 spec)
     NUM_ROUNDS = 10
 
-    # For a CBC-MAC over this many 16-byte blocks or fewer, folding the blocks
-    # through the persistent ECB cipher in Python beats constructing a fresh
-    # AES-CBC object (which re-runs the AES key schedule). Above this size the
-    # per-block Python overhead dominates and the C CBC path is faster; the
-    # crossover is between 3 and 4 blocks in practice.
-    _MAC_INLINE_MAX_BLOCKS = 3
+    # Smallest message domain, radix ** n, the mode accepts.
+    MIN_DOMAIN = 1
+
+    # For a CBC-MAC over this many 16-byte blocks or fewer (not counting the
+    # cached leading blocks), folding the blocks through the persistent ECB
+    # cipher in Python beats a call into the persistent C CBC cipher (see
+    # _cbc_mac). Above this size the per-block Python overhead dominates; with
+    # no key schedule on the CBC path the crossover is between 1 and 2 blocks.
+    # A calibration profile (see ffx.calibrate) overrides this per host.
+    _MAC_INLINE_MAX_BLOCKS = 1
 
-    def __init__(self, key: bytes, radix: int):
+    # Messages at least this many digits long may run the Feistel network on
+    # gmpy2.mpz halves (see _feistel_mpz). CPython's str/int conversion and
+    # big-int division are quadratic (and int() refuses decimal strings over
+    # sys.get_int_max_str_digits()); GMP's are subquadratic. Above this
+    # length the cost model picks between the two paths.
+    _MPZ_MIN_DIGITS = 128
+
+    # One in this many single-message calls is timed to refine the cost
+    # model (must be a power of two).
+    _SAMPLE_INTERVAL = 64
+
+    # Batch sizes are planned in power-of-two buckets up to this size.
+    _PLAN_MAX_BATCH = 1 << 16
+
+    # Number of (n, tweak) pairs whose message counts are kept for amortizing
+    # table builds (see _uses); the least recently used pair is dropped beyond it.
+    _TABLE_USES_SIZE = 1 << 16
+
+    # Number of planned strategies, and of seed estimates for live timings,
+    # that are kept (see _strategy and _observe); beyond it the least
+    # recently used one is dropped and recomputed when next needed.
+    _PLANS_SIZE = 1 << 12
+
+    # Number of (n, t) round buffers each thread keeps (see _round_buffer).
+    _ROUND_BUFFER_SHAPES = 16
+
+    # Rows per lockstep pass of the batch round loop, and per chunk of a table
+    # build. Bounds the size of the whole-batch buffers so they stay in cache;
+    # a calibration profile overrides this per host.
+    _BATCH_CHUNK = 1 << 14
+
+    def __init__(
+        self,
+        key: bytes,
+        radix: int,
+        *,
+        codebook_threshold: int = 0,
+        codebook_cache_size: int = 16,
+        round_table_threshold: int = 0,
+        round_table_cache_size: int = 16,
+        chain_cache_size: int = 1024,
+        params_cache_size: int = 256,
+        memo_size: int = 0,
+        memo_bytes: int = 0,
+        profile: Optional[Profile] = None,
+        backend: Optional[str] = None,
+    ):
         """Initialize the FFX encrypter.
 
         Args:
             key: 16-byte AES-128 key
             radix: Base for the message alphabet (2-36)
+            codebook_threshold: Largest domain size (``radix ** n``) for which
+                a full permutation codebook may be built per (n, tweak) and used
+                for O(1) encrypt/decrypt lookups, once the messages under the
+                tweak pay for the build. 0 disables codebooks.
+            codebook_cache_size: Maximum number of (n, tweak) codebooks kept;
+                the least recently used one is evicted beyond this.
+            round_table_threshold: Largest half-domain size
+                (``radix ** ceil(n / 2)``) for which per-round F tables are
+                built per (n, tweak), replacing every AES call with a lookup.
+                Only used for messages too long for a codebook. 0 disables.
+            round_table_cache_size: Maximum number of (n, tweak) round tables
+                kept; the least recently used one is evicted beyond this.
+            chain_cache_size: Maximum number of (n, tweak) CBC-MAC chain
+                states kept; the least recently used one is evicted beyond this.
+            params_cache_size: Maximum number of (n, t) round-function
+                parameter sets kept; the least recently used one is evicted
+                beyond this.
+            memo_size: Maximum number of memoized results; 0 disables the
+                memo unless ``memo_bytes`` is set. Every computed result is
+                stored in both directions, so it takes two entries.
+            memo_bytes: Approximate memory limit for memoized results; 0
+                means no byte limit.
+            profile: Host calibration to use (see :func:`ffx.calibrate`).
+                Defaults to the saved profile for this host, if there is one;
+                pass ``Profile()`` for the built-in defaults. A profile
+                measured with other AES backends is not used.
+            backend: AES implementation to use for every call (see
+                :mod:`ffx.backends`). By default the backends recorded in
+                the profile are used, and without one OpenSSL when the
+                ``cryptography`` package is installed, else pycryptodome.
 
         Raises:
             InvalidRadixException: If radix is not in range 2-36
+            ValueError: If ``backend`` is unknown or not installed
         """
-        if radix not in range(2, 37):
-            raise InvalidRadixException(f"Radix must be between 2 and 36, got {radix}")
-
-        self._radix = radix
-        self._chars = (string.digits + string.ascii_lowercase)[:radix]
+        super().__init__(
+            key, radix, memo_size=memo_size, memo_bytes=memo_bytes, profile=profile, backend=backend
+        )
 
-        self._key = key
-        self._ecb = AES.new(key, AES.MODE_ECB)
+        # Single-block calls (the scalar round loop) go to _ecb; whole-batch
+        # calls, table builds and multi-block CBC-MACs to _bulk_ecb and the
+        # per-thread persistent CBC cipher (see _cbc_mac).
+        self._ecb = self._backend.ecb(key)
+        # For one block, returning a fresh bytes object costs less than
+        # writing into a preallocated buffer through output=.
+        self._ecb_block = self._backend.ecb_block(key) or self._ecb.encrypt
+        self._bulk_ecb = (
+            self._ecb if self._bulk_backend is self._backend else self._bulk_backend.ecb(key)
+        )
+        self._local = threading.local()
         # Per-(message length, tweak length) parameter cache. Everything stored
         # here depends only on n, t and the (fixed) radix and key, so it is
         # computed once and reused across the 10 Feistel rounds and across every
-        # call that shares the same (n, t).
-        self._P_cache: dict[tuple[int, int], _FParams] = {}
+        # call that shares the same (n, t). Lengths are client data too, so it
+        # is an LRU bounded by entry count; long shapes hold large radix
+        # powers, so it also reports an estimate of the bytes it holds.
+        self._P_cache = LRUCache(params_cache_size, sizeof=attrgetter('nbytes'))
+        # Per-(message length, tweak) CBC-MAC state after the invariant tweak
+        # blocks. Tweaks are unbounded client data, so this one is an LRU.
+        self._chain_cache = LRUCache(chain_cache_size)
+
+        # Small-domain codebooks, keyed by (n, tweak). _codebook_max_n is the
+        # longest message whose whole domain fits under the threshold (-1 when
+        # codebooks are disabled), so the per-call check is one comparison.
+        max_n = 0
+        while radix ** (max_n + 1) <= codebook_threshold:
+            max_n += 1
+        self._codebook_max_n = max_n if max_n else -1
+        self._codebooks = LRUCache(codebook_cache_size, sizeof=attrgetter('nbytes'))
+
+        # Round-function tables, keyed by (n, tweak). Since the tables grow
+        # with radix ** ceil(n / 2), the longest tabled message is 2k digits
+        # for the largest k with radix ** k under the threshold.
+        half = 0
+        while radix ** (half + 1) <= round_table_threshold:
+            half += 1
+        self._round_table_max_n = 2 * half if half else -1
+        self._round_tables = LRUCache(round_table_cache_size, sizeof=attrgetter('nbytes'))
+        self._table_max_n = max(self._codebook_max_n, self._round_table_max_n)
+        # Tables mapped from files by load_table, keyed by (n, tweak). They
+        # are used for their (n, tweak) whatever the thresholds, and never
+        # evicted.
+        self._mapped: dict[tuple[int, bytes], Union[Codebook, RoundTable]] = {}
+        self._mapped_lengths: set[int] = set()
+
+        # The inline-MAC crossover and cost-model factors measured on this host.
+        profile = self._profile
+        if profile is not None:
+            self._MAC_INLINE_MAX_BLOCKS = profile.mac_inline_max_blocks
+
+        # Strategy chosen by the cost model per (n, t, batch bucket,
+        # repetition bucket); cleared whenever live timings move the model
+        # (see _observe), which compares them against the seed estimates
+        # kept per (strategy, n, t, batch bucket). Lengths are client data,
+        # so both are LRUs.
+        self._cost_model = CostModel(profile.cost_factors if profile is not None else None)
+        self._strategies = LRUCache(self._PLANS_SIZE)
+        self._raw_estimates = LRUCache(self._PLANS_SIZE)
+        # Messages run per (n, tweak) at lengths a table could serve. Tweaks
+        # are client data, so this is an LRU.
+        self._table_uses = LRUCache(self._TABLE_USES_SIZE)
+        self._calls = 0
 
     @staticmethod
     def _split(n: int) -> int:
@@ -105,6 +331,20 @@ class FFXEncrypter:
         the fixed header block ``P`` and its AES image ``E(P)``, the constant
         Q-padding length, and the per-parity output moduli.
         """
+        params = self._shape_params(n, t)
+        return params._replace(e_p=int.from_bytes(self._ecb.encrypt(params.P), 'big'))
+
+    def _layout(self, n: int, t: int) -> '_FParams':
+        """Params to estimate ``(n, t)``'s costs from, without filling the params cache.
+
+        Cost estimates only read the shape's layout, so a cached entry is used
+        if there is one and :meth:`_shape_params` otherwise.
+        """
+        params: Optional[_FParams] = self._P_cache.peek((n, t))
+        return params if params is not None else self._shape_params(n, t)
+
+    def _shape_params(self, n: int, t: int) -> '_FParams':
+        """The key-independent part of :meth:`_build_params`, with ``e_p`` left 0."""
         radix = self._radix
 
         beta = math.ceil(n / 2.0)
@@ -113,7 +353,7 @@ class FFXEncrypter:
 
         # P is the fixed 16-byte header block for this (n, t). Because it never
         # changes for a given (n, t, key), its CBC-MAC first-block image E(P) is
-        # also fixed and can be precomputed once here.
+        # also fixed and is precomputed once by the caller.
         P = (
             b'\x01\x02\x01'
             + long_to_bytes(radix, 3)
@@ -123,7 +363,6 @@ class FFXEncrypter:
             + long_to_bytes(t, 4)
         )
         assert len(P) == 16
-        e_p = int.from_bytes(self._ecb.encrypt(P), 'big')
 
         # Number of zero bytes inserted between the tweak and the round byte so
         # that len(Q) is a multiple of 16 (P is already one whole block).
@@ -132,162 +371,957 @@ class FFXEncrypter:
         m_even = n // 2
         m_odd = int(math.ceil(n / 2.0))
 
+        # The extension blocks are E(Y ^ j) for j = 1..k. The j blocks do not
+        # depend on Y, so they are laid out once here; the long-message path
+        # XORs them against Y repeated k times in a single big-int operation.
+        extra_blocks = -(-(d + 4 - 16) // 16) if d + 4 > 16 else 0
+        ext_counters = int.from_bytes(
+            b''.join(j.to_bytes(16, 'big') for j in range(1, extra_blocks + 1)), 'big'
+        )
+
         return _FParams(
             P=P,
-            e_p=e_p,
+            e_p=0,
             b_bytes=b_bytes,
             d4=d + 4,
             q_zero_pad=q_zero_pad,
             b_mask=(1 << (8 * b_bytes)) - 1,
             mod_even=radix ** m_even,
             mod_odd=radix ** m_odd,
+            ext_counters=ext_counters,
         )
 
+    def _params(self, n: int, t: int) -> '_FParams':
+        """Return the cached ``_FParams`` for ``(n, t)``, building it if needed."""
+        cache_key = (n, t)
+        params: Optional[_FParams] = self._P_cache.get(cache_key)
+        if params is None:
+            params = self._build_params(n, t)
+            self._P_cache.put(cache_key, params)
+        return params
+
+    def _install_params(self, shapes: dict[tuple[int, int], '_FParams']) -> None:
+        """Key ``_shape_params`` results with one ECB call over all their P blocks and cache them."""
+        if not shapes:
+            return
+        images = self._bulk_ecb.encrypt(b''.join([params.P for params in shapes.values()]))
+        for k, (shape, params) in enumerate(shapes.items()):
+            e_p = int.from_bytes(images[16 * k:16 * k + 16], 'big')
+            self._P_cache.put(shape, params._replace(e_p=e_p))
+
+    def warm(self, shapes: Iterable[tuple[int, int]]) -> int:
+        """Build the round-function parameters for many (n, t) shapes up front.
+
+        A new encrypter otherwise builds them on the first message of each
+        shape. Here every missing shape is laid out first and all of their
+        ``E(P)`` blocks are computed in one ECB call. Only the last
+        ``params_cache_size`` shapes stay cached.
+
+        Args:
+            shapes: ``(message length, tweak length in bytes)`` pairs
+
+        Returns:
+            The number of shapes that were not cached yet
+        """
+        missing = {
+            (n, t): self._shape_params(n, t)
+            for n, t in shapes if (n, t) not in self._P_cache
+        }
+        self._install_params(missing)
+        return len(missing)
+
+    def export_params(self) -> dict:
+        """The cached (n, t) shapes and their key-independent layout, as JSON-ready data.
+
+        Nothing in the result depends on the key, so it can be saved once and
+        passed to :meth:`import_params` by every worker of a fleet, whatever
+        its key.
+        """
+        return {
+            'version': _PARAMS_VERSION,
+            'mode': self.MODE,
+            'radix': self._radix,
+            'shapes': [
+                [n, t, params.b_bytes, params.d4, params.q_zero_pad]
+                for (n, t), params in self._P_cache.items()
+            ],
+        }
+
+    def import_params(self, plan: dict) -> int:
+        """Warm the parameter cache from :meth:`export_params` output.
+
+        Each shape's layout is checked against this encrypter before its
+        ``E(P)`` is computed, in one ECB call for the whole plan.
+
+        Returns:
+            The number of shapes that were not cached yet
+
+        Raises:
+            ValueError: If the plan is from another version, mode or radix, or
+                an entry does not match the layout this encrypter derives
+        """
+        try:
+            header = (plan['version'], plan['mode'], plan['radix'])
+            rows = [tuple(row) for row in plan['shapes']]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Not a parameter plan: {e!r}") from None
+        if header != (_PARAMS_VERSION, self.MODE, self._radix):
+            raise ValueError(
+                f"Plan is for version {header[0]}, mode {header[1]!r}, radix {header[2]}; "
+                f"this encrypter is version {_PARAMS_VERSION}, mode {self.MODE!r}, radix {self._radix}"
+            )
+
+        shapes = {}
+        for row in rows:
+            if len(row) != 5:
+                raise ValueError(f"Malformed plan entry {row!r}")
+            n, t = row[:2]
+            if (n, t) in self._P_cache or (n, t) in shapes:
+                continue
+            params = self._shape_params(n, t)
+            if (params.b_bytes, params.d4, params.q_zero_pad) != row[2:]:
+                raise ValueError(f"Plan entry for (n={n}, t={t}) does not match this encrypter")
+            shapes[n, t] = params
+        self._install_params(shapes)
+        return len(shapes)
+
+    def _cbc_mac(self, y_int: int, data: bytes) -> int:
+        """CBC-MAC ``data`` (whole blocks) starting from chain value ``y_int``.
+
+        Rather than keying a fresh AES-CBC object with IV ``y_int`` (which
+        re-runs the AES key schedule on every call), this reuses one CBC cipher
+        per thread, keyed once. Its running IV is the last ciphertext block it
+        produced; XORing that into the first block of ``data`` cancels it, so
+        the call computes exactly the CBC-MAC from ``y_int``.
+        """
+        local = self._local
+        try:
+            cbc = local.cbc
+            state = local.state
+        except AttributeError:
+            cbc = local.cbc = self._bulk_backend.cbc(self._key)
+            state = 0
+        first = int.from_bytes(data[:16], 'big') ^ y_int ^ state
+        out = cbc.encrypt(first.to_bytes(16, 'big') + data[16:])
+        local.state = state = int.from_bytes(out[-16:], 'big')
+        return state
+
+    def _cbc_mac_buffer(self, y_int: int, buf: _RoundBuffer) -> int:
+        """CBC-MAC the Q tail assembled in ``buf`` starting from chain value ``y_int``.
+
+        Same as :meth:`_cbc_mac`, but the IV cancellation is XORed into the
+        first block of ``buf.q`` in place and the ciphertext is written into
+        ``buf.mac``, so no payload-sized objects are created.
+        """
+        local = self._local
+        try:
+            cbc = local.cbc
+            state = local.state
+        except AttributeError:
+            cbc = local.cbc = self._bulk_backend.cbc(self._key)
+            state = 0
+        q = buf.q
+        mac = buf.mac
+        q[:16] = (int.from_bytes(q[:16], 'big') ^ y_int ^ state).to_bytes(16, 'big')
+        cbc.encrypt(q, output=mac)
+        local.state = state = int.from_bytes(mac[-16:], 'big')
+        return state
+
+    def _round_buffer(self, params: '_FParams') -> _RoundBuffer:
+        """Return this thread's ``_RoundBuffer`` for the shape of ``params``."""
+        local = self._local
+        try:
+            buffers = local.buffers
+        except AttributeError:
+            buffers = local.buffers = LRUCache(self._ROUND_BUFFER_SHAPES)
+        # P encodes (radix, n, t), so it identifies the shape.
+        buf: Optional[_RoundBuffer] = buffers.get(params.P)
+        if buf is None:
+            buf = _RoundBuffer(params)
+            buffers.put(params.P, buf)
+        return buf
+
+    def _build_chain(self, params: '_FParams', tweak: bytes) -> '_TweakChain':
+        """Compute the CBC-MAC state after ``P`` and the whole tweak-prefix blocks."""
+        q_prefix = tweak + b'\x00' * params.q_zero_pad
+        whole = len(q_prefix) & ~15
+
+        y_int = params.e_p
+        if (whole >> 4) <= self._MAC_INLINE_MAX_BLOCKS:
+            ecb_encrypt = self._ecb.encrypt
+            for off in range(0, whole, 16):
+                blk = int.from_bytes(q_prefix[off:off + 16], 'big') ^ y_int
+                y_int = int.from_bytes(ecb_encrypt(blk.to_bytes(16, 'big')), 'big')
+        else:
+            y_int = self._cbc_mac(y_int, q_prefix[:whole])
+
+        return _TweakChain(y_int, y_int.to_bytes(16, 'big'), q_prefix[whole:])
+
+    def _chain(self, params: '_FParams', n: int, tweak: bytes) -> '_TweakChain':
+        """Return the cached ``_TweakChain`` for ``(n, tweak)``, building it if needed."""
+        cache_key = (n, tweak)
+        chain: Optional[_TweakChain] = self._chain_cache.get(cache_key)
+        if chain is None:
+            chain = self._build_chain(params, tweak)
+            self._chain_cache.put(cache_key, chain)
+        return chain
+
+    @staticmethod
+    def _tweak_bytes(tweak: TweakLike) -> bytes:
+        """The bytes a tweak contributes to Q (empty for no tweak).
+
+        Raw ``bytes`` are used as they are; a tweak equal to 0 means no tweak;
+        anything else is MACed as its latin-1 encoded string form.
+        """
+        if type(tweak) is bytes:
+            return tweak
+        if type(tweak) is Tweak:
+            return tweak.value
+        if tweak == 0:
+            return b''
+        return str(tweak).encode('latin-1')
+
+    @staticmethod
+    def _tweak_length(tweak: TweakLike) -> int:
+        """``len(_tweak_bytes(tweak))``, without encoding the tweak where possible."""
+        if type(tweak) is bytes:
+            return len(tweak)
+        if type(tweak) is Tweak:
+            return len(tweak.value)
+        if tweak == 0:
+            return 0
+        if type(tweak) is FFXInteger:
+            return len(tweak)
+        return len(str(tweak))
+
     def _prepare(
-        self, n: int, tweak: Union[FFXInteger, int]
-    ) -> tuple[int, '_FParams', bytes]:
+        self, n: int, tweak: TweakLike
+    ) -> tuple[int, '_FParams', '_TweakChain']:
         """Resolve the round-invariant state for one encrypt/decrypt call.
 
         The tweak length ``t``, the cached ``_FParams`` for ``(n, t)`` and the
-        constant Q prefix (the tweak bytes plus the fixed zero padding) do not
-        change across the 10 Feistel rounds, so they are computed once here
-        rather than rebuilt on every round as the old ``_F`` did.
+        CBC-MAC state after the invariant tweak blocks do not change across
+        the 10 Feistel rounds (or across calls sharing the tweak), so they are
+        looked up once here rather than rebuilt on every round. A
+        :class:`Tweak` compiled by this encrypter for ``n`` already carries
+        all three.
         """
-        t = 0 if tweak == 0 else len(tweak)
+        if type(tweak) is Tweak and tweak._encrypter is self and tweak.n == n:
+            return len(tweak.value), tweak.params, tweak.chain
 
-        cache_key = (n, t)
-        params = self._P_cache.get(cache_key)
+        tweak_bytes = self._tweak_bytes(tweak)
+        t = len(tweak_bytes)
+
+        # Inlined _params/_chain: one lookup each on the hit path.
+        params = self._P_cache.get((n, t))
         if params is None:
             params = self._build_params(n, t)
-            self._P_cache[cache_key] = params
+            self._P_cache.put((n, t), params)
 
-        if t:
-            q_prefix = str(tweak).encode('latin-1') + b'\x00' * params.q_zero_pad
-        else:
-            q_prefix = b'\x00' * params.q_zero_pad
+        chain = self._chain_cache.get((n, tweak_bytes))
+        if chain is None:
+            chain = self._build_chain(params, tweak_bytes)
+            self._chain_cache.put((n, tweak_bytes), chain)
+
+        return t, params, chain
 
-        return t, params, q_prefix
+    def compile_tweak(self, value: TweakLike, n: int) -> Tweak:
+        """Resolve a tweak once for messages of length ``n``.
 
-    def _F(self, params: '_FParams', q_prefix: bytes, i: int, b_int: int) -> int:
+        For a small fixed set of tweaks (a column name, a tenant ID) the
+        returned handle can be passed as the tweak to every encrypt and
+        decrypt method instead of the raw value.
+
+        Args:
+            value: The tweak (FFXInteger, string, raw bytes, or 0 for no tweak)
+            n: Message length in radix digits the handle will be used with
+
+        Returns:
+            A :class:`Tweak` handle
+        """
+        tweak_bytes = self._tweak_bytes(value)
+        params = self._params(n, len(tweak_bytes))
+        return Tweak(self, tweak_bytes, n, params, self._chain(params, n, tweak_bytes))
+
+    def _F(
+        self, params: '_FParams', chain: '_TweakChain', buf: _RoundBuffer, i: int, b_int: int
+    ) -> int:
         """The round function F for the Feistel network.
 
         Implements the PRF per FFX-A2 specification. All state that depends only
-        on ``(n, t)`` arrives pre-computed in ``params``/``q_prefix`` (see
-        :meth:`_prepare`); this method only does the per-round work.
+        on ``(n, t)`` or the tweak arrives pre-computed in ``params``/``chain``
+        (see :meth:`_prepare`); this method only does the per-round work.
 
         Args:
             params: Cached (n, t)-dependent parameters.
-            q_prefix: Tweak bytes plus fixed zero padding (round-invariant).
+            chain: Cached CBC-MAC state after the invariant tweak blocks.
+            buf: This thread's scratch buffer for the shape (see
+                :meth:`_round_buffer`).
             i: Round number.
             b_int: Integer value of the right half of the current state.
 
         Returns:
             Output of the round function.
         """
-        # Build Q: the round-invariant prefix, the round byte, and b as a
-        # fixed-width big-endian field (its low b_bytes bytes, left zero-padded).
-        b_bytes = params.b_bytes
-        if b_bytes:
-            Q = q_prefix + bytes((i,)) + (b_int & params.b_mask).to_bytes(b_bytes, 'big')
-        else:
-            Q = q_prefix + bytes((i,))
+        # Assemble the varying tail of Q in place: the leftover prefix bytes,
+        # the round byte, and b as a fixed-width big-endian field. b is always
+        # below radix^ceil(n/2), so it fits its b_bytes bytes.
+        q = buf.q
+        r = buf.round_off
+        q[:r] = chain.q_tail
+        q[r] = i
+        q[r + 1:] = b_int.to_bytes(params.b_bytes, 'big')
 
-        # CBC-MAC of P || Q with a zero IV; we only need the final block. P is a
-        # single block whose image E(P) is cached, so we start the chain from it
-        # and fold in the Q blocks. For short payloads, folding through the
-        # persistent ECB cipher avoids rebuilding an AES-CBC object (and its key
-        # schedule) every round; for long payloads the C CBC path wins.
+        # CBC-MAC of P || Q with a zero IV; we only need the final block. The
+        # chain value after P and the invariant tweak blocks is cached, so we
+        # start from it and fold in the remaining Q blocks (usually just one).
+        # A single block goes straight through the ECB cipher, as do a few
+        # blocks folded in Python; longer payloads (long messages) go through
+        # the persistent CBC cipher in one C call.
         ecb_encrypt = self._ecb.encrypt
-        if (len(Q) >> 4) + 1 <= self._MAC_INLINE_MAX_BLOCKS:
-            y_int = params.e_p
-            for off in range(0, len(Q), 16):
-                blk = int.from_bytes(Q[off:off + 16], 'big') ^ y_int
+        if len(q) == 16:
+            block = (int.from_bytes(q, 'big') ^ chain.chain).to_bytes(16, 'big')
+            y_int = int.from_bytes(self._ecb_block(block), 'big')
+        elif (len(q) >> 4) <= self._MAC_INLINE_MAX_BLOCKS:
+            y_int = chain.chain
+            for off in range(0, len(q), 16):
+                blk = int.from_bytes(q[off:off + 16], 'big') ^ y_int
                 y_int = int.from_bytes(ecb_encrypt(blk.to_bytes(16, 'big')), 'big')
         else:
-            cbc = AES.new(self._key, AES.MODE_CBC, b'\x00' * 16)
-            y_int = int.from_bytes(cbc.encrypt(params.P + Q)[-16:], 'big')
+            y_int = self._cbc_mac_buffer(chain.chain, buf)
 
         # Extend the 16-byte MAC output up to d+4 bytes if more precision is
         # needed, then reduce modulo radix^m for this round's parity. The
-        # extension blocks E(Y ^ j) are mutually independent, so they are
-        # concatenated and encrypted in a single ECB call rather than one call
-        # per block.
+        # extension blocks E(Y ^ j) are mutually independent, so Y repeated k
+        # times is XORed with the precomputed counter blocks in one big-int
+        # operation and encrypted in a single ECB call.
         d4 = params.d4
         if d4 <= 16:
             y = y_int >> (8 * (16 - d4))
         else:
-            extra_blocks = -(-(d4 - 16) // 16)
-            buf = b''.join(
-                (y_int ^ j).to_bytes(16, 'big') for j in range(1, extra_blocks + 1)
+            ext = buf.ext
+            extra_blocks = len(ext) >> 4
+            ecb_encrypt(
+                (int.from_bytes(y_int.to_bytes(16, 'big') * extra_blocks, 'big') ^ params.ext_counters)
+                .to_bytes(16 * extra_blocks, 'big'),
+                output=ext,
+            )
+            y = (y_int << (8 * (d4 - 16))) | (int.from_bytes(ext, 'big') >> (8 * (len(ext) + 16 - d4)))
+
+        return y % (params.mod_even if (i & 1) == 0 else params.mod_odd)
+
+    def _F_many(
+        self, params: '_FParams', chains: Sequence['_TweakChain'], i: int, bs: Sequence[int]
+    ) -> list[int]:
+        """The round function F evaluated for a whole batch in lockstep.
+
+        Computes the same MAC as :meth:`_F` for every ``(chains[k], bs[k])``
+        pair, but each CBC-MAC block position is pushed through the ECB cipher
+        as one buffer covering every row, so a round costs one AES call per Q
+        block (plus one for any extension blocks) regardless of batch size.
+
+        The returned values are the truncated MAC words *before* reduction
+        modulo radix^m; callers fold that reduction into the Feistel add.
+        """
+        count = len(bs)
+        b_bytes = params.b_bytes
+        round_byte = bytes((i,))
+        if b_bytes:
+            b_mask = params.b_mask
+            Qs = [
+                c.q_tail + round_byte + (b & b_mask).to_bytes(b_bytes, 'big')
+                for c, b in zip(chains, bs)
+            ]
+        else:
+            Qs = [c.q_tail + round_byte for c in chains]
+
+        # The CBC chain for every row is kept as one contiguous buffer so the
+        # XOR with the next Q block is a single big-integer operation.
+        width = 16 * count
+        ecb_encrypt = self._bulk_ecb.encrypt
+        chain = b''.join([c.chain_bytes for c in chains])
+        for off in range(0, len(Qs[0]), 16):
+            blocks = b''.join([Q[off:off + 16] for Q in Qs])
+            chain = ecb_encrypt(
+                (int.from_bytes(blocks, 'big') ^ int.from_bytes(chain, 'big')).to_bytes(width, 'big')
             )
-            TMP = y_int.to_bytes(16, 'big') + ecb_encrypt(buf)
-            y = int.from_bytes(TMP[:d4], 'big')
+
+        d4 = params.d4
+        if d4 <= 16:
+            return [int.from_bytes(chain[off:off + d4], 'big') for off in range(0, width, 16)]
+
+        # Extension blocks E(Y ^ j) for every row, again in a single ECB call.
+        extra_blocks = -(-(d4 - 16) // 16)
+        ys = [int.from_bytes(chain[off:off + 16], 'big') for off in range(0, width, 16)]
+        ext = ecb_encrypt(b''.join([
+            (y ^ j).to_bytes(16, 'big') for y in ys for j in range(1, extra_blocks + 1)
+        ]))
+        stride = 16 * extra_blocks
+        tail = d4 - 16
+        return [
+            (y << (8 * tail)) | int.from_bytes(ext[k * stride:k * stride + tail], 'big')
+            for k, y in enumerate(ys)
+        ]
+
+    def _F_mpz(
+        self, params: '_FParams', chain: '_TweakChain', buf: _RoundBuffer, i: int, b: 'gmpy2.mpz'
+    ) -> 'gmpy2.mpz':
+        """The round function F for long messages, on ``gmpy2.mpz`` values.
+
+        Same MAC as :meth:`_F`. The b field and MAC output are converted with
+        linear-time byte conversions, Q is assembled in the shape's round
+        buffer, the whole d+4 extension is one bulk ECB call, and the
+        reduction modulo radix^m is done by GMP.
+        """
+        q = buf.q
+        r = buf.round_off
+        q[:r] = chain.q_tail
+        q[r] = i
+        q[r + 1:] = int(b).to_bytes(params.b_bytes, 'big')
+        y_int = self._cbc_mac_buffer(chain.chain, buf)
+
+        d4 = params.d4
+        tail = d4 - 16
+        if tail <= 0:
+            y = gmpy2.mpz(y_int >> (-8 * tail))
+        else:
+            ext = buf.ext
+            extra_blocks = len(ext) >> 4
+            self._bulk_ecb.encrypt(
+                (int.from_bytes(y_int.to_bytes(16, 'big') * extra_blocks, 'big') ^ params.ext_counters)
+                .to_bytes(16 * extra_blocks, 'big'),
+                output=ext,
+            )
+            y = gmpy2.mpz((y_int << (8 * tail)) | (int.from_bytes(ext, 'big') >> (8 * (len(ext) - tail))))
 
         return y % (params.mod_even if (i & 1) == 0 else params.mod_odd)
 
-    def _to_digits(self, value: int, width: int) -> str:
-        """Render ``value`` as a radix string, left zero-padded to ``width``."""
-        if width <= 0:
-            return ''
-        s = gmpy2.digits(value, self._radix)
-        if len(s) < width:
-            return '0' * (width - len(s)) + s
-        return s
+    def _feistel_mpz(
+        self, n: int, tweak: TweakLike, a: 'gmpy2.mpz', b: 'gmpy2.mpz', decrypt: bool
+    ) -> tuple['gmpy2.mpz', 'gmpy2.mpz']:
+        """Run the Feistel network on ``gmpy2.mpz`` halves end to end.
+
+        Used for messages of ``_MPZ_MIN_DIGITS`` or more, where halves are
+        thousands of digits long. Callers parse and render through GMP's
+        subquadratic radix conversion and every add, subtract and reduction
+        here is an mpz operation, so cost grows near-linearly with ``n``.
+        """
+        mpz = gmpy2.mpz
+        _, params, chain = self._prepare(n, tweak)
+        buf = self._round_buffer(params)
+        mod_even, mod_odd = mpz(params.mod_even), mpz(params.mod_odd)
+        params = params._replace(mod_even=mod_even, mod_odd=mod_odd)
+
+        if decrypt:
+            for i in range(self.NUM_ROUNDS - 1, -1, -1):
+                c = b
+                b = a
+                a = (c - self._F_mpz(params, chain, buf, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
+        else:
+            for i in range(self.NUM_ROUNDS):
+                c = (a + self._F_mpz(params, chain, buf, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
+                a, b = b, c
+
+        return a, b
+
+    def _feistel_halves(
+        self, n: int, tweak: TweakLike, a: int, b: int, decrypt: bool
+    ) -> tuple[int, int]:
+        """Run the Feistel network on the integer halves of a message."""
+        _, params, chain = self._prepare(n, tweak)
+        buf = self._round_buffer(params)
+        mod_even, mod_odd = params.mod_even, params.mod_odd
+
+        if decrypt:
+            for i in range(self.NUM_ROUNDS - 1, -1, -1):
+                c = b
+                b = a
+                a = (c - self._F(params, chain, buf, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
+        else:
+            for i in range(self.NUM_ROUNDS):
+                c = (a + self._F(params, chain, buf, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
+                a, b = b, c
+
+        return a, b
+
+    def _round_table_halves(
+        self, n: int, tweak: TweakLike, a: int, b: int, decrypt: bool
+    ) -> tuple[int, int]:
+        """Run the Feistel network on integer halves with the round tables."""
+        rt = self.round_table(n, tweak)
+        if decrypt:
+            for table, mod in zip(reversed(rt.tables), reversed(rt.mods)):
+                a, b = (b - table[a]) % mod, a
+        else:
+            for table, mod in zip(rt.tables, rt.mods):
+                a, b = b, (a + table[b]) % mod
+        return a, b
+
+    def codebook(self, n: int, tweak: TweakLike) -> Codebook:
+        """Return the permutation codebook for ``(n, tweak)``, building it if needed.
+
+        Codebooks are kept in an LRU cache of ``codebook_cache_size`` entries.
+        This works regardless of ``codebook_threshold``, which only controls
+        whether :meth:`encrypt`/:meth:`decrypt` consult codebooks on their own.
+        """
+        key = (n, self._tweak_bytes(tweak))
+        codebook = self._mapped.get(key) if self._mapped else None
+        if type(codebook) is not Codebook:
+            codebook = self._codebooks.get(key)
+        if codebook is None:
+            codebook = Codebook.build(self, n, tweak)
+            self._codebooks.put(key, codebook)
+        return codebook
+
+    def round_table(
+        self, n: int, tweak: TweakLike, executor: Optional[Executor] = None
+    ) -> RoundTable:
+        """Return the round-function tables for ``(n, tweak)``, building them if needed.
 
-    def encrypt(self, tweak: Union[FFXInteger, int], plaintext: FFXInteger) -> FFXInteger:
-        """Encrypt a plaintext using FFX.
+        Tables are kept in an LRU cache of ``round_table_cache_size`` entries.
+        Pass a ``concurrent.futures`` executor to parallelize a build. The
+        returned object reports its ``nbytes`` and ``build_seconds``.
+        """
+        key = (n, self._tweak_bytes(tweak))
+        table = self._mapped.get(key) if self._mapped else None
+        if type(table) is not RoundTable:
+            table = self._round_tables.get(key)
+        if table is None:
+            table = RoundTable.build(self, n, tweak, executor)
+            self._round_tables.put(key, table)
+        return table
+
+    def save_table(
+        self, path: Union[str, Path], n: int, tweak: TweakLike,
+        kind: str = 'codebook',
+    ) -> Path:
+        """Write the codebook or round tables for ``(n, tweak)`` to a file.
+
+        The tables are built first if they are not cached. Other processes
+        map the file with :meth:`load_table` instead of building their own
+        copy. The file holds the whole permutation for ``(n, tweak)``, so
+        protect it like the key.
 
         Args:
-            tweak: The tweak value (can be FFXInteger or 0 for no tweak)
-            plaintext: The message to encrypt as FFXInteger
+            path: File to write (replaced atomically)
+            n: Message length in radix digits
+            tweak: The tweak the tables are built for
+            kind: ``'codebook'`` or ``'round_table'``
 
         Returns:
-            Encrypted message as FFXInteger
+            The path written
+
+        Raises:
+            ValueError: If ``kind`` is unknown
         """
-        n = len(plaintext)
-        l = n // 2
-        radix = self._radix
+        table: Union[Codebook, RoundTable]
+        if kind == 'codebook':
+            table = self.codebook(n, tweak)
+        elif kind == 'round_table':
+            table = self.round_table(n, tweak)
+        else:
+            raise ValueError(f"Unknown table kind {kind!r}; use 'codebook' or 'round_table'")
+        return write_table_file(self, path, n, self._tweak_bytes(tweak), table)
 
-        # Run the Feistel network on the raw integer halves; only the final
-        # result is turned back into an FFXInteger. This avoids constructing a
-        # padded-string FFXInteger (and re-parsing it) on every round.
-        s = plaintext._x
-        a = int(s[:l], radix) if l else 0
-        b = int(s[l:], radix)
+    def load_table(self, path: Union[str, Path], verify: bool = True) -> Union[Codebook, RoundTable]:
+        """Map a file written by :meth:`save_table` and use it for its (n, tweak).
 
-        _, params, q_prefix = self._prepare(n, tweak)
-        mod_even, mod_odd = params.mod_even, params.mod_odd
+        The file is mapped read-only and lookups read straight from the
+        mapping, so every process that loads it shares one page-cache copy
+        and loading does no table-building AES work. Messages of that length
+        and tweak then use the table whatever ``codebook_threshold`` and
+        ``round_table_threshold`` are.
 
-        for i in range(self.NUM_ROUNDS):
-            c = (a + self._F(params, q_prefix, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
-            a, b = b, c
+        The header carries an identifier derived from the key and the file
+        ends with a keyed MAC, so a file written under another key or
+        altered afterwards is rejected.
 
-        return FFXInteger(self._to_digits(a, l) + self._to_digits(b, n - l), radix=radix)
+        Args:
+            path: File written by :meth:`save_table` under the same key
+            verify: Check the MAC over the whole file (reads every page once)
+
+        Returns:
+            The mapped :class:`Codebook` or :class:`RoundTable`
 
-    def decrypt(self, tweak: Union[FFXInteger, int], ciphertext: FFXInteger) -> FFXInteger:
-        """Decrypt a ciphertext using FFX.
+        Raises:
+            ValueError: If the file is for another key, radix, format version
+                or byte order, or fails its integrity check
+        """
+        n, tweak, table = map_table_file(self, path, verify)
+        self._mapped[n, tweak] = table
+        self._mapped_lengths.add(n)
+        return table
+
+    def _mapped_strategy(self, n: int, tweak: TweakLike, strategy: str) -> str:
+        """``strategy``, or a table lookup if a loaded table file covers ``(n, tweak)``."""
+        table = self._mapped.get((n, self._tweak_bytes(tweak)))
+        if table is None or strategy == 'codebook':
+            return strategy
+        return 'codebook' if type(table) is Codebook else 'round_table'
+
+    def cache_stats(self) -> dict[str, CacheStats]:
+        """Size and hit/miss/eviction counters of each of the encrypter's caches.
+
+        Keys are ``'params'`` (per-(n, t) round-function parameters),
+        ``'chains'`` (per-(n, tweak) CBC-MAC states), ``'codebooks'`` and
+        ``'round_tables'``, plus ``'memo'`` when the memo is enabled.
+        ``nbytes`` is an estimate, and ``None`` for the chain cache, whose
+        entries are small and fixed-size.
+        """
+        return {
+            'params': self._P_cache.stats(),
+            'chains': self._chain_cache.stats(),
+            'codebooks': self._codebooks.stats(),
+            'round_tables': self._round_tables.stats(),
+            **super().cache_stats(),
+        }
+
+    def _batch_bucket(self, batch: int) -> int:
+        """The power-of-two batch size ``batch`` is planned as."""
+        return min(1 << (batch.bit_length() - 1), self._PLAN_MAX_BATCH)
+
+    def explain(
+        self, n: int, t: int = 0, batch: int = 1, repetition: Optional[int] = None
+    ) -> Plan:
+        """Show how messages of one shape are run, and the estimated cost of each option.
 
         Args:
-            tweak: The tweak value (must match the one used for encryption)
-            ciphertext: The encrypted message as FFXInteger
+            n: Message length in radix digits
+            t: Tweak length
+            batch: Messages per call (as passed to :meth:`encrypt_many`)
+            repetition: Messages expected per (n, tweak), over which a table
+                build is amortized; ``None`` treats builds as free
 
         Returns:
-            Decrypted message as FFXInteger
+            The :class:`~ffx.planner.Plan`; ``print()`` it for a summary
+
+        Example:
+            >>> print(ffx_obj.explain(16, 6, batch=10000))
+        """
+        return make_plan(self, n, t, batch, repetition)
+
+    def _strategy(
+        self, n: int, batch: int = 1, t: int = 0, repetition: Optional[int] = None
+    ) -> str:
+        """The strategy the cost model picks for ``batch`` messages of shape ``(n, t)``.
+
+        ``repetition`` is the number of messages per (n, tweak) a table build
+        is amortized over, as for :meth:`explain`. Batch sizes and
+        repetitions are planned in power-of-two buckets, rounded down.
+        """
+        if repetition is not None:
+            repetition = 1 << (repetition.bit_length() - 1)
+        key = (n, t, self._batch_bucket(batch), repetition)
+        strategy: Optional[str] = self._strategies.get(key)
+        if strategy is None:
+            strategy = make_plan(self, n, t, key[2], repetition).strategy
+            self._strategies.put(key, strategy)
+        return strategy
+
+    def _uses(self, n: int, tweak_bytes: bytes, count: int) -> int:
+        """Count ``count`` more messages under ``(n, tweak)``; return the total so far."""
+        uses = self._table_uses
+        key = (n, tweak_bytes)
+        total: int = uses.get(key, 0) + count
+        uses.put(key, total)
+        return total
+
+    def _planned(self, n: int, tweak: TweakLike, count: int = 1) -> str:
+        """The strategy for ``count`` messages of length ``n`` under one tweak.
+
+        A table already built for ``(n, tweak)`` is used as it is. Otherwise
+        a build is amortized over the messages run under the tweak so far,
+        so a table is only built once its uses have paid for it.
         """
-        n = len(ciphertext)
+        if n > self._table_max_n:
+            return self._strategy(n, count, self._tweak_length(tweak))
+        tweak_bytes = self._tweak_bytes(tweak)
+        key = (n, tweak_bytes)
+        if key in self._codebooks:
+            return 'codebook'
+        strategy = self._strategy(n, count, len(tweak_bytes), self._uses(n, tweak_bytes, count))
+        if strategy != 'codebook' and key in self._round_tables:
+            return 'round_table'
+        return strategy
+
+    def _planned_rows(self, n: int, tweaks: Sequence[bytes]) -> str:
+        """The strategy for a batch of ``n``-digit rows with per-row tweak bytes.
+
+        Table builds are amortized over the mean number of messages run under
+        each distinct tweak of the batch.
+        """
+        t = len(tweaks[0])
+        if n > self._table_max_n:
+            return self._strategy(n, len(tweaks), t)
+        counts = Counter(tweaks)
+        total = sum(self._uses(n, tweak_bytes, count) for tweak_bytes, count in counts.items())
+        return self._strategy(n, len(tweaks), t, total // len(counts))
+
+    def _observe(self, strategy: str, n: int, t: int, batch: int, seconds: float) -> None:
+        """Refine the cost model with one measured call of shape ``(n, t)``."""
+        model = self._cost_model
+        bucket = self._batch_bucket(batch)
+        key = (strategy, n, t, bucket)
+        estimated: Optional[float] = self._raw_estimates.get(key)
+        if estimated is None:
+            estimated = model.raw_estimate(strategy, self, n, self._layout(n, t), bucket)
+            self._raw_estimates.put(key, estimated)
+        observed = seconds * 1e6 / batch
+        # Clamp outliers (a table build, a GC pause) to a factor of 4.
+        factor = model.factors[strategy]
+        observed = min(max(observed, 0.25 * factor * estimated), 4 * factor * estimated)
+        if model.observe(strategy, estimated, observed):
+            self._strategies.clear()
+
+    def _prepare_many(
+        self, tweaks, texts: Sequence[FFXInteger]
+    ) -> tuple[int, '_FParams', list['_TweakChain'], list[int], list[int]]:
+        """Resolve shared parameters and split every row of a batch.
+
+        ``tweaks`` is either one tweak applied to every row or a list/tuple with
+        one tweak per row. All rows must share the message length, and all
+        tweaks the tweak length, since both are baked into the header block P.
+        """
+        count = len(texts)
+        n = len(texts[0])
         l = n // 2
         radix = self._radix
 
-        s = ciphertext._x
-        a = int(s[:l], radix) if l else 0
-        b = int(s[l:], radix)
+        if isinstance(tweaks, (list, tuple)):
+            if len(tweaks) != count:
+                raise ValueError(
+                    f"Got {len(tweaks)} tweaks for {count} messages"
+                )
+            seen: dict = {}
+            chains = []
+            t = None
+            for tweak in tweaks:
+                key = self._tweak_bytes(tweak)
+                chain = seen.get(key)
+                if chain is None:
+                    tweak_t, params, chain = self._prepare(n, tweak)
+                    if t is None:
+                        t = tweak_t
+                    elif tweak_t != t:
+                        raise ValueError(
+                            "All tweaks in a batch must have the same length; "
+                            "use BatchScheduler for mixed shapes"
+                        )
+                    seen[key] = chain
+                chains.append(chain)
+        else:
+            _, params, chain = self._prepare(n, tweaks)
+            chains = [chain] * count
+
+        a_list = []
+        b_list = []
+        for text in texts:
+            s = text._x
+            if len(s) != n:
+                raise ValueError(
+                    "All messages in a batch must have the same length; "
+                    "use BatchScheduler for mixed shapes"
+                )
+            a_list.append(int(s[:l], radix) if l else 0)
+            b_list.append(int(s[l:], radix))
+
+        return n, params, chains, a_list, b_list
+
+    def _run_values(
+        self, tweak: TweakLike, n: int, xs: Sequence[int], decrypt: bool
+    ) -> list[int]:
+        """Encrypt or decrypt ``n``-digit integer values under one tweak, no FFXIntegers.
+
+        Used by :meth:`encrypt_range` and :class:`~ffx.domain.IntegerDomain`;
+        values must already be in range.
+        """
+        strategy = self._planned(n, tweak, len(xs))
+        if self._mapped:
+            strategy = self._mapped_strategy(n, tweak, strategy)
+        if strategy != 'batch':
+            return [self._run_int(strategy, tweak, x, n, decrypt) for x in xs]
+
+        _, params, chain = self._prepare(n, tweak)
+        split = self._radix ** (n - n // 2)
+        rows = self._decrypt_rows if decrypt else self._encrypt_rows
+        A, B = rows(params, [chain] * len(xs), [x // split for x in xs], [x % split for x in xs])
+        return [a * split + b for a, b in zip(A, B)]
+
+    def _run_rows(self, tweaks, texts: Sequence[FFXInteger], decrypt: bool) -> list[FFXInteger]:
+        """Run every row of a batch with the strategy planned for its size."""
+        count = len(texts)
+        n = len(texts[0])
+        strategies: Optional[list[str]] = None
+        if isinstance(tweaks, (list, tuple)):
+            # _run_many has already turned per-row tweaks into their bytes.
+            t = len(tweaks[0])
+            strategy = self._planned_rows(n, tweaks)
+            if self._mapped:
+                strategies = [self._mapped_strategy(n, tweak, strategy) for tweak in tweaks]
+                if strategies.count(strategy) == count:
+                    strategies = None
+        else:
+            t = self._tweak_length(tweaks)
+            strategy = self._planned(n, tweaks, count)
+            if self._mapped:
+                strategy = self._mapped_strategy(n, tweaks, strategy)
+        radix = self._radix
+        start = time.perf_counter()
 
-        _, params, q_prefix = self._prepare(n, tweak)
+        if strategies is not None:
+            results = self._run_mapped_rows(strategy, strategies, tweaks, texts, decrypt)
+        elif strategy == 'batch':
+            n, params, chains, A, B = self._prepare_many(tweaks, texts)
+            rows = self._decrypt_rows if decrypt else self._encrypt_rows
+            A, B = rows(params, chains, A, B)
+            results = self._join_many(n, A, B)
+        else:
+            self._check_many(tweaks, texts)
+            if not isinstance(tweaks, (list, tuple)):
+                tweaks = [tweaks] * count
+            run = self._run_str
+            results = [
+                FFXInteger(run(strategy, tweak, text._x, decrypt), radix=radix)
+                for tweak, text in zip(tweaks, texts)
+            ]
+
+        self._observe(strategy, n, t, count, time.perf_counter() - start)
+        return results
+
+    def _run_mapped_rows(
+        self, strategy: str, strategies: list[str], tweaks: Sequence[bytes],
+        texts: Sequence[FFXInteger], decrypt: bool,
+    ) -> list[FFXInteger]:
+        """Run per-row-tweak rows of which some are covered by a loaded table file.
+
+        ``strategies`` holds each row's strategy after the table-file lookup.
+        Those rows are looked up one by one; when ``strategy`` is ``'batch'``
+        the remaining rows still run in lockstep.
+        """
+        self._check_many(tweaks, texts)
+        radix = self._radix
+        run = self._run_str
+        results: list[FFXInteger] = [None] * len(texts)  # type: ignore[list-item]
+        lockstep = []
+        for index, (row_strategy, tweak, text) in enumerate(zip(strategies, tweaks, texts)):
+            if row_strategy == 'batch':
+                lockstep.append(index)
+            else:
+                results[index] = FFXInteger(run(row_strategy, tweak, text._x, decrypt), radix=radix)
+        if lockstep:
+            n, params, chains, A, B = self._prepare_many(
+                [tweaks[i] for i in lockstep], [texts[i] for i in lockstep]
+            )
+            rows = self._decrypt_rows if decrypt else self._encrypt_rows
+            A, B = rows(params, chains, A, B)
+            for index, value in zip(lockstep, self._join_many(n, A, B)):
+                results[index] = value
+        return results
+
+    def _encrypt_rows(
+        self, params: '_FParams', chains: Sequence['_TweakChain'], A: list[int], B: list[int]
+    ) -> tuple[list[int], list[int]]:
+        """Run the forward Feistel network in lockstep over split rows."""
+        if len(A) > self._BATCH_CHUNK:
+            return self._in_chunks(self._encrypt_rows, params, chains, A, B)
         mod_even, mod_odd = params.mod_even, params.mod_odd
+        for i in range(self.NUM_ROUNDS):
+            mod = mod_even if (i & 1) == 0 else mod_odd
+            ys = self._F_many(params, chains, i, B)
+            A, B = B, [(a + y) % mod for a, y in zip(A, ys)]
+        return A, B
 
+    def _decrypt_rows(
+        self, params: '_FParams', chains: Sequence['_TweakChain'], A: list[int], B: list[int]
+    ) -> tuple[list[int], list[int]]:
+        """Run the inverse Feistel network in lockstep over split rows."""
+        if len(A) > self._BATCH_CHUNK:
+            return self._in_chunks(self._decrypt_rows, params, chains, A, B)
+        mod_even, mod_odd = params.mod_even, params.mod_odd
         for i in range(self.NUM_ROUNDS - 1, -1, -1):
-            c = b
-            b = a
-            a = (c - self._F(params, q_prefix, i, b)) % (mod_even if (i & 1) == 0 else mod_odd)
+            mod = mod_even if (i & 1) == 0 else mod_odd
+            ys = self._F_many(params, chains, i, A)
+            A, B = [(c - y) % mod for c, y in zip(B, ys)], A
+        return A, B
+
+    def _join_many(self, n: int, A: list[int], B: list[int]) -> list[FFXInteger]:
+        """Render the final (a, b) halves of a batch back into FFXIntegers."""
+        l = n // 2
+        radix = self._radix
+        to_digits = self._to_digits
+        return [
+            FFXInteger(to_digits(a, l) + to_digits(b, n - l), radix=radix)
+            for a, b in zip(A, B)
+        ]
+
+    def _feistel_str(
+        self, tweak: TweakLike, s: str, decrypt: bool
+    ) -> str:
+        """Encrypt or decrypt the radix string ``s`` with the planned strategy.
+
+        One call in ``_SAMPLE_INTERVAL`` is timed to refine the cost model.
+        """
+        n = len(s)
+        strategy = self._planned(n, tweak)
+        if self._mapped:
+            strategy = self._mapped_strategy(n, tweak, strategy)
+        self._calls += 1
+        if self._calls & (self._SAMPLE_INTERVAL - 1):
+            return self._run_str(strategy, tweak, s, decrypt)
+        start = time.perf_counter()
+        result = self._run_str(strategy, tweak, s, decrypt)
+        self._observe(strategy, n, self._tweak_length(tweak), 1, time.perf_counter() - start)
+        return result
+
+    def _run_str(
+        self, strategy: str, tweak: TweakLike, s: str, decrypt: bool
+    ) -> str:
+        n = len(s)
+        l = n // 2
+        radix = self._radix
+        to_digits = self._to_digits
+
+        if strategy == 'codebook':
+            codebook = self.codebook(n, tweak)
+            table = codebook.inverse if decrypt else codebook.forward
+            return to_digits(table[int(s, radix)], n)
+        if strategy == 'mpz':
+            mpz = gmpy2.mpz
+            a, b = self._feistel_mpz(n, tweak, mpz(s[:l], radix), mpz(s[l:], radix), decrypt)
+            return to_digits(a, l) + to_digits(b, n - l)
+
+        # Run the Feistel network on the raw integer halves; only the final
+        # result is rendered back into a string.
+        halves = self._round_table_halves if strategy == 'round_table' else self._feistel_halves
+        a, b = halves(n, tweak, int(s[:l], radix) if l else 0, int(s[l:], radix), decrypt)
+        return to_digits(a, l) + to_digits(b, n - l)
+
+    def _feistel_int(
+        self, tweak: TweakLike, value: int, n: int, decrypt: bool
+    ) -> int:
+        """Encrypt or decrypt the ``n``-digit message whose integer value is ``value``."""
+        self._check_int(value, n)
+        strategy = self._planned(n, tweak)
+        if self._mapped:
+            strategy = self._mapped_strategy(n, tweak, strategy)
+        return self._run_int(strategy, tweak, value, n, decrypt)
+
+    def _run_int(
+        self, strategy: str, tweak: TweakLike, value: int, n: int, decrypt: bool
+    ) -> int:
+        """Run the integer value of an ``n``-digit message with ``strategy``."""
+        if strategy == 'codebook':
+            codebook = self.codebook(n, tweak)
+            return (codebook.inverse if decrypt else codebook.forward)[value]
+
+        split: int = self._radix ** (n - n // 2)
+        if strategy == 'mpz':
+            a, b = gmpy2.f_divmod(gmpy2.mpz(value), split)
+            a, b = self._feistel_mpz(n, tweak, a, b, decrypt)
+            return int(a * split + b)
+
+        halves = self._round_table_halves if strategy == 'round_table' else self._feistel_halves
+        a, b = divmod(value, split)
+        a, b = halves(n, tweak, a, b, decrypt)
+        return a * split + b
 
-        return FFXInteger(self._to_digits(a, l) + self._to_digits(b, n - l), radix=radix)
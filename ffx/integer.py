@@ -34,6 +34,10 @@ class FFXInteger:
     _gmpy_mpz_type = type(gmpy2.mpz(0))
     _gmpy_mpfr_type = type(gmpy2.mpfr(0))
 
+    # Strings at least this long are parsed by GMP: CPython's int() is
+    # quadratic and rejects decimal strings over sys.get_int_max_str_digits().
+    _MPZ_PARSE_MIN_DIGITS = 1024
+
     def __init__(
         self, 
         x: Union[int, str, 'FFXInteger', float], 
@@ -51,12 +55,13 @@ class FFXInteger:
             UnknownTypeException: If x is an unsupported type
         """
         x_type = type(x)
-        
+        self._x: str
+
         if x_type in (self._gmpy_mpz_type, int):
             self._x = gmpy2.digits(x, radix)
-        elif x_type is FFXInteger:
+        elif isinstance(x, FFXInteger):
             self._x = x._x
-        elif x_type is str:
+        elif isinstance(x, str):
             self._x = x
         elif x_type in (float, self._gmpy_mpfr_type):
             self._x = gmpy2.digits(gmpy2.mpz(x), radix)
@@ -64,6 +69,7 @@ class FFXInteger:
             raise UnknownTypeException(f"Unsupported type: {type(x)}")
 
         self._radix = radix
+        self._blocksize: int | None
         if blocksize:
             self._blocksize = max(blocksize, len(self._x))
             self._x = '0' * (blocksize - len(self._x)) + self._x
@@ -143,7 +149,10 @@ class FFXInteger:
             The integer value of this FFXInteger
         """
         if self._as_int is None:
-            self._as_int = int(self._x, self._radix)
+            if len(self._x) < self._MPZ_PARSE_MIN_DIGITS:
+                self._as_int = int(self._x, self._radix)
+            else:
+                self._as_int = int(gmpy2.mpz(self._x, self._radix))
         return self._as_int
 
     def to_bytes(self, blocksize: int | None = None) -> bytes:
@@ -0,0 +1,237 @@
+"""Cost model and execution plans for the FFX encrypter."""
+
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from .encrypter import FFXEncrypter, _FParams
+
+
+# Every way the encrypter can run a message, in the order plans list them.
+STRATEGIES = ('codebook', 'round_table', 'batch', 'scalar', 'mpz')
+
+
+class Plan(NamedTuple):
+    """The strategy the encrypter uses for one shape, and why.
+
+    Returned by :meth:`FFXEncrypter.explain`. ``costs`` holds the model's
+    estimate, in microseconds per message, for every strategy that can run
+    the shape; ``excluded`` gives the reason for every one that cannot.
+    """
+
+    n: int                      # message length, in radix digits
+    t: int                      # tweak length
+    batch: int                  # messages per call
+    strategy: str               # the cheapest entry of ``costs``
+    mac: str                    # 'ecb' (one inline block) or 'cbc' per round
+    round_calls: int            # AES calls per message per round
+    round_blocks: int           # AES blocks per message per round
+    chain_blocks: int           # AES blocks per new tweak, before the cache
+    costs: dict[str, float]     # strategy -> estimated us per message
+    excluded: dict[str, str]    # strategy -> why it was not considered
+
+    def __str__(self) -> str:
+        lines = [
+            f"n={self.n} t={self.t} batch={self.batch}: {self.strategy}",
+            f"  per round: {self.round_calls} AES call(s), "
+            f"{self.round_blocks} block(s), {self.mac.upper()} MAC; "
+            f"{self.chain_blocks} block(s) per new tweak",
+        ]
+        for strategy, cost in sorted(self.costs.items(), key=lambda item: item[1]):
+            marker = '  <- chosen' if strategy == self.strategy else ''
+            lines.append(f"  {strategy:<12s}{cost:10.2f} us/message{marker}")
+        for strategy, reason in self.excluded.items():
+            lines.append(f"  {strategy:<12s}   not used: {reason}")
+        return '\n'.join(lines)
+
+
+class CostModel:
+    """Per-message cost estimates for each strategy, in microseconds.
+
+    The estimates start from the AES work the FFX-A2 round function does for
+    a shape (calls and blocks per round, from the spec's block layout) and a
+    few per-call and per-digit Python overheads. The seed coefficients below
+    were measured on an x86-64 host with AES-NI and CPython 3.11, with the
+    AES call cost depending on the backend (see :mod:`ffx.backends`). Each
+    strategy also carries a correction factor that :meth:`observe` moves
+    towards the ratio of measured to estimated time, so the model adapts to
+    the host it runs on.
+    """
+
+    # Seed coefficients, in microseconds.
+    MESSAGE_US = 4.0              # parse, dispatch and render one short message
+    ROUND_US = 0.75               # Python overhead of one scalar round
+    AES_CALL_US = {               # one call into the cipher, per backend
+        'pycryptodome': 0.8,
+        'openssl': 0.2,
+    }
+    AES_BLOCK_US = 0.02           # one 16-byte block inside a call
+    CBC_US = 0.6                  # extra cost of a multi-block CBC MAC call
+    EXT_US = 0.5                  # extra cost of the d+4 extension
+    INT_QUADRATIC_US = 1.5e-5     # per digit squared, native int conversions
+    MPZ_US = 2.0                  # extra fixed cost of the mpz path
+    MPZ_DIGIT_US = 0.015          # per digit on the mpz path
+    BATCH_US = 15.0               # fixed cost of one lockstep batch call
+    BATCH_CALL_US = 1.6           # one whole-batch AES call in lockstep
+    BATCH_ROW_US = 1.0            # parse and render one row of a batch
+    BATCH_ROW_BLOCK_US = 0.3      # one row's block in one lockstep round
+    CODEBOOK_US = 0.6             # one codebook lookup
+    ROUND_TABLE_US = 1.6          # ten round-table lookups
+
+    # Weight of each new observation in a strategy's correction factor.
+    LEARNING_RATE = 0.1
+
+    def __init__(self, factors: Optional[dict[str, float]] = None):
+        """Start from unit factors, or from ``factors`` (e.g. a calibration profile)."""
+        self.factors = dict.fromkeys(STRATEGIES, 1.0)
+        if factors:
+            self.factors.update((s, f) for s, f in factors.items() if s in self.factors)
+        # Factors as of the last time observe() reported a drift.
+        self._settled = dict(self.factors)
+
+    @staticmethod
+    def counts(params: '_FParams', inline_max_blocks: int) -> tuple[int, int, int]:
+        """AES calls, AES blocks and MAC blocks in Q for one round of a shape.
+
+        A Q tail of up to ``inline_max_blocks`` blocks is folded one ECB call
+        per block; a longer one is a single CBC call.
+        """
+        q_blocks = -(-(1 + params.b_bytes) // 16)
+        ext_blocks = -(-max(params.d4 - 16, 0) // 16)
+        calls = (q_blocks if q_blocks <= inline_max_blocks else 1) + (ext_blocks > 0)
+        return calls, q_blocks + ext_blocks, q_blocks
+
+    def raw_estimate(
+        self, strategy: str, encrypter: 'FFXEncrypter', n: int, params: '_FParams', batch: int
+    ) -> float:
+        """Seed-coefficient estimate of one message's cost, before correction."""
+        rounds = encrypter.NUM_ROUNDS
+        calls, blocks, q_blocks = self.counts(params, encrypter._MAC_INLINE_MAX_BLOCKS)
+        cbc = q_blocks > encrypter._MAC_INLINE_MAX_BLOCKS
+
+        if strategy == 'codebook':
+            return self.CODEBOOK_US
+        if strategy == 'round_table':
+            return self.ROUND_TABLE_US
+        if strategy == 'batch':
+            # Lockstep rounds make one whole-batch call per Q block.
+            batch_calls = q_blocks + (params.d4 > 16)
+            fixed = self.BATCH_US + rounds * batch_calls * self.BATCH_CALL_US
+            per_row = self.BATCH_ROW_US + rounds * blocks * self.BATCH_ROW_BLOCK_US
+            return fixed / batch + per_row
+
+        per_round = (
+            self.ROUND_US
+            + calls * self.AES_CALL_US.get(encrypter._backend.name, 0.8)
+            + blocks * self.AES_BLOCK_US
+            + (self.CBC_US if cbc else 0.0)
+            + (self.EXT_US if params.d4 > 16 else 0.0)
+        )
+        cost = self.MESSAGE_US + rounds * per_round
+        if strategy == 'mpz':
+            return cost + self.MPZ_US + n * self.MPZ_DIGIT_US
+        if encrypter._radix & (encrypter._radix - 1):
+            cost += n * n * self.INT_QUADRATIC_US
+        return cost
+
+    def build_cost(
+        self, strategy: str, encrypter: 'FFXEncrypter', n: int, params: '_FParams'
+    ) -> float:
+        """Estimated cost of building a table for one (n, tweak), in microseconds."""
+        _, blocks, _ = self.counts(params, encrypter._MAC_INLINE_MAX_BLOCKS)
+        radix = encrypter._radix
+        if strategy == 'codebook':
+            rows: int = radix ** n
+            per_row = self.BATCH_ROW_US + encrypter.NUM_ROUNDS * blocks * self.BATCH_ROW_BLOCK_US
+            return rows * per_row
+        rows = encrypter.NUM_ROUNDS * radix ** (n - n // 2)
+        return rows * blocks * self.BATCH_ROW_BLOCK_US
+
+    def estimate(
+        self,
+        strategy: str,
+        encrypter: 'FFXEncrypter',
+        n: int,
+        params: '_FParams',
+        batch: int,
+        repetition: Optional[int] = None,
+    ) -> float:
+        """Corrected cost of one message, with any table build amortized.
+
+        ``repetition`` is the number of messages expected per (n, tweak); a
+        table build is spread across them. ``None`` means unbounded, so
+        builds are free.
+        """
+        cost = self.raw_estimate(strategy, encrypter, n, params, batch) * self.factors[strategy]
+        if repetition and strategy in ('codebook', 'round_table'):
+            cost += self.build_cost(strategy, encrypter, n, params) / repetition
+        return cost
+
+    def observe(self, strategy: str, estimated_us: float, observed_us: float) -> bool:
+        """Fold one timing into ``strategy``'s correction factor.
+
+        Returns:
+            True if the factor has drifted more than 10% since the last time
+            this returned True, so cached choices should be revisited
+        """
+        old = self.factors[strategy]
+        new = self.factors[strategy] = old + self.LEARNING_RATE * (observed_us / estimated_us - old)
+        settled = self._settled[strategy]
+        if abs(new - settled) > 0.1 * settled:
+            self._settled.update(self.factors)
+            return True
+        return False
+
+
+def candidates(
+    encrypter: 'FFXEncrypter', n: int, batch: int
+) -> tuple[list[str], dict[str, str]]:
+    """Split the strategies into those that can run ``n`` and those that cannot."""
+    radix = encrypter._radix
+    excluded = {}
+    if n > encrypter._codebook_max_n:
+        excluded['codebook'] = f"codebook_threshold does not cover n={n}"
+    if n > encrypter._round_table_max_n:
+        excluded['round_table'] = f"round_table_threshold does not cover n={n}"
+
+    # Native ints cannot parse decimal-like halves over CPython's digit limit.
+    limit = getattr(sys, 'get_int_max_str_digits', lambda: 0)()
+    if limit and radix & (radix - 1) and n - n // 2 > limit:
+        reason = f"halves longer than the {limit}-digit int limit"
+        excluded['scalar'] = excluded['batch'] = reason
+    if batch < 2:
+        excluded.setdefault('batch', "a single message")
+    if n < encrypter._MPZ_MIN_DIGITS:
+        excluded['mpz'] = f"n below _MPZ_MIN_DIGITS={encrypter._MPZ_MIN_DIGITS}"
+
+    return [s for s in STRATEGIES if s not in excluded], excluded
+
+
+def make_plan(
+    encrypter: 'FFXEncrypter', n: int, t: int, batch: int, repetition: Optional[int] = None
+) -> Plan:
+    """Estimate every strategy for a shape and pick the cheapest."""
+    model = encrypter._cost_model
+    params = encrypter._layout(n, t)
+    usable, excluded = candidates(encrypter, n, batch)
+    costs = {
+        strategy: model.estimate(strategy, encrypter, n, params, batch, repetition)
+        for strategy in usable
+    }
+
+    calls, blocks, q_blocks = model.counts(params, encrypter._MAC_INLINE_MAX_BLOCKS)
+    prefix_blocks = (t + params.q_zero_pad) >> 4
+    return Plan(
+        n=n,
+        t=t,
+        batch=batch,
+        strategy=min(costs, key=costs.__getitem__),
+        mac='cbc' if q_blocks > encrypter._MAC_INLINE_MAX_BLOCKS else 'ecb',
+        round_calls=calls,
+        round_blocks=blocks,
+        chain_blocks=prefix_blocks,
+        costs=costs,
+        excluded=excluded,
+    )
@@ -0,0 +1,277 @@
+"""FFX encrypter specialized for one fixed (radix, n, t) shape."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .cache import LRUCache
+from .integer import FFXInteger
+
+if TYPE_CHECKING:
+    from .encrypter import FFXEncrypter, TweakLike
+
+
+# str % spec that renders a radix natively; others go through the encrypter.
+_PERCENT_SPECS = {8: '%0*o', 10: '%0*d', 16: '%0*x'}
+
+# A compiled round loop: (a, b, round bases) -> (a, b).
+_Rounds = Callable[[int, int, tuple[int, ...]], tuple[int, int]]
+
+
+def _compile_rounds(
+    ecb_encrypt: Callable[[bytes], bytes], shift: int, mods: tuple[int, ...]
+) -> tuple[_Rounds, _Rounds]:
+    """Build the forward and inverse Feistel loops for one shape.
+
+    Both closures take the two halves and the per-round MAC bases for a tweak
+    (see :meth:`ShapeEncrypter._round_bases`) and return the final halves.
+    The cipher, the truncation shift and the moduli are bound as closure
+    constants; every per-call branch of :meth:`FFXEncrypter._F` is gone.
+    """
+    from_bytes = int.from_bytes
+    enc_mods = mods
+    dec_mods = tuple(reversed(mods))
+
+    def forward(a: int, b: int, bases: tuple[int, ...]) -> tuple[int, int]:
+        for base, mod in zip(bases, enc_mods):
+            a, b = b, (a + (from_bytes(ecb_encrypt((base ^ b).to_bytes(16, 'big')), 'big') >> shift)) % mod
+        return a, b
+
+    def inverse(a: int, b: int, bases: tuple[int, ...]) -> tuple[int, int]:
+        for base, mod in zip(reversed(bases), dec_mods):
+            a, b = (b - (from_bytes(ecb_encrypt((base ^ a).to_bytes(16, 'big')), 'big') >> shift)) % mod, a
+        return a, b
+
+    return forward, inverse
+
+
+class ShapeEncrypter:
+    """FFX encrypter compiled for a single message length and tweak length.
+
+    Services that encrypt one shape all day (16-digit cards, 9-digit SSNs)
+    pay for decisions on every call that never change: the ``(n, t)``
+    parameter lookup, the inline-vs-CBC MAC choice and the extension branch.
+    This class makes them once, at construction, and binds the result into a
+    closure whose round loop is one XOR, one AES call, a shift and a modular
+    add. For a given tweak, the CBC-MAC state after ``P`` and the tweak,
+    XORed with the round byte, is folded into one 128-bit base per round, so
+    the only varying input to each AES call is ``base ^ b``.
+
+    Results are identical to :meth:`FFXEncrypter.encrypt`, and go through
+    the encrypter's memo when it has one. Shapes whose MAC is not a single
+    block with no extension (very long messages) and shapes the encrypter's
+    thresholds send to a codebook or round table are passed through to the
+    encrypter unchanged. Those are fixed at construction; a table file
+    loaded later with :meth:`FFXEncrypter.load_table` is checked on every
+    call, and its ``(n, tweak)`` is passed through as well.
+
+    Example:
+        >>> cards = ffx.new(key, radix=10, length=16, tweak_length=6)
+        >>> cards.encrypt(FFXInteger('411111', radix=10), card)
+    """
+
+    def __init__(self, encrypter: 'FFXEncrypter', n: int, t: int = 0):
+        """Compile the round loop for one shape.
+
+        Args:
+            encrypter: Encrypter supplying the key, radix and caches
+            n: Message length in radix digits
+            t: Tweak length in characters (0 for no tweak)
+
+        Raises:
+            ValueError: If ``n`` is less than 1 or ``t`` is negative, or the
+                encrypter is not in FFX-A2 mode
+        """
+        if encrypter.MODE != 'ffx-a2':
+            raise ValueError(f"ShapeEncrypter needs an FFX-A2 encrypter, got {encrypter.MODE}")
+        if n < 1 or t < 0:
+            raise ValueError(f"Invalid shape: length={n}, tweak_length={t}")
+        self._encrypter = encrypter
+        self._radix = radix = encrypter._radix
+        self._n = n
+        self._t = t
+        self._l = n // 2
+        self._domain = radix ** n
+        self._split_mod: int = radix ** (n - n // 2)
+
+        params = encrypter._params(n, t)
+        self._params = params
+        self._percent = _PERCENT_SPECS.get(radix)
+
+        # Every case other than a one-block MAC with no extension goes to the
+        # encrypter's general path, as does anything its thresholds serve
+        # from tables. Mapped table files can arrive later; see _passes_through.
+        self._compiled = (
+            params.d4 <= 16
+            and params.b_bytes < 16
+            and n < encrypter._MPZ_MIN_DIGITS
+            and n > encrypter._codebook_max_n
+            and n > encrypter._round_table_max_n
+        )
+        if self._compiled:
+            mods = tuple(
+                params.mod_even if (i & 1) == 0 else params.mod_odd
+                for i in range(encrypter.NUM_ROUNDS)
+            )
+            self._forward, self._inverse = _compile_rounds(
+                encrypter._ecb_block, 8 * (16 - params.d4), mods
+            )
+            self._bases = LRUCache(encrypter._chain_cache.capacity)
+            # A tweak of the wrong length never gets this far, so () is unused.
+            self._no_tweak_bases = self._round_bases(b'') if t == 0 else ()
+
+    @property
+    def length(self) -> int:
+        """Message length, in radix digits, this encrypter was compiled for."""
+        return self._n
+
+    @property
+    def tweak_length(self) -> int:
+        """Tweak length this encrypter was compiled for."""
+        return self._t
+
+    def _round_bases(self, tweak: bytes) -> tuple[int, ...]:
+        """Per-round 128-bit values to XOR with b before the AES call.
+
+        The last Q block is ``q_tail || round byte || b``; since it is the
+        only block left after the cached chain, its CBC input is the chain
+        value XOR that block, and everything but ``b`` is fixed per round.
+        """
+        params = self._params
+        chain = self._encrypter._chain(params, self._n, tweak)
+        b_bits = 8 * params.b_bytes
+        prefix = chain.chain ^ (int.from_bytes(chain.q_tail, 'big') << (b_bits + 8))
+        return tuple(prefix ^ (i << b_bits) for i in range(self._encrypter.NUM_ROUNDS))
+
+    def _tweak_bytes(self, tweak: TweakLike) -> bytes:
+        tweak_bytes = self._encrypter._tweak_bytes(tweak)
+        if len(tweak_bytes) != self._t:
+            raise ValueError(
+                f"Tweak length {len(tweak_bytes)} does not match the compiled "
+                f"tweak_length={self._t}"
+            )
+        return tweak_bytes
+
+    def _bases_for(self, tweak_bytes: bytes) -> tuple[int, ...]:
+        if not tweak_bytes:
+            return self._no_tweak_bases
+        bases: Optional[tuple[int, ...]] = self._bases.get(tweak_bytes)
+        if bases is None:
+            bases = self._round_bases(tweak_bytes)
+            self._bases.put(tweak_bytes, bases)
+        return bases
+
+    def _render(self, a: int, b: int) -> str:
+        l = self._l
+        percent = self._percent
+        if percent is not None:
+            return percent % (l, a) + percent % (self._n - l, b) if l else percent % (self._n, b)
+        to_digits = self._encrypter._to_digits
+        return to_digits(a, l) + to_digits(b, self._n - l)
+
+    def _passes_through(self, tweak_bytes: bytes) -> bool:
+        """Whether this call goes to the encrypter rather than the compiled loop."""
+        if not self._compiled:
+            return True
+        mapped = self._encrypter._mapped
+        return bool(mapped) and (self._n, tweak_bytes) in mapped
+
+    def _feistel_str(
+        self, tweak: TweakLike, s: str, decrypt: bool
+    ) -> str:
+        if len(s) != self._n:
+            raise ValueError(
+                f"Message length {len(s)} does not match the compiled length={self._n}"
+            )
+        self._encrypter._check_digits(s)
+        tweak_bytes = self._tweak_bytes(tweak)
+        encrypter = self._encrypter
+        memo = encrypter._memo
+        if memo is None:
+            return self._rounds_str(tweak_bytes, s, decrypt)
+        # Same keys as FFXEncrypter._memo_str, so the two share entries.
+        s = encrypter._canonical(s)
+        result: Optional[str] = memo.get((tweak_bytes, decrypt, s))
+        if result is None:
+            result = self._rounds_str(tweak_bytes, s, decrypt)
+            memo.put((tweak_bytes, decrypt, s), result)
+            memo.put((tweak_bytes, not decrypt, result), s)
+        return result
+
+    def _rounds_str(self, tweak_bytes: bytes, s: str, decrypt: bool) -> str:
+        if self._passes_through(tweak_bytes):
+            return self._encrypter._feistel_str(tweak_bytes, s, decrypt)
+        l = self._l
+        radix = self._radix
+        run = self._inverse if decrypt else self._forward
+        a, b = run(int(s[:l], radix) if l else 0, int(s[l:], radix), self._bases_for(tweak_bytes))
+        return self._render(a, b)
+
+    def _feistel_int(
+        self, tweak: TweakLike, value: int, decrypt: bool
+    ) -> int:
+        if value < 0 or value >= self._domain:
+            raise ValueError(f"Value must be in [0, {self._radix}**{self._n})")
+        tweak_bytes = self._tweak_bytes(tweak)
+        n = self._n
+        memo = self._encrypter._memo
+        if memo is None:
+            return self._rounds_int(tweak_bytes, value, decrypt)
+        result: Optional[int] = memo.get((tweak_bytes, decrypt, n, value))
+        if result is None:
+            result = self._rounds_int(tweak_bytes, value, decrypt)
+            memo.put((tweak_bytes, decrypt, n, value), result)
+            memo.put((tweak_bytes, not decrypt, n, result), value)
+        return result
+
+    def _rounds_int(self, tweak_bytes: bytes, value: int, decrypt: bool) -> int:
+        if self._passes_through(tweak_bytes):
+            return self._encrypter._feistel_int(tweak_bytes, value, self._n, decrypt)
+        split = self._split_mod
+        run = self._inverse if decrypt else self._forward
+        a, b = divmod(value, split)
+        a, b = run(a, b, self._bases_for(tweak_bytes))
+        return a * split + b
+
+    def encrypt(
+        self, tweak: TweakLike, plaintext: FFXInteger
+    ) -> FFXInteger:
+        """Encrypt a plaintext; see :meth:`FFXEncrypter.encrypt`.
+
+        Raises:
+            ValueError: If the message or tweak does not have the compiled length
+        """
+        return FFXInteger(self._feistel_str(tweak, plaintext._x, False), radix=self._radix)
+
+    def decrypt(
+        self, tweak: TweakLike, ciphertext: FFXInteger
+    ) -> FFXInteger:
+        """Decrypt a ciphertext; see :meth:`FFXEncrypter.decrypt`.
+
+        Raises:
+            ValueError: If the message or tweak does not have the compiled length
+        """
+        return FFXInteger(self._feistel_str(tweak, ciphertext._x, True), radix=self._radix)
+
+    def encrypt_str(
+        self, tweak: TweakLike, plaintext: str
+    ) -> str:
+        """Encrypt a plain radix string; see :meth:`FFXEncrypter.encrypt_str`."""
+        return self._feistel_str(tweak, plaintext, False)
+
+    def decrypt_str(
+        self, tweak: TweakLike, ciphertext: str
+    ) -> str:
+        """Decrypt a string produced by :meth:`encrypt_str`."""
+        return self._feistel_str(tweak, ciphertext, True)
+
+    def encrypt_int(self, tweak: TweakLike, value: int) -> int:
+        """Encrypt an integer in ``[0, radix ** length)``.
+
+        Like :meth:`FFXEncrypter.encrypt_int`, with the compiled length.
+        """
+        return self._feistel_int(tweak, value, False)
+
+    def decrypt_int(self, tweak: TweakLike, value: int) -> int:
+        """Decrypt an integer produced by :meth:`encrypt_int`."""
+        return self._feistel_int(tweak, value, True)
@@ -0,0 +1,386 @@
+"""Precomputed lookup tables for small and medium FFX domains."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, Optional, Sequence, Union
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from .calibration import Profile
+    from .encrypter import FFXEncrypter, TweakLike
+
+
+# A table as built (an ``array``) or as mapped from a file (a ``memoryview``
+# cast to the same item type); both index to ints and have ``itemsize``.
+Table = Union[array, memoryview]
+
+
+def _typecode(max_value: int) -> str:
+    """Smallest unsigned ``array`` typecode that can hold ``max_value``."""
+    bits = max_value.bit_length()
+    for code in 'BHILQ':
+        if array(code).itemsize * 8 >= bits:
+            return code
+    raise ValueError(f"{max_value} does not fit in an array item")
+
+
+class Codebook:
+    """Forward and inverse permutation tables for one (n, tweak).
+
+    For a domain of ``radix ** n`` values, ``forward[x]`` is the ciphertext of
+    the message whose integer value is ``x`` and ``inverse`` is its inverse
+    permutation. Both are held in the most compact unsigned ``array`` type
+    that fits the domain, so a 5-digit decimal codebook costs 2 x 400 KB.
+
+    Attributes:
+        forward: ciphertext value for every plaintext value
+        inverse: plaintext value for every ciphertext value
+    """
+
+    __slots__ = ('forward', 'inverse')
+
+    def __init__(self, forward: Table, inverse: Table):
+        self.forward = forward
+        self.inverse = inverse
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the two tables, in bytes."""
+        return (len(self.forward) + len(self.inverse)) * self.forward.itemsize
+
+    @classmethod
+    def build(
+        cls, encrypter: 'FFXEncrypter', n: int, tweak: TweakLike
+    ) -> 'Codebook':
+        """Enumerate the whole ``radix ** n`` domain under ``tweak``.
+
+        Every value is run through the encrypter's lockstep batch round loop,
+        so the tables are identical to per-value :meth:`FFXEncrypter.encrypt`
+        results.
+        """
+        radix = encrypter._radix
+        size = radix ** n
+        split = radix ** (n - n // 2)
+        _, params, chain = encrypter._prepare(n, tweak)
+
+        # Enumerate in chunks of the encrypter's batch size, which bounds the
+        # transient memory of a build without giving up the lockstep rounds.
+        chunk = encrypter._BATCH_CHUNK
+        code = _typecode(size - 1)
+        forward = array(code)
+        for start in range(0, size, chunk):
+            xs = range(start, min(size, start + chunk))
+            A, B = encrypter._encrypt_rows(
+                params,
+                [chain] * len(xs),
+                [x // split for x in xs],
+                [x % split for x in xs],
+            )
+            forward.extend([a * split + b for a, b in zip(A, B)])
+
+        inverse = array(code, bytes(size * forward.itemsize))
+        for x, c in enumerate(forward):
+            inverse[c] = x
+        return cls(forward, inverse)
+
+
+def _round_chunk(
+    encrypter: 'FFXEncrypter', n: int, tweak: TweakLike, i: int, start: int, stop: int
+) -> array:
+    """F(i, b) reduced modulo radix^m for every b in ``[start, stop)``."""
+    _, params, chain = encrypter._prepare(n, tweak)
+    mod = params.mod_even if (i & 1) == 0 else params.mod_odd
+    bs = range(start, stop)
+    ys = encrypter._F_many(params, [chain] * len(bs), i, bs)
+    return array(_typecode(mod - 1), [y % mod for y in ys])
+
+
+# Encrypters rebuilt by executor workers, keyed by (key, radix, backend), so
+# a worker sets one up for its first chunk rather than for every chunk. The
+# cache is per thread, since cipher contexts cannot be shared between threads
+# of a thread pool.
+_worker = threading.local()
+_WORKER_ENCRYPTERS = 8
+
+
+def _worker_encrypter(
+    key: bytes, radix: int, backend: str, profile: Optional['Profile']
+) -> 'FFXEncrypter':
+    """This worker's encrypter for ``(key, radix)``, built on first use.
+
+    The parent's backend and profile are passed in, so the worker neither
+    times the backends nor reads the profile file.
+    """
+    try:
+        encrypters = _worker.encrypters
+    except AttributeError:
+        encrypters = _worker.encrypters = LRUCache(_WORKER_ENCRYPTERS)
+    cache_key = (key, radix, backend)
+    encrypter: Optional[FFXEncrypter] = encrypters.get(cache_key)
+    if encrypter is None:
+        from .calibration import Profile
+        from .encrypter import FFXEncrypter
+
+        encrypter = FFXEncrypter(
+            key, radix, backend=backend, profile=profile if profile is not None else Profile()
+        )
+        encrypters.put(cache_key, encrypter)
+    return encrypter
+
+
+def _round_chunk_task(
+    key: bytes, radix: int, backend: str, profile: Optional['Profile'],
+    n: int, tweak: bytes, i: int, start: int, stop: int,
+) -> bytes:
+    """Picklable wrapper around :func:`_round_chunk` for executor workers.
+
+    Workers use their own encrypter (see :func:`_worker_encrypter`), since
+    AES cipher objects cannot be sent between processes.
+    """
+    encrypter = _worker_encrypter(key, radix, backend, profile)
+    return _round_chunk(encrypter, n, tweak, i, start, stop).tobytes()
+
+
+class RoundTable:
+    """Precomputed round-function outputs for one (n, tweak).
+
+    Even when a whole domain is too large for a :class:`Codebook`, the round
+    function only ever sees ``b`` values below ``radix ** ceil(n / 2)``. For
+    every round ``i``, ``tables[i][b]`` holds ``F(i, b)`` already reduced
+    modulo that round's ``radix ** m``, so a message costs ten lookups and
+    modular adds and no AES calls. A 9-digit SSN needs five tables of 10**5
+    two-byte entries and five of 10**4 four-byte ones, about 1.2 MB.
+
+    Attributes:
+        tables: one compact ``array`` of F outputs per round
+        mods: the modulus applied after each round's add
+        build_seconds: wall-clock time the build took
+    """
+
+    __slots__ = ('tables', 'mods', 'build_seconds')
+
+    def __init__(self, tables: Sequence[Table], mods: tuple[int, ...], build_seconds: float = 0.0):
+        self.tables = tables
+        self.mods = mods
+        self.build_seconds = build_seconds
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the round tables, in bytes."""
+        return sum(len(table) * table.itemsize for table in self.tables)
+
+    @classmethod
+    def build(
+        cls,
+        encrypter: 'FFXEncrypter',
+        n: int,
+        tweak: TweakLike,
+        executor: Optional[Executor] = None,
+    ) -> 'RoundTable':
+        """Evaluate F for every round and every possible ``b``.
+
+        Args:
+            encrypter: Encrypter supplying the key, radix and parameter cache
+            n: Message length in radix digits
+            tweak: Tweak the tables are built for
+            executor: Optional ``concurrent.futures`` executor; when given the
+                rounds are split into chunks and evaluated on its workers
+                (a ``ProcessPoolExecutor`` gives real parallelism)
+
+        Returns:
+            The built tables, with ``build_seconds`` recorded
+        """
+        start_time = time.perf_counter()
+        radix = encrypter._radix
+        l = n // 2
+        _, params, _ = encrypter._prepare(n, tweak)
+        mods = tuple(
+            params.mod_even if (i & 1) == 0 else params.mod_odd
+            for i in range(encrypter.NUM_ROUNDS)
+        )
+
+        # Round i sees b of ceil(n/2) digits on even rounds, floor(n/2) on odd.
+        chunk = encrypter._BATCH_CHUNK
+        jobs: list[tuple[int, int, int]] = []
+        for i in range(encrypter.NUM_ROUNDS):
+            size = radix ** (n - l if (i & 1) == 0 else l)
+            jobs.extend(
+                (i, start, min(size, start + chunk))
+                for start in range(0, size, chunk)
+            )
+
+        tables = [array(_typecode(mod - 1)) for mod in mods]
+        if executor is None:
+            for i, start, stop in jobs:
+                tables[i].extend(_round_chunk(encrypter, n, tweak, i, start, stop))
+        else:
+            tweak_bytes = encrypter._tweak_bytes(tweak)
+            # Chunks only make bulk AES calls, so the bulk backend serves both.
+            backend = encrypter._bulk_backend.name
+            futures = [
+                executor.submit(
+                    _round_chunk_task, encrypter._key, radix, backend, encrypter._profile,
+                    n, tweak_bytes, i, start, stop,
+                )
+                for i, start, stop in jobs
+            ]
+            for (i, _, _), future in zip(jobs, futures):
+                tables[i].frombytes(future.result())
+
+        return cls(tables, mods, time.perf_counter() - start_time)
+
+
+# Table files: a fixed header, one (itemsize, length) entry per table, the
+# tweak, the tables themselves (each 8-byte aligned, native byte order) and
+# an HMAC-SHA256 of everything before it.
+TABLE_FILE_VERSION = 1
+_MAGIC = b'LIBFFXTB'
+_HEADER = struct.Struct('<8sHBBBBHII16s')   # magic, version, kind, radix, byte order, tables, -, n, t, key id
+_ENTRY = struct.Struct('<B7xQ')               # itemsize, length
+_KINDS = {1: Codebook, 2: RoundTable}
+_FORMATS: dict[int, Literal['B', 'H', 'I', 'Q']] = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+_MAC_SIZE = hashlib.sha256().digest_size
+
+
+def _pad8(size: int) -> int:
+    return -size % 8
+
+
+def _file_keys(encrypter: 'FFXEncrypter') -> tuple[bytes, bytes]:
+    """Key identifier stored in a table file, and the key of its HMAC.
+
+    Both are AES images of fixed labels, so a file can only be written,
+    recognized and verified by an encrypter holding the same key.
+    """
+    ecb = encrypter._ecb.encrypt
+    return ecb(b'libffx table id\x00'), ecb(b'libffx table mac')
+
+
+def write_table_file(
+    encrypter: 'FFXEncrypter', path: Union[str, Path], n: int, tweak: bytes,
+    table: Union[Codebook, RoundTable],
+) -> Path:
+    """Write ``table`` for ``(n, tweak)`` to ``path`` (see :meth:`FFXEncrypter.save_table`)."""
+    arrays: list[Table]
+    if isinstance(table, Codebook):
+        kind = 1
+        arrays = [table.forward, table.inverse]
+    else:
+        kind = 2
+        arrays = list(table.tables)
+    key_id, mac_key = _file_keys(encrypter)
+
+    head = _HEADER.pack(
+        _MAGIC, TABLE_FILE_VERSION, kind, encrypter._radix, sys.byteorder == 'big',
+        len(arrays), 0, n, len(tweak), key_id,
+    )
+    head += b''.join(_ENTRY.pack(a.itemsize, len(a)) for a in arrays) + tweak
+    mac = hmac.new(mac_key, digestmod=hashlib.sha256)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        for chunk in [head] + arrays:
+            chunk = memoryview(chunk).cast('B')
+            padded = (chunk, bytes(_pad8(len(chunk))))
+            for part in padded:
+                f.write(part)
+                mac.update(part)
+        f.write(mac.digest())
+    os.replace(tmp, path)
+    return path
+
+
+def map_table_file(
+    encrypter: 'FFXEncrypter', path: Union[str, Path], verify: bool = True
+) -> tuple[int, bytes, Union[Codebook, RoundTable]]:
+    """Map a file written by :func:`write_table_file` read-only.
+
+    The returned table's arrays are ``memoryview`` casts of the mapping, so
+    every process mapping the same file shares one page-cache copy.
+
+    Returns:
+        ``(n, tweak, table)``
+
+    Raises:
+        ValueError: If the file is not a table file for this library version,
+            radix and byte order, was written under another key, or (with
+            ``verify``) fails its integrity check
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    data = memoryview(mapping)
+    arrays: list[memoryview] = []
+    try:
+        if len(data) < _HEADER.size + _MAC_SIZE:
+            raise ValueError(f"{path} is too short to be a table file")
+        magic, version, kind, radix, big_endian, count, _, n, t, key_id = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != TABLE_FILE_VERSION or kind not in _KINDS:
+            raise ValueError(f"{path} is not a version {TABLE_FILE_VERSION} table file")
+        if radix != encrypter._radix or bool(big_endian) != (sys.byteorder == 'big'):
+            raise ValueError(f"{path} holds radix {radix} tables in the other byte order or radix")
+        file_id, mac_key = _file_keys(encrypter)
+        if not hmac.compare_digest(key_id, file_id):
+            raise ValueError(f"{path} was built under another key")
+
+        body = len(data) - _MAC_SIZE
+        if verify:
+            expected = hmac.new(mac_key, data[:body], hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, data[body:]):
+                raise ValueError(f"{path} failed its integrity check")
+
+        # Without verify the header is untrusted: keep every read in the body.
+        offset = _HEADER.size
+        if offset + count * _ENTRY.size + t > body:
+            raise ValueError(f"{path} has a malformed header")
+        entries = [_ENTRY.unpack_from(data, offset + k * _ENTRY.size) for k in range(count)]
+        offset += count * _ENTRY.size
+        tweak = bytes(data[offset:offset + t])
+        offset += t
+        offset += _pad8(offset)
+        for itemsize, length in entries:
+            end = offset + itemsize * length
+            if itemsize not in _FORMATS or end > body:
+                raise ValueError(f"{path} has a malformed table entry")
+            arrays.append(data[offset:end].cast(_FORMATS[itemsize]))
+            offset = end + _pad8(end)
+
+        # Every table holds at least radix ** ceil(n / 2) items and the body
+        # is smaller than 2 ** bit_length, so a larger n is malformed; check
+        # it before raising radix to an untrusted power.
+        if n < 1 or (n if kind == 1 else n - n // 2) > body.bit_length():
+            raise ValueError(f"{path} has a malformed header")
+        if kind == 1:
+            lengths = [radix ** n] * 2
+        else:
+            lengths = [radix ** (n - n // 2 if (i & 1) == 0 else n // 2)
+                       for i in range(encrypter.NUM_ROUNDS)]
+        if [len(a) for a in arrays] != lengths:
+            raise ValueError(f"{path} does not hold the tables for n={n}")
+    except Exception:
+        for view in arrays:
+            view.release()
+        data.release()
+        mapping.close()
+        raise
+
+    if kind == 1:
+        return n, tweak, Codebook(*arrays)
+    params = encrypter._params(n, t)
+    mods = tuple(
+        params.mod_even if (i & 1) == 0 else params.mod_odd
+        for i in range(encrypter.NUM_ROUNDS)
+    )
+    return n, tweak, RoundTable(arrays, mods)
@@ -1,5 +1,10 @@
 """Shared pytest fixtures for FFX tests."""
 
+import os
+
+# Run every test against the built-in thresholds, not this host's saved profile.
+os.environ['FFX_PROFILE'] = ''
+
 import pytest
 import ffx
 
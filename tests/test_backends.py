@@ -0,0 +1,85 @@
+"""Tests for the pluggable AES backends."""
+
+import pytest
+import ffx
+from ffx import FFXEncrypter, FFXInteger, Profile
+from ffx.backends import BACKENDS, available_backends, get_backend, select_backends
+
+
+BACKEND_NAMES = available_backends()
+
+
+def test_pycryptodome_always_available():
+    assert 'pycryptodome' in BACKEND_NAMES
+
+
+@pytest.mark.parametrize('backend', BACKEND_NAMES)
+def test_primitives_match_pycryptodome(standard_key, backend):
+    key = standard_key.to_bytes(16)
+    reference = BACKENDS['pycryptodome']
+    impl = get_backend(backend)
+    data = bytes(range(256)) * 2
+
+    assert impl.ecb(key).encrypt(data) == reference.ecb(key).encrypt(data)
+    out = bytearray(len(data))
+    impl.ecb(key).encrypt(data, output=out)
+    assert bytes(out) == reference.ecb(key).encrypt(data)
+
+    # CBC chains carry over between calls.
+    cbc, ref_cbc = impl.cbc(key), reference.cbc(key)
+    assert [cbc.encrypt(data[:32]), cbc.encrypt(data[32:])] == [ref_cbc.encrypt(data[:32]), ref_cbc.encrypt(data[32:])]
+
+
+@pytest.mark.parametrize('backend', BACKEND_NAMES)
+@pytest.mark.parametrize('n', [16, 100, 300, 2000])
+def test_every_path_matches(standard_key, backend, n):
+    """Scalar, CBC-MAC, extension and mpz paths agree across backends."""
+    key = standard_key.to_bytes(16)
+    reference = FFXEncrypter(key, 10, backend='pycryptodome')
+    encrypter = FFXEncrypter(key, 10, backend=backend)
+    plain = ('31415926535897932384626433832795' * (n // 32 + 1))[:n]
+
+    assert encrypter.encrypt_str('2718281828', plain) == reference.encrypt_str('2718281828', plain)
+
+
+@pytest.mark.parametrize('backend', BACKEND_NAMES)
+def test_shape_encrypter(standard_key, backend):
+    shape = ffx.new(standard_key.to_bytes(16), radix=10, length=10, tweak_length=10, backend=backend)
+
+    assert shape.encrypt_str('9876543210', '0123456789') == '6124200773'
+
+
+class TestSelection:
+    """Backends are chosen without timing, so every process agrees."""
+
+    def test_prefers_openssl(self):
+        expected = 'openssl' if 'openssl' in BACKEND_NAMES else 'pycryptodome'
+
+        assert select_backends() == (expected, expected)
+
+    def test_uses_recorded_backends(self):
+        assert select_backends('pycryptodome') == ('pycryptodome', 'pycryptodome')
+        if 'openssl' in BACKEND_NAMES:
+            assert select_backends('openssl+pycryptodome') == ('openssl', 'pycryptodome')
+
+    def test_ignores_missing_recorded_backends(self):
+        assert select_backends('rot13') == select_backends()
+
+    def test_encrypter_follows_profile(self, standard_key):
+        encrypter = FFXEncrypter(standard_key.to_bytes(16), 10, profile=Profile(backend='pycryptodome'))
+
+        assert encrypter._backend.name == encrypter._bulk_backend.name == 'pycryptodome'
+        assert encrypter._profile is not None
+
+    def test_backend_option_overrides_profile(self, standard_key):
+        encrypter = FFXEncrypter(
+            standard_key.to_bytes(16), 10, profile=Profile(backend='rot13'), backend='pycryptodome'
+        )
+
+        assert encrypter._backend.name == 'pycryptodome'
+        assert encrypter._profile is None
+
+
+def test_unknown_backend(standard_key):
+    with pytest.raises(ValueError):
+        FFXEncrypter(standard_key.to_bytes(16), 10, backend='rot13')
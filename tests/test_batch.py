@@ -0,0 +1,237 @@
+"""Tests for the lockstep batch API (encrypt_many / decrypt_many)."""
+
+import random
+
+import pytest
+import ffx
+from ffx import FFXInteger
+
+
+def _random_ffx(rng, radix, size):
+    return FFXInteger(rng.randrange(1, radix ** size), radix=radix, blocksize=size)
+
+
+class TestEncryptManyMatchesScalar:
+    """Batch results must be identical to the per-message path."""
+
+    @pytest.mark.parametrize('radix,n,t', [
+        (10, 9, 0),      # SSN, no tweak
+        (10, 16, 10),    # credit card
+        (2, 32, 8),      # binary
+        (36, 16, 16),    # multi-block Q
+        (16, 49, 0),     # MAC extension blocks (d + 4 > 16)
+        (10, 64, 10),    # long message
+        (10, 1, 0),      # empty left half
+    ])
+    def test_matches_scalar(self, standard_key, radix, n, t):
+        rng = random.Random(n * 100 + t)
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix)
+        plaintexts = [_random_ffx(rng, radix, n) for _ in range(25)]
+        tweaks = [_random_ffx(rng, radix, t) if t else 0 for _ in range(25)]
+
+        ciphertexts = ffx_obj.encrypt_many(tweaks, plaintexts)
+
+        expected = [ffx_obj.encrypt(tw, p) for tw, p in zip(tweaks, plaintexts)]
+        assert [str(c) for c in ciphertexts] == [str(c) for c in expected]
+        assert ffx_obj.decrypt_many(tweaks, ciphertexts) == plaintexts
+
+    def test_official_vector(self, standard_key):
+        """Vector 1 encrypted as part of a batch."""
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix=10)
+        tweak = FFXInteger('9876543210', radix=10, blocksize=10)
+        plaintexts = [FFXInteger('0123456789', radix=10, blocksize=10)] * 3
+
+        ciphertexts = ffx_obj.encrypt_many(tweak, plaintexts)
+
+        assert [str(c) for c in ciphertexts] == ['6124200773'] * 3
+
+
+class TestTweakBroadcast:
+    """A single tweak is applied to every row."""
+
+    def test_broadcast_matches_per_row(self, decimal_encrypter):
+        tweak = FFXInteger('1234567890', radix=10, blocksize=10)
+        plaintexts = [FFXInteger(str(i), radix=10, blocksize=9) for i in range(10)]
+
+        broadcast = decimal_encrypter.encrypt_many(tweak, plaintexts)
+        per_row = decimal_encrypter.encrypt_many([tweak] * 10, plaintexts)
+
+        assert broadcast == per_row
+
+    def test_zero_tweak_broadcast(self, decimal_encrypter):
+        plaintexts = [FFXInteger('0123456789', radix=10, blocksize=10)]
+
+        assert decimal_encrypter.encrypt_many(0, plaintexts) == [
+            decimal_encrypter.encrypt(0, plaintexts[0])
+        ]
+
+
+class TestBatchValidation:
+    """Malformed batches are rejected."""
+
+    def test_empty_batch(self, decimal_encrypter):
+        assert decimal_encrypter.encrypt_many(0, []) == []
+        assert decimal_encrypter.decrypt_many(0, []) == []
+
+    def test_mixed_message_lengths(self, decimal_encrypter):
+        plaintexts = [
+            FFXInteger('123456789', radix=10, blocksize=9),
+            FFXInteger('1234567890', radix=10, blocksize=10),
+        ]
+        with pytest.raises(ValueError):
+            decimal_encrypter.encrypt_many(0, plaintexts)
+
+    def test_tweak_count_mismatch(self, decimal_encrypter):
+        plaintexts = [FFXInteger('123456789', radix=10, blocksize=9)] * 2
+        with pytest.raises(ValueError):
+            decimal_encrypter.encrypt_many([0], plaintexts)
+
+
+class TestBatchScheduler:
+    """Mixed-shape batches are bucketed by (n, t) and returned in input order."""
+
+    def _mixed_pairs(self):
+        rng = random.Random(7)
+        shapes = [(16, 10), (15, 10), (5, 0), (9, 4), (16, 4)]
+        pairs = []
+        for k in range(40):
+            n, t = shapes[k % len(shapes)]
+            tweak = _random_ffx(rng, 10, t) if t else 0
+            pairs.append((tweak, _random_ffx(rng, 10, n)))
+        return pairs
+
+    def test_matches_scalar_in_input_order(self, decimal_encrypter):
+        pairs = self._mixed_pairs()
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+
+        ciphertexts = scheduler.encrypt(pairs)
+
+        expected = [decimal_encrypter.encrypt(tw, p) for tw, p in pairs]
+        assert [str(c) for c in ciphertexts] == [str(c) for c in expected]
+
+    def test_roundtrip(self, decimal_encrypter):
+        pairs = self._mixed_pairs()
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+
+        ciphertexts = scheduler.encrypt(pairs)
+        plaintexts = scheduler.decrypt(
+            [(tw, c) for (tw, _), c in zip(pairs, ciphertexts)]
+        )
+
+        assert plaintexts == [p for _, p in pairs]
+
+    def test_bucket_sizes_are_observable(self, decimal_encrypter):
+        shared = FFXInteger('1234', radix=10, blocksize=4)
+        pairs = [
+            (shared, FFXInteger('123456789', radix=10, blocksize=9)),
+            (0, FFXInteger('12345', radix=10, blocksize=5)),
+            (shared, FFXInteger('987654321', radix=10, blocksize=9)),
+            (FFXInteger('5678', radix=10, blocksize=4), FFXInteger('111111111', radix=10, blocksize=9)),
+        ]
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+
+        scheduler.encrypt(pairs)
+
+        assert scheduler.last_buckets == {
+            (9, 4): ffx.BucketStats(rows=3, tweaks=2),
+            (5, 0): ffx.BucketStats(rows=1, tweaks=1),
+        }
+
+    def test_empty(self, decimal_encrypter):
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+
+        assert scheduler.encrypt([]) == []
+        assert scheduler.last_buckets == {}
+
+    def test_rejects_non_digits(self, decimal_encrypter):
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            scheduler.encrypt([(0, FFXInteger('12345', radix=10)), (0, FFXInteger(' 1234', radix=10))])
+
+    def test_repeated_pairs_computed_once(self, decimal_encrypter):
+        card = FFXInteger('4111111111111111', radix=10)
+        other = FFXInteger('5500000000000004', radix=10)
+        pairs = [(0, card), (7, card), (0, card), (0, other), (7, card)]
+        scheduler = ffx.BatchScheduler(decimal_encrypter)
+
+        ciphertexts = scheduler.encrypt(pairs)
+
+        assert ciphertexts == [decimal_encrypter.encrypt(tw, p) for tw, p in pairs]
+        assert scheduler.last_buckets[16, 0].rows == 2
+        assert scheduler.last_buckets[16, 1].rows == 1
+
+
+class TestDeduplication:
+    """Repeated rows are computed once and the memo answers earlier results."""
+
+    def test_repeated_rows(self, decimal_encrypter, monkeypatch):
+        plains = [FFXInteger('%09d' % (k % 3), radix=10) for k in range(30)]
+        computed = []
+        run_rows = decimal_encrypter._run_rows
+
+        def counting(tweaks, texts, decrypt):
+            computed.append(len(texts))
+            return run_rows(tweaks, texts, decrypt)
+
+        monkeypatch.setattr(decimal_encrypter, '_run_rows', counting)
+        ciphertexts = decimal_encrypter.encrypt_many(5, plains)
+
+        assert computed == [3]
+        assert ciphertexts == [decimal_encrypter.encrypt(5, p) for p in plains]
+        assert decimal_encrypter.decrypt_many(5, ciphertexts) == plains
+
+    def test_per_row_tweaks_keep_rows_apart(self, decimal_encrypter):
+        plain = FFXInteger('123456789', radix=10)
+        tweaks = [1, 2, 1, 2, 3]
+
+        ciphertexts = decimal_encrypter.encrypt_many(tweaks, [plain] * 5)
+
+        assert ciphertexts == [decimal_encrypter.encrypt(t, plain) for t in tweaks]
+        assert len({str(c) for c in ciphertexts}) == 3
+
+    def test_repeats_keep_shape_checks(self, standard_key):
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix=10, memo_size=100)
+        short = FFXInteger('12345', radix=10)
+        ffx_obj.encrypt(0, short)
+
+        with pytest.raises(ValueError):
+            ffx_obj.encrypt_many(0, [FFXInteger('123456', radix=10), short, short])
+
+
+class TestEncryptRange:
+    """encrypt_range covers a range in order with the same results as encrypt_int."""
+
+    def test_matches_encrypt_int(self, decimal_encrypter):
+        pairs = list(decimal_encrypter.encrypt_range(990, 1010, 6, 'tw', chunk_size=7))
+
+        assert [x for x, _ in pairs] == list(range(990, 1010))
+        assert [c for _, c in pairs] == [decimal_encrypter.encrypt_int('tw', x, 6) for x in range(990, 1010)]
+
+    def test_is_lazy(self, decimal_encrypter):
+        pairs = decimal_encrypter.encrypt_range(0, 10 ** 12, 12, chunk_size=4)
+
+        assert next(pairs) == (0, decimal_encrypter.encrypt_int(0, 0, 12))
+
+    def test_shards_cover_range_once(self, decimal_encrypter):
+        whole = list(decimal_encrypter.encrypt_range(3, 103, 4))
+        shards = [list(decimal_encrypter.encrypt_range(3, 103, 4, shard=(k, 3))) for k in range(3)]
+
+        assert shards[0] + shards[1] + shards[2] == whole
+        assert sorted(c for _, c in whole) == sorted(set(c for _, c in whole))
+
+    def test_uses_tables_and_ff3(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 4)
+        ff3 = ffx.new(standard_key.to_bytes(16), radix=10, mode='ff3-1')
+
+        assert [c for _, c in tabled.encrypt_range(0, 50, 4)] == [tabled.encrypt_int(0, x, 4) for x in range(50)]
+        assert [c for _, c in ff3.encrypt_range(0, 50, 7, 9)] == [ff3.encrypt_int(9, x, 7) for x in range(50)]
+
+    @pytest.mark.parametrize('args,kwargs', [
+        ((5, 4, 3), {}),
+        ((0, 1001, 3), {}),
+        ((0, 10, 3), {'shard': (2, 2)}),
+        ((0, 10, 3), {'chunk_size': 0}),
+    ])
+    def test_rejects_bad_arguments(self, decimal_encrypter, args, kwargs):
+        with pytest.raises(ValueError):
+            decimal_encrypter.encrypt_range(*args, **kwargs)
@@ -0,0 +1,124 @@
+"""Tests for host calibration profiles."""
+
+import json
+
+import pytest
+import ffx
+from ffx import FFXEncrypter, FFXInteger, Profile
+from ffx import calibration
+
+
+@pytest.fixture
+def profile_path(tmp_path, monkeypatch):
+    path = tmp_path / 'profile.json'
+    monkeypatch.setenv('FFX_PROFILE', str(path))
+    return path
+
+
+def _tuned(**fields):
+    return Profile(host=calibration.host_id(), cost_factors={'scalar': 2.0}, **fields)
+
+
+class TestProfileFile:
+
+    def test_round_trip(self, profile_path):
+        profile = _tuned(mac_inline_max_blocks=3, batch_chunk=4096)
+
+        calibration.save_profile(profile)
+
+        assert calibration.load_profile() == profile
+
+    def test_encrypters_load_saved_profile(self, profile_path, standard_key):
+        calibration.save_profile(_tuned(mac_inline_max_blocks=3, batch_chunk=4096))
+        encrypter = ffx.new(standard_key.to_bytes(16), radix=10)
+
+        assert encrypter._MAC_INLINE_MAX_BLOCKS == 3
+        assert encrypter._BATCH_CHUNK == 4096
+        assert encrypter._cost_model.factors['scalar'] == 2.0
+
+    def test_other_host_is_ignored(self, profile_path):
+        calibration.save_profile(_tuned(mac_inline_max_blocks=3)._replace(host='elsewhere'))
+
+        assert calibration.load_profile() is None
+
+    def test_unreadable_file_is_ignored(self, profile_path):
+        profile_path.write_text('{"version": 1, "host": ')
+
+        assert calibration.load_profile() is None
+        assert FFXEncrypter(bytes(16), 10)._MAC_INLINE_MAX_BLOCKS == FFXEncrypter._MAC_INLINE_MAX_BLOCKS
+
+    def test_disabled_by_empty_variable(self, monkeypatch):
+        monkeypatch.setenv('FFX_PROFILE', '')
+
+        assert calibration.load_profile() is None
+        with pytest.raises(ValueError):
+            calibration.save_profile(Profile())
+
+
+@pytest.mark.parametrize('n', [16, 100, 300])
+def test_thresholds_do_not_change_results(standard_key, n):
+    """Every MAC path and chunking gives the same ciphertexts."""
+    key = standard_key.to_bytes(16)
+    default = FFXEncrypter(key, 10, profile=Profile())
+    tuned = FFXEncrypter(key, 10, profile=Profile(mac_inline_max_blocks=8, batch_chunk=7))
+    plains = [FFXInteger(('%010d' % (i * 7919)) * (n // 10) + '1' * (n % 10), radix=10) for i in range(20)]
+
+    assert tuned.encrypt_many(0, plains) == default.encrypt_many(0, plains)
+    assert [tuned.encrypt('123456', p) for p in plains[:3]] == [default.encrypt('123456', p) for p in plains[:3]]
+
+
+def test_calibrate_writes_profile(profile_path, monkeypatch):
+    monkeypatch.setattr(calibration, '_MAX_INLINE_BLOCKS', 3)
+    monkeypatch.setattr(calibration, '_CHUNK_CANDIDATES', (256, 1024))
+    monkeypatch.setattr(calibration, '_CHUNK_ROWS', 2048)
+    monkeypatch.setattr(calibration, '_REPEAT', 1)
+
+    profile = ffx.calibrate()
+
+    assert 1 <= profile.mac_inline_max_blocks <= 3
+    assert profile.batch_chunk in (256, 1024)
+    assert set(profile.cost_factors) == set(ffx.planner.STRATEGIES)
+    assert json.loads(profile_path.read_text())['host'] == calibration.host_id()
+    assert calibration.load_profile() == profile
+    encrypter = ffx.new(bytes(16), 10)
+    assert calibration.backend_id(encrypter._backend.name, encrypter._bulk_backend.name) == profile.backend
+    assert encrypter._profile == profile
+
+
+class TestHostAndBackend:
+
+    def test_host_names_cpu_model_and_aes(self, tmp_path, monkeypatch):
+        cpuinfo = tmp_path / 'cpuinfo'
+        cpuinfo.write_text(
+            'processor\t: 0\nmodel name\t: Example CPU 9000\nflags\t\t: fpu sse2 aes avx2\n'
+        )
+        monkeypatch.setattr(calibration, '_CPUINFO', str(cpuinfo))
+
+        host = calibration.host_id()
+
+        assert 'Example CPU 9000-aes-flags' in host
+        cpuinfo.write_text('model name\t: Example CPU 9000\nflags\t\t: fpu sse2 avx2\n')
+        assert calibration.host_id() != host
+        assert 'Example CPU 9000-noaes-flags' in calibration.host_id()
+
+    def test_host_without_cpuinfo(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(calibration, '_CPUINFO', str(tmp_path / 'missing'))
+        monkeypatch.setattr(calibration.platform, 'processor', lambda: 'example')
+
+        assert '-example-' in calibration.host_id()
+
+    def test_other_backend_is_ignored(self, standard_key):
+        measured = Profile(mac_inline_max_blocks=3, backend='openssl')
+
+        other = FFXEncrypter(standard_key.to_bytes(16), 10, backend='pycryptodome', profile=measured)
+        same = FFXEncrypter(
+            standard_key.to_bytes(16), 10, backend='pycryptodome',
+            profile=measured._replace(backend='pycryptodome'),
+        )
+
+        assert other._MAC_INLINE_MAX_BLOCKS == FFXEncrypter._MAC_INLINE_MAX_BLOCKS
+        assert same._MAC_INLINE_MAX_BLOCKS == 3
+
+    def test_backend_id(self):
+        assert calibration.backend_id('openssl', 'openssl') == 'openssl'
+        assert calibration.backend_id('openssl', 'pycryptodome') == 'openssl+pycryptodome'
@@ -0,0 +1,144 @@
+"""Tests for cycle-walking integer domains."""
+
+import pytest
+import ffx
+from ffx import IntegerDomain, WalkStats
+from ffx.domain import covering_length, covering_radix
+
+
+class TestCoveringShape:
+
+    @pytest.mark.parametrize('size,radix,length', [
+        (256, 16, 2),          # exact: no walking
+        (2 ** 32, 16, 8),      # exact, and the shortest of the power-of-two covers
+        (73049, 5, 7),         # days in 1900..2099: 78125 / 73049
+        (1000, 10, 3),         # exact in decimal
+        (1001, 32, 2),         # 1024: a tighter cover than 10 ** 4
+        (1, 2, 2),             # never fewer than two digits
+    ])
+    def test_tightest_cover(self, size, radix, length):
+        assert covering_radix(size) == radix
+        assert covering_length(radix, size) == length
+
+    def test_expected_walks_bounded(self):
+        # Radix 2 alone keeps the cover below 2 * size; the best radix does better.
+        for size in range(3, 5000, 37):
+            radix = covering_radix(size)
+            assert radix ** covering_length(radix, size) < 2 * size
+
+    def test_small_sizes_walk_more(self):
+        # Two-digit covers: 4 calls for one value, 2 for two.
+        assert [covering_radix(size) ** 2 for size in (1, 2)] == [4, 4]
+        # A minimum domain far above the size costs about min_domain / size.
+        radix = covering_radix(256, min_domain=10 ** 6)
+        assert radix ** covering_length(radix, 256, min_domain=10 ** 6) / 256 > 3900
+
+    def test_min_domain(self):
+        assert covering_length(10, 1000, min_domain=10 ** 6) == 6
+
+
+class TestIntegerDomain:
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 100, 256, 1000, 4099])
+    def test_is_a_permutation(self, standard_key, size):
+        domain = ffx.domain(standard_key.to_bytes(16), size)
+
+        ciphertexts = [domain.encrypt(3, x) for x in range(size)]
+
+        assert sorted(ciphertexts) == list(range(size))
+        assert [domain.decrypt(3, y) for y in ciphertexts] == list(range(size))
+
+    def test_matches_covering_encrypter_when_in_range(self, decimal_encrypter):
+        domain = IntegerDomain(decimal_encrypter, 900)
+
+        for x in range(900):
+            y = decimal_encrypter.encrypt_int(0, x, 3)
+            if y < 900:
+                assert domain.encrypt(0, x) == y
+
+    def test_walks_out_of_the_gap(self, decimal_encrypter):
+        domain = IntegerDomain(decimal_encrypter, 900)
+        # A plaintext whose first encryption lands in [900, 1000).
+        x = next(x for x in range(900) if decimal_encrypter.encrypt_int(0, x, 3) >= 900)
+
+        y = domain.encrypt(0, x)
+
+        assert y < 900
+        assert domain.stats().walks >= 1
+        assert domain.decrypt(0, y) == x
+
+    @pytest.mark.parametrize('size', [300, 73049])
+    def test_batch_matches_scalar(self, standard_key, size):
+        domain = ffx.domain(standard_key.to_bytes(16), size)
+        values = list(range(0, size, max(1, size // 500)))
+
+        ciphertexts = domain.encrypt_many(b'tw', values)
+
+        assert ciphertexts == [domain.encrypt(b'tw', x) for x in values]
+        assert domain.decrypt_many(b'tw', ciphertexts) == values
+        assert domain.encrypt_many(0, []) == []
+
+    def test_tweaks_change_the_permutation(self, standard_key):
+        domain = ffx.domain(standard_key.to_bytes(16), 10 ** 4 + 1)
+
+        assert domain.encrypt_many(1, range(50)) != domain.encrypt_many(2, range(50))
+
+    def test_stats(self, standard_key):
+        domain = ffx.domain(standard_key.to_bytes(16), 600, radix=10)
+
+        assert domain.stats() == WalkStats(0, 0, 0, pytest.approx(1000 / 600 - 1))
+        ciphertexts = domain.encrypt_many(0, range(600))
+        stats = domain.stats()
+
+        # Every value of [600, 1000) sits on a cycle through the range, so the
+        # walks over the whole range add up to exactly the gap.
+        assert stats.calls == 600
+        assert stats.walks == 400
+        assert stats.max_walk >= 1
+        for y in ciphertexts[:20]:
+            domain.decrypt(0, y)
+        assert domain.stats().calls == 620
+
+    @pytest.mark.parametrize('value', [-1, 600])
+    def test_out_of_range(self, standard_key, value):
+        domain = ffx.domain(standard_key.to_bytes(16), 600)
+
+        with pytest.raises(ValueError):
+            domain.encrypt(0, value)
+        with pytest.raises(ValueError):
+            domain.encrypt_many(0, [1, value])
+
+    def test_bad_size(self, standard_key):
+        with pytest.raises(ValueError):
+            ffx.domain(standard_key.to_bytes(16), 0)
+
+    def test_ff3_respects_min_domain(self, standard_key):
+        domain = ffx.domain(standard_key.to_bytes(16), 5000, mode='ff3-1', max_expected_walks=None)
+
+        assert domain.radix ** domain.length >= 10 ** 6
+        assert domain.decrypt(b'\x00' * 7, domain.encrypt(b'\x00' * 7, 4321)) == 4321
+
+    @pytest.mark.parametrize('size', [1, 256, 5000])
+    def test_ff3_rejects_costly_walks(self, standard_key, size):
+        with pytest.raises(ValueError):
+            ffx.domain(standard_key.to_bytes(16), size, mode='ff3-1')
+
+    def test_max_expected_walks(self, standard_key):
+        key = standard_key.to_bytes(16)
+
+        # 10 ** 6 / 10 ** 5: nine extra calls per value is within the default.
+        assert ffx.domain(key, 10 ** 5, mode='ff3-1').stats().expected_walks == pytest.approx(9)
+        assert ffx.domain(key, 1).stats().expected_walks == 3
+        with pytest.raises(ValueError):
+            ffx.domain(key, 10 ** 5, mode='ff3-1', max_expected_walks=8)
+        with pytest.raises(ValueError):
+            ffx.domain(key, 37, radix=36)
+        with pytest.raises(ValueError):
+            ffx.mixed_radix(key, ['0123456789'] * 3, mode='ff3-1')
+        assert ffx.domain(key, 37, radix=36, max_expected_walks=None).length == 2
+
+    def test_repr_and_properties(self, standard_key):
+        domain = ffx.domain(standard_key.to_bytes(16), 73049)
+
+        assert (domain.size, domain.radix, domain.length) == (73049, 5, 7)
+        assert repr(domain) == 'IntegerDomain(size=73049, radix=5, length=7)'
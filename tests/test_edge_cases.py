@@ -5,7 +5,7 @@ Each test references the GitHub issue it validates, where applicable.
 
 import pytest
 import ffx
-from ffx import FFXInteger
+from ffx import FFXEncrypter, FFXInteger
 
 
 class TestLongToBytes:
@@ -144,6 +144,72 @@ class TestLongMessages:
         assert decrypted == plain
 
 
+class TestVeryLongMessages:
+    """Messages long enough to run on gmpy2.mpz halves."""
+
+    @pytest.mark.parametrize('radix,length', [(10, 200), (10, 1500), (36, 700), (2, 4096)])
+    def test_mpz_path_matches_int_path(self, standard_key, radix, length):
+        mpz_obj = ffx.new(standard_key.to_bytes(16), radix)
+        mpz_obj._cost_model.factors['scalar'] = 1e9
+        int_obj = ffx.new(standard_key.to_bytes(16), radix)
+        int_obj._MPZ_MIN_DIGITS = 10 ** 9
+        digits = '0123456789abcdefghijklmnopqrstuvwxyz'[:radix]
+        plain = FFXInteger(''.join(digits[(i * 7 + 3) % radix] for i in range(length)), radix=radix)
+        tweak = FFXInteger(digits[1] * 20, radix=radix, blocksize=20)
+
+        ciphertext = mpz_obj.encrypt(tweak, plain)
+
+        assert str(ciphertext) == str(int_obj.encrypt(tweak, plain))
+        assert str(mpz_obj.decrypt(tweak, ciphertext)) == str(plain)
+
+    def test_beyond_int_string_limit(self, standard_key):
+        """Halves longer than CPython's int/str digit limit still work."""
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix=10)
+        plain = FFXInteger('31415926535' * 2000, radix=10)
+
+        ciphertext = ffx_obj.encrypt(0, plain)
+
+        assert len(ciphertext) == 22000
+        assert ffx_obj.decrypt(0, ciphertext) == plain
+
+
+class TestLongMessageMac:
+    """Multi-block MACs share one persistent CBC cipher per thread.
+
+    The cipher carries its running IV from call to call, so results must not
+    depend on what was MACed before or on which thread runs the call.
+    """
+
+    def _vector(self):
+        key = FFXInteger('0' * 32, radix=16, blocksize=32)
+        return ffx.new(key.to_bytes(16), radix=16), FFXInteger('0' * 48, radix=16, blocksize=48)
+
+    def test_interleaved_lengths(self):
+        ffx_obj, plain = self._vector()
+        for length in (128, 2, 300, 48):
+            ffx_obj.encrypt(0, FFXInteger('7' * length, radix=16, blocksize=length))
+
+        assert str(ffx_obj.encrypt(0, plain)) == 'ddb77d3be91a8e255fca9389a3d48da2b4476919744febea'
+
+    def test_threads(self):
+        import threading
+
+        ffx_obj, plain = self._vector()
+        results = []
+
+        def worker():
+            for _ in range(20):
+                results.append(str(ffx_obj.encrypt(0, plain)))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert set(results) == {'ddb77d3be91a8e255fca9389a3d48da2b4476919744febea'}
+
+
 class TestTweakLengthCacheKey:
     """Reusing one encrypter across tweaks of different lengths.
 
@@ -212,6 +278,23 @@ class TestTweakLengthCacheKey:
         ]:
             assert obj.decrypt(tweak, obj.encrypt(tweak, msg)) == msg
 
+    def test_params_cache_is_bounded(self, standard_key):
+        """Client-chosen lengths cannot grow the (n, t) cache without limit."""
+        obj = ffx.new(standard_key.to_bytes(16), radix=10, params_cache_size=4)
+        reference = self._fresh(standard_key)
+        for n in range(2, 40):
+            msg = FFXInteger('7' * n, radix=10, blocksize=n)
+            assert obj.encrypt(0, msg) == reference.encrypt(0, msg)
+
+        stats = obj.cache_stats()['params']
+        assert stats.entries == 4
+        assert stats.evictions == 34
+        assert 0 < stats.nbytes < 4 * 2000
+
+        msg = FFXInteger('7' * 39, radix=10, blocksize=39)
+        obj.encrypt(0, msg)
+        assert obj.cache_stats()['params'].hits > stats.hits
+
 
 class TestMinimumMessageSize:
     """Tests for minimum message sizes."""
@@ -240,3 +323,121 @@ class TestMinimumMessageSize:
 
         assert len(ciphertext) == 2
         assert decrypted == plain
+
+
+class TestLongTweaks:
+    """Tweaks spanning whole CBC-MAC blocks.
+
+    The chain value after the invariant tweak blocks is cached per (n, tweak)
+    and each round only MACs the final block(s). Expected outputs were
+    produced by the uncached implementation.
+    """
+
+    @pytest.mark.parametrize('radix,tweak,plaintext,expected', [
+        (10, '1' * 40, '0123456789', '8189667609'),
+        (36, 'tqf9j5qdagscspb1' * 5, 'c4xpwulbm3m863jh', '6c1bcytuhyxl2x4w'),
+        (10, '9' * 100, '0' * 64,
+         '5546233926552185784997241180047776624965675245048165114252109284'),
+        (2, '1' * 200, '10' * 20, '0010100001100100111011001101101000011101'),
+    ])
+    def test_long_tweak_vectors(self, standard_key, radix, tweak, plaintext, expected):
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix)
+        tweak_val = FFXInteger(tweak, radix=radix, blocksize=len(tweak))
+        plain = FFXInteger(plaintext, radix=radix, blocksize=len(plaintext))
+
+        ciphertext = ffx_obj.encrypt(tweak_val, plain)
+
+        assert str(ciphertext) == expected
+        assert ffx_obj.decrypt(tweak_val, ciphertext) == plain
+
+    def test_chain_cache_eviction(self, standard_key):
+        """Results are unchanged once cached tweak state has been evicted."""
+        reference = ffx.new(standard_key.to_bytes(16), radix=10)
+        small = ffx.new(standard_key.to_bytes(16), radix=10, chain_cache_size=2)
+        plain = FFXInteger('0123456789', radix=10, blocksize=10)
+        tweaks = [FFXInteger(d * 20, radix=10, blocksize=20) for d in '1231']
+
+        for tweak in tweaks:
+            assert small.encrypt(tweak, plain) == reference.encrypt(tweak, plain)
+        assert len(small._chain_cache) == 2
+
+
+class TestRoundBuffers:
+    """The scalar round loop assembles Q in a reused per-thread buffer.
+
+    Transient memory per call must stay under a fixed bound that does not
+    depend on how many calls are made, and repeated calls must not leave
+    anything behind.
+    """
+
+    @staticmethod
+    def _traced_encrypts(ffx_obj, length, tweak_length):
+        """Growth and peak of traced memory over 200 encrypts, after 200 warm-up calls."""
+        import tracemalloc
+
+        tweak = FFXInteger('1' * tweak_length, radix=10)
+        plain = FFXInteger('7' * length, radix=10)
+        ffx_obj.decrypt(tweak, ffx_obj.encrypt(tweak, plain))
+
+        tracemalloc.start()
+        try:
+            # Warm up under tracing too, so that objects replaced in place
+            # (counters, cost-model state) are traced on both sides.
+            for _ in range(200):
+                ffx_obj.encrypt(tweak, plain)
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            for _ in range(200):
+                ffx_obj.encrypt(tweak, plain)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return current - baseline, peak - baseline
+
+    # The bounds leave room for the AES binding's own per-call objects, which
+    # differ between OpenSSL and pycryptodome's cffi and ctypes bindings.
+    @pytest.mark.parametrize('length,tweak_length,bound', [
+        (16, 10, 1280),    # one-block MAC
+        (40, 40, 1280),    # multi-block MAC through the CBC cipher
+        (70, 4, 1536),     # MAC extension
+    ])
+    def test_allocations_per_encrypt_are_bounded(self, standard_key, length, tweak_length, bound):
+        ffx_obj = FFXEncrypter(standard_key.to_bytes(16), radix=10)
+        # Only the round loop: no call is timed for the cost model.
+        ffx_obj._SAMPLE_INTERVAL = 1 << 62
+
+        grown, peak = self._traced_encrypts(ffx_obj, length, tweak_length)
+
+        assert grown < 256
+        assert peak < bound
+
+    @pytest.mark.parametrize('length,tweak_length', [(16, 10), (40, 40), (70, 4)])
+    def test_allocations_per_sampled_encrypt_are_bounded(self, standard_key, length, tweak_length):
+        ffx_obj = FFXEncrypter(standard_key.to_bytes(16), radix=10)
+        # Every call is timed and folded into the cost model, and a call may
+        # re-plan its shape after the model moves; neither may accumulate.
+        ffx_obj._SAMPLE_INTERVAL = 1
+
+        grown, peak = self._traced_encrypts(ffx_obj, length, tweak_length)
+
+        assert grown < 512
+        assert peak < 2048
+
+    def test_buffer_reused_per_shape(self, decimal_encrypter):
+        params = decimal_encrypter._params(16, 0)
+
+        assert decimal_encrypter._round_buffer(params) is decimal_encrypter._round_buffer(params)
+        assert decimal_encrypter._round_buffer(params) is not decimal_encrypter._round_buffer(
+            decimal_encrypter._params(16, 4)
+        )
+
+    def test_buffer_per_thread(self, decimal_encrypter):
+        import threading
+
+        params = decimal_encrypter._params(16, 0)
+        buffers = []
+        thread = threading.Thread(target=lambda: buffers.append(decimal_encrypter._round_buffer(params)))
+        thread.start()
+        thread.join()
+
+        assert buffers[0] is not decimal_encrypter._round_buffer(params)
@@ -1,5 +1,7 @@
 """Tests for FFX encryption and decryption."""
 
+import json
+
 import pytest
 import ffx
 from ffx import FFXInteger
@@ -104,3 +106,223 @@ class TestFormatPreservation:
 
         assert len(ciphertext) == length
         assert decrypted == plaintext
+
+
+class TestRawEntryPoints:
+    """encrypt_str/encrypt_int agree with the FFXInteger API on every path."""
+
+    @pytest.mark.parametrize('options,length', [
+        ({}, 16),                                   # scalar round loop
+        ({'codebook_threshold': 10 ** 4}, 4),       # codebook
+        ({'round_table_threshold': 10 ** 3}, 6),    # round table
+        ({}, 300),                                  # mpz path
+    ])
+    def test_matches_ffxinteger_api(self, standard_key, options, length):
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix=10, **options)
+        tweak = FFXInteger('9876543210', radix=10)
+        plain = ('0123456789' * 30)[:length]
+
+        expected = str(ffx_obj.encrypt(tweak, FFXInteger(plain, radix=10)))
+
+        assert ffx_obj.encrypt_str(tweak, plain) == expected
+        assert ffx_obj.decrypt_str(tweak, expected) == plain
+        assert ffx_obj.encrypt_int(tweak, int(plain), length) == int(expected)
+        assert ffx_obj.decrypt_int(tweak, int(expected), length) == int(plain)
+
+    def test_string_tweak(self, decimal_encrypter):
+        tweak = FFXInteger('9876543210', radix=10)
+
+        assert decimal_encrypter.encrypt_str('9876543210', '0123456789') == str(
+            decimal_encrypter.encrypt(tweak, FFXInteger('0123456789', radix=10))
+        )
+
+    def test_official_vector(self, decimal_encrypter):
+        assert decimal_encrypter.encrypt_int('9876543210', 123456789, 10) == 6124200773
+
+    @pytest.mark.parametrize('value', [-1, 10 ** 9])
+    def test_int_out_of_range(self, decimal_encrypter, value):
+        with pytest.raises(ValueError):
+            decimal_encrypter.encrypt_int(0, value, 9)
+
+    @pytest.mark.parametrize('text', ['-1234', '+1234', ' 1234', '12_34', '١٢٣٤٥'])
+    def test_rejects_non_digits(self, decimal_encrypter, text):
+        # int() would parse all of these, and the result would not decrypt back.
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            decimal_encrypter.encrypt_str(0, text)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            decimal_encrypter.decrypt_str(0, text)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            decimal_encrypter.encrypt(0, FFXInteger(text, radix=10))
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            decimal_encrypter.encrypt_many(0, [FFXInteger('12345', radix=10), FFXInteger(text, radix=10)])
+
+
+class TestCompiledTweaks:
+    """Tweak handles and raw bytes tweaks give the same results as the raw value."""
+
+    TWEAK = FFXInteger('9876543210', radix=10)
+    PLAIN = FFXInteger('0123456789', radix=10)
+
+    def test_handle_matches_raw_tweak(self, decimal_encrypter):
+        handle = decimal_encrypter.compile_tweak(self.TWEAK, 10)
+
+        ciphertext = decimal_encrypter.encrypt(handle, self.PLAIN)
+
+        assert str(ciphertext) == '6124200773'
+        assert decimal_encrypter.decrypt(handle, ciphertext) == self.PLAIN
+
+    def test_bytes_tweak_matches_string_tweak(self, decimal_encrypter):
+        assert str(decimal_encrypter.encrypt(b'9876543210', self.PLAIN)) == '6124200773'
+        assert decimal_encrypter.compile_tweak(b'9876543210', 10).value == b'9876543210'
+
+    def test_non_ascii_bytes_tweak(self, decimal_encrypter):
+        tweak = bytes(range(250, 256)) + b'\x00'
+
+        ciphertext = decimal_encrypter.encrypt(tweak, self.PLAIN)
+
+        assert decimal_encrypter.decrypt(tweak, ciphertext) == self.PLAIN
+        assert decimal_encrypter.encrypt(tweak.decode('latin-1'), self.PLAIN) == ciphertext
+
+    def test_handle_for_other_length_falls_back(self, decimal_encrypter):
+        handle = decimal_encrypter.compile_tweak(self.TWEAK, 16)
+
+        assert str(decimal_encrypter.encrypt(handle, self.PLAIN)) == '6124200773'
+
+    def test_handle_from_other_encrypter_falls_back(self, decimal_encrypter):
+        other = ffx.new(bytes(16), radix=10)
+        handle = other.compile_tweak(self.TWEAK, 10)
+
+        assert str(decimal_encrypter.encrypt(handle, self.PLAIN)) == '6124200773'
+
+    def test_zero_handle_is_no_tweak(self, decimal_encrypter):
+        handle = decimal_encrypter.compile_tweak(0, 10)
+
+        assert decimal_encrypter.encrypt(handle, self.PLAIN) == decimal_encrypter.encrypt(0, self.PLAIN)
+
+    def test_handle_in_other_entry_points(self, standard_key):
+        ffx_obj = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 4)
+        handle = ffx_obj.compile_tweak(self.TWEAK, 4)
+        plains = [FFXInteger('%04d' % v, radix=10) for v in (1, 20, 300, 4000)]
+        expected = [ffx_obj.encrypt(self.TWEAK, p) for p in plains]
+
+        assert [ffx_obj.encrypt(handle, p) for p in plains] == expected
+        assert ffx_obj.encrypt_many(handle, plains) == expected
+        assert ffx.BatchScheduler(ffx_obj).encrypt([(handle, p) for p in plains]) == expected
+        assert ffx.ShapeEncrypter(ffx_obj, 4, 10).encrypt(handle, plains[0]) == expected[0]
+
+
+class TestParameterPlans:
+    """warm() and exported plans give the same parameters as lazy building."""
+
+    SHAPES = [(10, 10), (16, 6), (300, 8), (9, 0)]
+
+    def test_warm_matches_lazy_build(self, decimal_encrypter, standard_key):
+        assert decimal_encrypter.warm(self.SHAPES) == 4
+        assert decimal_encrypter.warm(self.SHAPES) == 0
+
+        lazy = ffx.new(standard_key.to_bytes(16), radix=10)
+        for n, t in self.SHAPES:
+            assert decimal_encrypter._P_cache.get((n, t)) == lazy._params(n, t)
+        assert str(decimal_encrypter.encrypt(FFXInteger('9876543210', radix=10),
+                                             FFXInteger('0123456789', radix=10))) == '6124200773'
+
+    def test_import_under_another_key(self, decimal_encrypter):
+        decimal_encrypter.warm(self.SHAPES)
+        plan = json.loads(json.dumps(decimal_encrypter.export_params()))
+
+        other = ffx.new(bytes(16), radix=10)
+        assert other.import_params(plan) == 4
+
+        reference = ffx.new(bytes(16), radix=10)
+        for n, t in self.SHAPES:
+            assert other._P_cache.get((n, t)) == reference._params(n, t)
+
+    def test_import_rejects_mismatched_plans(self, decimal_encrypter):
+        decimal_encrypter.warm(self.SHAPES)
+        plan = decimal_encrypter.export_params()
+
+        with pytest.raises(ValueError):
+            ffx.new(bytes(16), radix=16).import_params(plan)
+        with pytest.raises(ValueError):
+            ffx.new(bytes(16), radix=10).import_params(dict(plan, shapes=[[16, 6, 7, 12, 2]]))
+        with pytest.raises(ValueError):
+            ffx.new(bytes(16), radix=10).import_params({'shapes': []})
+
+
+class TestMemo:
+    """The opt-in memo returns the same results and answers both directions."""
+
+    PLAIN = '0123456789'
+    TWEAK = FFXInteger('9876543210', radix=10)
+
+    def _memoized(self, standard_key, **options):
+        return ffx.new(standard_key.to_bytes(16), radix=10, **options)
+
+    def test_disabled_by_default(self, decimal_encrypter):
+        assert 'memo' not in decimal_encrypter.cache_stats()
+
+    def test_encrypt_fills_reverse_entry(self, standard_key):
+        ffx_obj = self._memoized(standard_key, memo_size=100)
+
+        ciphertext = ffx_obj.encrypt_str(self.TWEAK, self.PLAIN)
+        assert ciphertext == '6124200773'
+        assert ffx_obj.decrypt_str(b'9876543210', ciphertext) == self.PLAIN
+        assert ffx_obj.encrypt(self.TWEAK, FFXInteger(self.PLAIN, radix=10)) == FFXInteger(ciphertext, radix=10)
+
+        stats = ffx_obj.cache_stats()['memo']
+        assert (stats.entries, stats.hits, stats.misses) == (2, 2, 1)
+
+    def test_integers_and_batches(self, standard_key):
+        ffx_obj = self._memoized(standard_key, memo_size=100)
+        reference = self._memoized(standard_key)
+
+        value = ffx_obj.encrypt_int(0, 42, 8)
+        assert value == reference.encrypt_int(0, 42, 8)
+        assert ffx_obj.decrypt_int(0, value, 8) == 42
+
+        plains = [FFXInteger('%08d' % k, radix=10) for k in range(10)]
+        expected = reference.encrypt_many(0, plains)
+        assert ffx_obj.encrypt_many(0, plains) == expected
+        assert ffx_obj.decrypt_many(0, expected) == plains
+        assert ffx_obj.cache_stats()['memo'].hits >= 11
+
+    def test_letter_case_does_not_leak_through(self, standard_key):
+        # Radix 16 parses 'ABCDEF01' and 'abcdef01' as the same message.
+        key = standard_key.to_bytes(16)
+        memoized = ffx.new(key, radix=16, memo_size=64)
+        reference = ffx.new(key, radix=16)
+
+        ciphertext = memoized.encrypt_str(0, 'ABCDEF01')
+        assert ciphertext == reference.encrypt_str(0, 'ABCDEF01')
+        assert memoized.decrypt_str(0, ciphertext) == reference.decrypt_str(0, ciphertext) == 'abcdef01'
+
+        plains = [FFXInteger('DEADBEEF', radix=16), FFXInteger('deadbeef', radix=16)]
+        ciphertexts = memoized.encrypt_many(0, plains)
+        assert ciphertexts == reference.encrypt_many(0, plains)
+        assert [c._x for c in memoized.decrypt_many(0, ciphertexts)] == ['deadbeef'] * 2
+        scheduler = ffx.BatchScheduler(memoized)
+        assert [c._x for c in scheduler.decrypt([(0, ciphertexts[0])])] == ['deadbeef']
+
+    @pytest.mark.parametrize('text', [' 1234', '+1234', '١٢٣٤٥'])
+    def test_non_digits_never_reach_the_memo(self, standard_key, text):
+        # Storing the raw string as a reverse entry would make decrypt return
+        # it only while the memo is warm.
+        ffx_obj = self._memoized(standard_key, memo_size=100)
+        shape = ffx.ShapeEncrypter(ffx_obj, 5)
+        for run in (ffx_obj.encrypt_str, ffx_obj.decrypt_str, shape.encrypt_str):
+            with pytest.raises(ValueError, match='radix-10 digits'):
+                run(0, text)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            ffx_obj.encrypt_many(0, [FFXInteger(text, radix=10)] * 2)
+
+        assert ffx_obj.cache_stats()['memo'].entries == 0
+
+    def test_byte_capacity(self, standard_key):
+        ffx_obj = self._memoized(standard_key, memo_bytes=4000)
+        for k in range(100):
+            ffx_obj.encrypt_str(0, '%010d' % k)
+
+        stats = ffx_obj.cache_stats()['memo']
+        assert stats.nbytes <= 4000
+        assert stats.evictions > 0
+        assert ffx_obj.encrypt_str(0, '%010d' % 3) == self._memoized(standard_key).encrypt_str(0, '%010d' % 3)
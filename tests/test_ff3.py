@@ -0,0 +1,210 @@
+"""Tests for the FF3-1 mode (NIST SP 800-38G Rev. 1).
+
+Vectors are the NIST ACVP FF3-1 samples for radix 10 and 26. The radix-26
+samples use the alphabet a-z, translated here to the digits 0-9a-p.
+"""
+
+import pytest
+import ffx
+from ffx import FF3Encrypter, FFXInteger
+from ffx.backends import available_backends
+
+
+# Format: (radix, key, tweak, plaintext, expected_ciphertext)
+ACVP_VECTORS = [
+    # AES-128
+    (10, '2DE79D232DF5585D68CE47882AE256D6', 'CBD09280979564',
+     '3992520240', '8901801106'),
+    (10, '01C63017111438F7FC8E24EB16C71AB5', 'C4E822DCD09F27',
+     '60761757463116869318437658042297305934914824457484538562',
+     '35637144092473838892796702739628394376915177448290847293'),
+    (26, '718385E6542534604419E83CE387A437', 'B6F35084FA90E1',
+     'wfmwlrorcd', 'ywowehycyd'),
+    (26, 'DB602DFF22ED7E84C8D8C865A941A238', 'EBEFD63BCC2083',
+     'kkuomenbzqvggfbteqdyanwpmhzdmoicekiihkrm',
+     'belcfahcwwytwrckieymthabgjjfkxtxauipmjja'),
+    # AES-192
+    (10, 'F62EDB777A671075D47563F3A1E9AC797AA706A2D8E02FC8', '493B8451BF6716',
+     '4406616808', '1807744762'),
+    (10, '0951B475D1A327C52756F2624AF224C80E9BE85F09B2D44F', 'D679E2EA3054E1',
+     '99980459818278359406199791971849884432821321826358606310',
+     '84359031857952748660483617398396641079558152339419110919'),
+    (26, '49CCB8F62D941E5684599ECA0300937B5C766D053E109777', '0BFCF75CDC2FC1',
+     'jaxlrchjjx', 'kjdbfqyahd'),
+    (26, '03D253674A9309FF07ED0E71B24CBFE769025E09FCE544D7', 'B33176B1DA0F6C',
+     'tafzrybuvhiqvcyztuxfnwfprmqlwpayphxbawpl',
+     'loaemzbgqkywkdhmncrijzildzleoqibtthdiliv'),
+    # AES-256
+    (10, '1FAA03EFF55A06F8FAB3F1DC57127D493E2F8F5C365540467A3A055BDBE6481D', '4D67130C030445',
+     '3679409436', '1735794859'),
+    (10, '9CE16E125BD422A011408EB083355E7089E70A4CD2F59E141D0B94A74BCC5967', '4684635BD2C821',
+     '85783290820098255530464619643265070052870796363685134012',
+     '75104723514036464144839960480545848044718729603261409917'),
+    (26, '6187F8BDE99F7DAF9E3EE8A8654308E7E51D31FA88AFFAEB5592041C033B736B', '5820812B3D5DD1',
+     'mkblaoiyfd', 'ifpyiihvvq'),
+    (26, 'F6807FB9688937E4D4956006C8F0CB2394148A5F4B14666CF353F4941428FFD7', '30C87B99890096',
+     'wrammvhudopmaazlsxevzwzwpezzmghwfnmkitnk',
+     'nzftnfkliuctlmtdfrxfhwgevrbcbgljurnytxkj'),
+]
+
+_ALPHABET = str.maketrans('abcdefghijklmnopqrstuvwxyz', '0123456789abcdefghijklmnop')
+
+
+def _digits(radix, text):
+    """A vector's text in this library's digit alphabet."""
+    return text.translate(_ALPHABET) if radix == 26 else text
+
+
+def _vector_ids():
+    return ['aes%d-radix%d-n%d' % (len(key) * 4, radix, len(plain))
+            for radix, key, _, plain, _ in ACVP_VECTORS]
+
+
+@pytest.fixture
+def ff3_decimal():
+    return ffx.new(bytes.fromhex('2DE79D232DF5585D68CE47882AE256D6'), radix=10, mode='ff3-1')
+
+
+class TestACVPVectors:
+
+    @pytest.mark.parametrize('radix,key,tweak,plaintext,expected', ACVP_VECTORS, ids=_vector_ids())
+    def test_encrypt_str(self, radix, key, tweak, plaintext, expected):
+        encrypter = ffx.new(bytes.fromhex(key), radix=radix, mode='ff3-1')
+        tweak = bytes.fromhex(tweak)
+
+        ciphertext = encrypter.encrypt_str(tweak, _digits(radix, plaintext))
+
+        assert ciphertext == _digits(radix, expected)
+        assert encrypter.decrypt_str(tweak, ciphertext) == _digits(radix, plaintext)
+
+    @pytest.mark.parametrize('radix,key,tweak,plaintext,expected', ACVP_VECTORS, ids=_vector_ids())
+    def test_encrypt(self, radix, key, tweak, plaintext, expected):
+        encrypter = ffx.new(bytes.fromhex(key), radix=radix, mode='ff3-1')
+        tweak = int(tweak, 16)
+        plain = FFXInteger(_digits(radix, plaintext), radix=radix)
+
+        ciphertext = encrypter.encrypt(tweak, plain)
+
+        assert ciphertext == FFXInteger(_digits(radix, expected), radix=radix)
+        assert encrypter.decrypt(tweak, ciphertext) == plain
+
+    @pytest.mark.parametrize('backend', available_backends())
+    @pytest.mark.parametrize('radix,key,tweak,plaintext,expected', ACVP_VECTORS[:4])
+    def test_every_backend(self, backend, radix, key, tweak, plaintext, expected):
+        encrypter = ffx.new(bytes.fromhex(key), radix=radix, mode='ff3-1', backend=backend)
+
+        ciphertext = encrypter.encrypt_str(bytes.fromhex(tweak), _digits(radix, plaintext))
+
+        assert ciphertext == _digits(radix, expected)
+
+
+class TestBatch:
+
+    @pytest.mark.parametrize('count', [1, 3, 200])
+    def test_encrypt_many_matches_scalar(self, ff3_decimal, count):
+        tweak = bytes.fromhex('CBD09280979564')
+        plains = [FFXInteger('%011d' % (i * 7919), radix=10) for i in range(count)]
+
+        ciphertexts = ff3_decimal.encrypt_many(tweak, plains)
+
+        assert ciphertexts == [ff3_decimal.encrypt(tweak, p) for p in plains]
+        assert ff3_decimal.decrypt_many(tweak, ciphertexts) == plains
+
+    def test_per_row_tweaks_and_chunking(self, ff3_decimal):
+        ff3_decimal._BATCH_CHUNK = 16
+        tweaks = [i for i in range(50)]
+        plains = [FFXInteger('%08d' % i, radix=10) for i in range(50)]
+
+        ciphertexts = ff3_decimal.encrypt_many(tweaks, plains)
+
+        assert ciphertexts == [ff3_decimal.encrypt(t, p) for t, p in zip(tweaks, plains)]
+        assert ff3_decimal.decrypt_many(tweaks, ciphertexts) == plains
+
+    def test_encrypt_int_round_trip(self, ff3_decimal):
+        ciphertext = ff3_decimal.encrypt_int(7, 123456, 8)
+
+        assert ciphertext == int(ff3_decimal.encrypt_str(7, '00123456'))
+        assert ff3_decimal.decrypt_int(7, ciphertext, 8) == 123456
+
+
+class TestLimits:
+
+    def test_length_limits(self, ff3_decimal):
+        # radix ** n must reach 10 ** 6, and each half fit in 96 bits.
+        with pytest.raises(ValueError):
+            ff3_decimal.encrypt_str(0, '12345')
+        with pytest.raises(ValueError):
+            ff3_decimal.encrypt_str(0, '1' * 57)
+        assert len(ff3_decimal.encrypt_str(0, '1' * 56)) == 56
+
+    def test_binary_minimum_length(self, standard_key):
+        encrypter = ffx.new(standard_key.to_bytes(16), radix=2, mode='ff3-1')
+
+        with pytest.raises(ValueError):
+            encrypter.encrypt_str(0, '1' * 19)
+        assert len(encrypter.encrypt_str(0, '1' * 20)) == 20
+
+    @pytest.mark.parametrize('tweak', [b'\x00' * 8, b'\x00' * 6, 1 << 56, -1])
+    def test_bad_tweak(self, ff3_decimal, tweak):
+        with pytest.raises(ValueError):
+            ff3_decimal.encrypt_str(tweak, '1234567890')
+
+    @pytest.mark.parametrize('text', [' 123456', '-123456', '+123456', '123_456', '١٢٣٤٥٦٧', '123456a'])
+    def test_rejects_non_digits(self, ff3_decimal, text):
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            ff3_decimal.encrypt_str(0, text)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            ff3_decimal.decrypt_str(0, text)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            ff3_decimal.encrypt_many(0, [FFXInteger('7654321', radix=10), FFXInteger(text, radix=10)])
+
+    def test_warm_checks_lengths(self, ff3_decimal):
+        assert ff3_decimal.warm([(10, 7), (56, 7), (10, 0)]) == 2
+        with pytest.raises(ValueError):
+            ff3_decimal.warm([(5, 7)])
+
+    def test_bad_key_length(self):
+        with pytest.raises(ValueError):
+            ffx.new(b'\x00' * 15, radix=10, mode='ff3-1')
+
+    def test_unknown_mode(self, standard_key):
+        with pytest.raises(ValueError):
+            ffx.new(standard_key.to_bytes(16), radix=10, mode='bogus')
+
+    def test_table_options_rejected(self, standard_key):
+        with pytest.raises(TypeError):
+            ffx.new(standard_key.to_bytes(16), radix=10, mode='ff3-1', codebook_threshold=10 ** 6)
+
+
+class TestFFXOnlyFeatures:
+
+    @pytest.mark.parametrize('name', [
+        'codebook', 'round_table', 'compile_tweak', 'explain',
+        'save_table', 'load_table', 'export_params', 'import_params',
+    ])
+    def test_tables_and_planner_absent(self, ff3_decimal, name):
+        assert not hasattr(ff3_decimal, name)
+
+    def test_engines_reject_ff3(self, ff3_decimal):
+        with pytest.raises(ValueError):
+            ffx.ShapeEncrypter(ff3_decimal, 10)
+        with pytest.raises(ValueError):
+            ffx.BatchScheduler(ff3_decimal)
+
+    def test_shares_the_base_api(self, ff3_decimal):
+        assert isinstance(ff3_decimal, ffx.BaseEncrypter)
+        assert not isinstance(ff3_decimal, ffx.FFXEncrypter)
+        assert ff3_decimal.MODE == 'ff3-1'
+
+    def test_cache_stats(self, standard_key):
+        encrypter = ffx.new(
+            standard_key.to_bytes(16), radix=10, mode='ff3-1', round_bases_cache_size=2, memo_size=8
+        )
+
+        for tweak in (1, 2, 3, 3):
+            encrypter.encrypt_str(tweak, '1234567890')
+        stats = encrypter.cache_stats()
+
+        assert set(stats) == {'round_bases', 'memo'}
+        assert stats['round_bases'].entries == 2
+        assert stats['round_bases'].evictions == 1
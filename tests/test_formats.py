@@ -0,0 +1,145 @@
+"""Tests for compiled format masks."""
+
+import pytest
+import ffx
+from ffx import CompiledFormat, MixedRadixEncrypter
+from ffx.formats import slot_alphabets
+
+
+@pytest.fixture
+def key(standard_key):
+    return standard_key.to_bytes(16)
+
+
+class TestMaskParsing:
+
+    def test_slot_alphabets(self):
+        assert slot_alphabets('DD-Ll') == ['0123456789'] * 2 + [
+            'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'
+        ]
+
+    def test_escape_makes_literal(self):
+        assert slot_alphabets(r'\D\\DD') == ['0123456789'] * 2
+
+    @pytest.mark.parametrize('mask', ['', '---', '\\', 'DD\\'])
+    def test_bad_masks(self, key, mask):
+        with pytest.raises(ValueError):
+            ffx.compile_format(mask, key)
+
+
+class TestCompiledFormat:
+
+    def test_matches_bare_encryption(self, key, decimal_encrypter):
+        ssn = ffx.compile_format('DDD-DD-DDDD', key)
+
+        ciphertext = ssn.encrypt(7, '123-45-6789')
+
+        digits = decimal_encrypter.encrypt_str(7, '123456789')
+        assert ciphertext == f'{digits[:3]}-{digits[3:5]}-{digits[5:]}'
+        assert ssn.decrypt(7, ciphertext) == '123-45-6789'
+
+    @pytest.mark.parametrize('mask,text', [
+        ('DDDD DDDD DDDD DDDD', '4111 1111 1111 1111'),
+        ('(DDD) DDD-DDDD', '(555) 123-4567'),
+        ('DDDDDDDDD', '021000021'),             # no literals
+        ('LLL', 'ABC'),                         # letters, translated to radix 26
+        ('hhhh:hhhh', 'dead:beef'),             # power-of-two radix
+        ('XX-XX', 'A1-Z9'),
+        ('%DD%', '%12%'),                       # literal percent signs
+        (r'I\D\D-DDDD', 'IDD-0042'),          # escaped slot characters
+    ])
+    def test_round_trip_keeps_literals(self, key, mask, text):
+        compiled = ffx.compile_format(mask, key)
+
+        ciphertext = compiled.encrypt(0, text)
+
+        assert len(ciphertext) == len(text)
+        assert [c for c in ciphertext if not c.isalnum()] == [c for c in text if not c.isalnum()]
+        assert compiled.decrypt(0, ciphertext) == text
+
+    def test_mixed_alphabets_use_mixed_radix(self, key):
+        plate = ffx.compile_format('D LLL DDD', key)
+
+        ciphertext = plate.encrypt(0, '7 ABC 123')
+
+        assert isinstance(plate.encrypter, MixedRadixEncrypter)
+        assert ciphertext[0].isdigit() and ciphertext[2:5].isupper() and ciphertext[6:].isdigit()
+        assert plate.decrypt(0, ciphertext) == '7 ABC 123'
+
+    @pytest.mark.parametrize('mask,texts', [
+        ('DDD-DD-DDDD', ['%03d-%02d-%04d' % (i, i % 100, i * 7) for i in range(200)]),
+        ('LL-DDD', ['%s%s-%03d' % (chr(65 + i % 26), chr(65 + i % 7), i) for i in range(200)]),
+        ('XXX', ['A1Z', '000', 'ZZZ']),
+    ])
+    def test_batch_matches_scalar(self, key, mask, texts):
+        compiled = ffx.compile_format(mask, key)
+
+        ciphertexts = compiled.encrypt_many(b'tw', texts)
+
+        assert ciphertexts == [compiled.encrypt(b'tw', t) for t in texts]
+        assert compiled.decrypt_many(b'tw', ciphertexts) == texts
+        assert compiled.encrypt_many(b'tw', []) == []
+
+    @pytest.mark.parametrize('text', [
+        '123-45-678',     # too short
+        '123.45-6789',    # wrong literal
+        '12a-45-6789',    # not a digit
+        '1_3-45-6789',    # int() would accept this
+        ' 23-45-6789',
+    ])
+    def test_rejects_mismatched_values(self, key, text):
+        ssn = ffx.compile_format('DDD-DD-DDDD', key)
+
+        with pytest.raises(ValueError):
+            ssn.encrypt(0, text)
+        with pytest.raises(ValueError):
+            ssn.encrypt_many(0, ['000-00-0000', text])
+
+    def test_rejects_wrong_case(self, key):
+        with pytest.raises(ValueError):
+            ffx.compile_format('LLL', key).encrypt(0, 'abc')
+
+    def test_encrypter_must_fit(self, key, decimal_encrypter):
+        with pytest.raises(ValueError):
+            CompiledFormat('LLL', decimal_encrypter)
+        with pytest.raises(ValueError):
+            CompiledFormat('D-L', decimal_encrypter)
+        assert CompiledFormat('DD-DD', decimal_encrypter).encrypt(0, '12-34') != '12-34'
+
+    def test_uniform_encrypter_needs_two_slots(self, decimal_encrypter):
+        with pytest.raises(ValueError):
+            CompiledFormat('D', decimal_encrypter)
+        with pytest.raises(ValueError):
+            CompiledFormat('(D)', decimal_encrypter)
+
+    def test_ff3_mode(self, key):
+        ssn = ffx.compile_format('DDD-DD-DDDD', key, mode='ff3-1')
+
+        assert ssn.decrypt(bytes(7), ssn.encrypt(bytes(7), '123-45-6789')) == '123-45-6789'
+
+    @pytest.mark.parametrize('mask', ['D', 'DDDDD', 'LLLL', 'DD-DD'])
+    def test_ff3_rejects_short_masks(self, key, mask):
+        # radix ** slots must reach FF3-1's minimum domain of 10 ** 6.
+        with pytest.raises(ValueError):
+            ffx.compile_format(mask, key, mode='ff3-1')
+
+    @pytest.mark.parametrize('mask,alphabet', [('D', '0123456789'), ('L', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')])
+    def test_single_slot_is_not_a_shift(self, key, mask, alphabet):
+        compiled = ffx.compile_format(mask, key)
+
+        ciphertexts = [compiled.encrypt(0, c) for c in alphabet]
+
+        assert isinstance(compiled.encrypter, MixedRadixEncrypter)
+        assert sorted(ciphertexts) == list(alphabet)
+        assert ciphertexts != list(alphabet)
+        # A shift by a per-tweak constant keeps the gap between neighbours.
+        shifts = {(alphabet.index(y) - i) % len(alphabet) for i, y in enumerate(ciphertexts)}
+        assert len(shifts) > 1
+        assert compiled.encrypt_many(0, list(alphabet)) == ciphertexts
+        assert [compiled.decrypt(0, y) for y in ciphertexts] == list(alphabet)
+
+    def test_properties(self, key):
+        ssn = ffx.compile_format('DDD-DD-DDDD', key)
+
+        assert (ssn.mask, ssn.length) == ('DDD-DD-DDDD', 11)
+        assert repr(ssn) == "CompiledFormat('DDD-DD-DDDD')"
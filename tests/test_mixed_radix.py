@@ -0,0 +1,92 @@
+"""Tests for mixed-radix record encryption."""
+
+import string
+
+import pytest
+import ffx
+from ffx import MixedRadix, MixedRadixEncrypter
+
+
+LETTER = string.ascii_uppercase
+DIGIT = string.digits
+PLATE = [DIGIT, LETTER, LETTER, LETTER, DIGIT, DIGIT, DIGIT]   # California: 7ABC123
+
+
+class TestMixedRadix:
+
+    def test_rank_round_trip(self):
+        codec = MixedRadix([LETTER, LETTER, DIGIT, DIGIT, DIGIT])
+
+        assert codec.size == 26 * 26 * 1000
+        assert codec.rank('AA000') == 0
+        assert codec.rank('AB012') == 1012
+        assert codec.rank('ZZ999') == codec.size - 1
+        for value in (0, 1, 999, 1000, 12345, codec.size - 1):
+            assert codec.rank(codec.unrank(value)) == value
+
+    def test_rank_follows_alphabet_order(self):
+        codec = MixedRadix(['xyz', '01'])
+
+        assert [codec.unrank(v) for v in range(codec.size)] == ['x0', 'x1', 'y0', 'y1', 'z0', 'z1']
+
+    @pytest.mark.parametrize('text', ['AB12', 'AB0123', 'A1012', 'ab012'])
+    def test_rank_rejects_bad_records(self, text):
+        codec = MixedRadix([LETTER, LETTER, DIGIT, DIGIT, DIGIT])
+
+        with pytest.raises(ValueError):
+            codec.rank(text)
+
+    @pytest.mark.parametrize('value', [-1, 26 * 1000])
+    def test_unrank_range(self, value):
+        with pytest.raises(ValueError):
+            MixedRadix([LETTER, DIGIT, DIGIT, DIGIT]).unrank(value)
+
+    @pytest.mark.parametrize('alphabets', [[], [LETTER, ''], ['aa']])
+    def test_bad_alphabets(self, alphabets):
+        with pytest.raises(ValueError):
+            MixedRadix(alphabets)
+
+
+class TestMixedRadixEncrypter:
+
+    @pytest.fixture
+    def plates(self, standard_key):
+        return ffx.mixed_radix(standard_key.to_bytes(16), PLATE)
+
+    def test_round_trip_preserves_format(self, plates):
+        for plate in ['7ABC123', '0AAA000', '9ZZZ999']:
+            ciphertext = plates.encrypt(0, plate)
+
+            assert ciphertext != plate
+            assert plates.codec.rank(ciphertext) < plates.codec.size
+            assert plates.decrypt(0, ciphertext) == plate
+
+    def test_one_domain_call_per_record(self, plates):
+        plates.encrypt(0, '7ABC123')
+        plates.encrypt(0, '1XYZ789')
+
+        assert plates.stats().calls == 2
+
+    def test_is_a_permutation(self, standard_key):
+        records = ffx.mixed_radix(standard_key.to_bytes(16), ['ab', '012', 'xyz!'])
+        texts = [records.codec.unrank(v) for v in range(records.codec.size)]
+
+        assert sorted(records.encrypt(5, t) for t in texts) == sorted(texts)
+
+    def test_batch_matches_scalar(self, plates):
+        texts = ['%dABC%03d' % (i % 10, i) for i in range(300)]
+
+        ciphertexts = plates.encrypt_many(b'tw', texts)
+
+        assert ciphertexts == [plates.encrypt(b'tw', t) for t in texts]
+        assert plates.decrypt_many(b'tw', ciphertexts) == texts
+
+    def test_fixed_radix(self, standard_key):
+        records = ffx.mixed_radix(standard_key.to_bytes(16), [LETTER, DIGIT, DIGIT], radix=10)
+
+        assert records.domain.radix == 10
+        assert records.decrypt(0, records.encrypt(0, 'Q42')) == 'Q42'
+
+    def test_size_mismatch(self, standard_key):
+        with pytest.raises(ValueError):
+            MixedRadixEncrypter(ffx.domain(standard_key.to_bytes(16), 100), MixedRadix([DIGIT]))
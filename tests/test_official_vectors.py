@@ -160,3 +160,23 @@ class TestVectorDetails:
 
         # FFXInteger may return lowercase, NIST vectors are uppercase
         assert str(ciphertext).upper() == 'C8AQ3U846ZWH6QZP'
+
+
+@pytest.mark.parametrize('backend', ffx.backends.available_backends())
+@pytest.mark.parametrize(
+    'radix,tweak,plaintext,expected,description',
+    OFFICIAL_VECTORS,
+    ids=[v[4] for v in OFFICIAL_VECTORS]
+)
+def test_every_backend(backend, radix, tweak, plaintext, expected, description):
+    """Every installed AES backend reproduces the official vectors."""
+    key = FFXInteger('2b7e151628aed2a6abf7158809cf4f3c', radix=16, blocksize=32)
+    ffx_obj = ffx.new(key.to_bytes(16), radix, backend=backend)
+    plain = FFXInteger(plaintext, radix=radix, blocksize=len(plaintext))
+    tweak_val = 0 if tweak is None else FFXInteger(tweak, radix=radix, blocksize=len(tweak))
+
+    ciphertext = ffx_obj.encrypt(tweak_val, plain)
+
+    assert str(ciphertext).upper() == expected.upper()
+    assert ffx_obj.decrypt(tweak_val, ciphertext) == plain
+    assert ffx_obj.encrypt_many(tweak_val, [plain] * 3) == [ciphertext] * 3
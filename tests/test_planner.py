@@ -0,0 +1,186 @@
+"""Tests for the cost model and strategy dispatch."""
+
+import pytest
+import ffx
+from ffx import FFXEncrypter, FFXInteger
+from ffx.planner import STRATEGIES, CostModel, Plan
+
+
+class TestExplain:
+
+    def test_plan_picks_cheapest_candidate(self, decimal_encrypter):
+        plan = decimal_encrypter.explain(16, 6, batch=10000)
+
+        assert isinstance(plan, Plan)
+        assert plan.strategy == 'batch'
+        assert plan.strategy == min(plan.costs, key=plan.costs.get)
+        assert set(plan.costs) | set(plan.excluded) == set(STRATEGIES)
+        assert 'batch' in str(plan) and 'chosen' in str(plan)
+
+    def test_single_message_runs_scalar(self, decimal_encrypter):
+        plan = decimal_encrypter.explain(16, 6)
+
+        assert plan.strategy == 'scalar'
+        assert plan.mac == 'ecb'
+        assert (plan.round_calls, plan.round_blocks) == (1, 1)
+        assert 'batch' in plan.excluded
+
+    def test_block_counts_follow_the_spec_layout(self, decimal_encrypter):
+        # 300 digits: b is 63 bytes, so Q's tail is 4 blocks (CBC) and d+4 = 68
+        # bytes of MAC need 4 extension blocks.
+        plan = decimal_encrypter.explain(300, 8)
+
+        assert plan.mac == 'cbc'
+        assert (plan.round_calls, plan.round_blocks) == (2, 8)
+
+    def test_tables_only_within_thresholds(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 5)
+
+        assert tabled.explain(5).strategy == 'codebook'
+        assert 'codebook' in tabled.explain(6).excluded
+
+    def test_repetition_amortizes_table_builds(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 5)
+
+        assert tabled.explain(5, repetition=10).strategy == 'scalar'
+        assert tabled.explain(5, repetition=10 ** 7).strategy == 'codebook'
+
+    def test_beyond_int_limit_needs_mpz(self, decimal_encrypter):
+        plan = decimal_encrypter.explain(20000, batch=100)
+
+        assert plan.strategy == 'mpz'
+        assert 'scalar' in plan.excluded and 'batch' in plan.excluded
+
+
+class TestLiveRefinement:
+
+    def test_observation_moves_factor(self):
+        model = CostModel()
+
+        assert not model.observe('scalar', 10.0, 10.5)
+        assert model.observe('scalar', 10.0, 40.0)
+        assert model.factors['scalar'] > 1.1
+        assert model.factors['batch'] == 1.0
+
+    def test_drift_revisits_cached_choices(self, decimal_encrypter):
+        assert decimal_encrypter._strategy(16, 4) == 'batch'
+
+        for _ in range(30):
+            decimal_encrypter._observe('batch', 16, 0, 4, 1.0)
+
+        assert decimal_encrypter._strategy(16, 4) == 'scalar'
+
+
+class TestDispatch:
+    """Every strategy the planner picks gives the same results."""
+
+    @pytest.mark.parametrize('count', [1, 2, 50])
+    def test_encrypt_many_any_size(self, decimal_encrypter, count):
+        tweak = FFXInteger('9876543210', radix=10)
+        plains = [FFXInteger('%016d' % (i * 7919), radix=10) for i in range(count)]
+
+        ciphertexts = decimal_encrypter.encrypt_many(tweak, plains)
+
+        assert ciphertexts == [decimal_encrypter.encrypt(tweak, p) for p in plains]
+        assert decimal_encrypter.decrypt_many(tweak, ciphertexts) == plains
+
+    def test_long_rows_through_batch_apis(self, decimal_encrypter):
+        plains = [FFXInteger(str(d) * 9000, radix=10) for d in (1, 2)]
+
+        ciphertexts = decimal_encrypter.encrypt_many(0, plains)
+        scheduled = ffx.BatchScheduler(decimal_encrypter).encrypt([(0, p) for p in plains])
+
+        assert ciphertexts == scheduled == [decimal_encrypter.encrypt(0, p) for p in plains]
+
+    def test_small_batch_keeps_shape_checks(self, decimal_encrypter):
+        with pytest.raises(ValueError):
+            decimal_encrypter.encrypt_many(
+                [FFXInteger('12', radix=10), FFXInteger('123', radix=10)],
+                [FFXInteger('1234', radix=10)] * 2,
+            )
+
+
+class TestTableAmortization:
+    """Live dispatch only builds a table once the tweak's messages pay for it."""
+
+    def test_distinct_tweaks_do_not_build_codebooks(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 5)
+        plain = ffx.new(standard_key.to_bytes(16), radix=10)
+        tweaks = ['tenant-%02d' % i for i in range(20)]
+
+        ciphertexts = [tabled.encrypt_str(tweak, '12345') for tweak in tweaks * 3]
+
+        assert len(tabled._codebooks) == 0
+        assert ciphertexts == [plain.encrypt_str(tweak, '12345') for tweak in tweaks * 3]
+
+    def test_batches_count_towards_repetition(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, round_table_threshold=10 ** 2)
+        texts = [FFXInteger('%04d' % i, radix=10) for i in range(20)]
+
+        tabled.encrypt_many([b'a', b'b'] * 10, texts)
+        assert len(tabled._round_tables) == 0
+
+        for _ in range(10):
+            tabled.encrypt_many(b'a', texts)
+        assert len(tabled._round_tables) == 1
+
+    def test_plans_follow_tweak_length(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 5)
+
+        tabled.encrypt_str(b'ab', '12345')
+        tabled.encrypt_str(b'abcdef', '12345')
+
+        assert {key[:2] for key, _ in tabled._strategies.items()} == {(5, 2), (5, 6)}
+
+    def test_observe_leaves_params_cache_alone(self, decimal_encrypter):
+        decimal_encrypter._observe('scalar', 12, 0, 1, 1e-5)
+
+        assert decimal_encrypter.cache_stats()['params'].entries == 0
+
+    def test_planning_leaves_params_cache_alone(self, decimal_encrypter):
+        decimal_encrypter.explain(40, 6, batch=8)
+        decimal_encrypter._strategy(12, 1, 4)
+
+        assert decimal_encrypter.cache_stats()['params'].entries == 0
+
+    def test_observe_estimates_the_real_tweak_length(self, decimal_encrypter, monkeypatch):
+        model = decimal_encrypter._cost_model
+        seen = []
+        raw_estimate = model.raw_estimate
+
+        def spy(strategy, encrypter, n, params, batch):
+            seen.append(params.P)
+            return raw_estimate(strategy, encrypter, n, params, batch)
+        monkeypatch.setattr(model, 'raw_estimate', spy)
+
+        decimal_encrypter._observe('scalar', 40, 12, 1, 1e-5)
+
+        assert seen == [decimal_encrypter._shape_params(40, 12).P]
+        assert ('scalar', 40, 12, 1) in decimal_encrypter._raw_estimates
+
+    def test_table_uses_are_bounded(self, standard_key, monkeypatch):
+        monkeypatch.setattr(FFXEncrypter, '_TABLE_USES_SIZE', 4)
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 5)
+
+        for i in range(10):
+            tabled.encrypt_str(b'tenant-%d' % i, '12345')
+        tabled.encrypt_str(b'tenant-9', '12345')
+
+        assert len(tabled._table_uses) == 4
+        assert tabled._table_uses.peek((5, b'tenant-9')) == 2
+        assert tabled._table_uses.peek((5, b'tenant-0')) is None
+
+    def test_plans_are_bounded(self, standard_key, monkeypatch):
+        monkeypatch.setattr(FFXEncrypter, '_PLANS_SIZE', 4)
+        ffx_obj = FFXEncrypter(standard_key.to_bytes(16), radix=10)
+
+        # Observing first, since a timing that moves the model clears the plans.
+        for n in range(20, 30):
+            ffx_obj._observe('scalar', n, 0, 1, 1e-5)
+        for n in range(20, 30):
+            ffx_obj.encrypt_str(0, '7' * n)
+
+        assert len(ffx_obj._strategies) == len(ffx_obj._raw_estimates) == 4
+        assert ffx_obj._strategies.peek((29, 0, 1, None)) is not None
+        assert ffx_obj._strategies.peek((20, 0, 1, None)) is None
+        assert ffx_obj._raw_estimates.peek(('scalar', 20, 0, 1)) is None
@@ -0,0 +1,77 @@
+"""Tests for the power-of-two radix fast path."""
+
+import random
+
+import pytest
+import ffx
+from ffx import FFXEncrypter, FFXInteger, PowerOfTwoEncrypter
+
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+@pytest.mark.parametrize('radix', [2, 4, 8, 16, 32])
+def test_new_selects_power_of_two_encrypter(standard_key, radix):
+    assert isinstance(ffx.new(standard_key.to_bytes(16), radix), PowerOfTwoEncrypter)
+
+
+def test_new_keeps_generic_encrypter_for_other_radices(standard_key):
+    assert type(ffx.new(standard_key.to_bytes(16), 10)) is FFXEncrypter
+
+
+@pytest.mark.parametrize('radix', [2, 4, 8, 16, 32])
+@pytest.mark.parametrize('length', [1, 2, 7, 32, 128, 300])
+def test_matches_generic_encrypter(standard_key, radix, length):
+    rng = random.Random(radix * 1000 + length)
+    generic = FFXEncrypter(standard_key.to_bytes(16), radix)
+    fast = PowerOfTwoEncrypter(standard_key.to_bytes(16), radix)
+    plain = FFXInteger(''.join(rng.choice(DIGITS[:radix]) for _ in range(length)), radix=radix)
+    tweak = FFXInteger(DIGITS[1] * 8, radix=radix, blocksize=8)
+
+    ciphertext = fast.encrypt(tweak, plain)
+
+    assert str(ciphertext) == str(generic.encrypt(tweak, plain))
+    assert str(fast.decrypt(tweak, ciphertext)) == str(plain)
+
+
+class TestRawInputs:
+    """Integer and bytes entry points agree with the FFXInteger API."""
+
+    def test_encrypt_int(self, hex_encrypter):
+        plain = FFXInteger('cafebabe', radix=16, blocksize=8)
+
+        value = hex_encrypter.encrypt_int(0, 0xcafebabe, 8)
+
+        assert value == hex_encrypter.encrypt(0, plain).to_int()
+        assert hex_encrypter.decrypt_int(0, value, 8) == 0xcafebabe
+
+    def test_encrypt_bytes(self, hex_encrypter):
+        data = bytes.fromhex('20010db885a3000000008a2e03707334')
+        plain = FFXInteger(data.hex(), radix=16, blocksize=32)
+
+        encrypted = hex_encrypter.encrypt_bytes(0, data)
+
+        assert encrypted.hex() == str(hex_encrypter.encrypt(0, plain))
+        assert hex_encrypter.decrypt_bytes(0, encrypted) == data
+
+    def test_binary_bytes(self, binary_encrypter):
+        data = b'\x00\x01\x02\x03'
+
+        assert binary_encrypter.decrypt_bytes(0, binary_encrypter.encrypt_bytes(0, data)) == data
+
+    def test_rejects_out_of_range_int(self, hex_encrypter):
+        with pytest.raises(ValueError):
+            hex_encrypter.encrypt_int(0, 0x100, 2)
+
+    def test_rejects_partial_digits(self, zero_key):
+        octal = ffx.new(zero_key.to_bytes(16), radix=8)
+        with pytest.raises(ValueError):
+            octal.encrypt_bytes(0, b'\x01\x02')
+
+    @pytest.mark.parametrize('text', ['1_01', ' 101', '+101', '1012'])
+    def test_rejects_non_digits(self, binary_encrypter, text):
+        with pytest.raises(ValueError, match='radix-2 digits'):
+            binary_encrypter.encrypt_str(0, text)
+
+    def test_accepts_upper_case_digits(self, hex_encrypter):
+        assert hex_encrypter.encrypt_str(0, 'CAFEBABE') == hex_encrypter.encrypt_str(0, 'cafebabe')
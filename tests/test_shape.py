@@ -0,0 +1,151 @@
+"""Tests for the shape-specialized encrypter."""
+
+import random
+
+import pytest
+import ffx
+from ffx import FFXEncrypter, FFXInteger, ShapeEncrypter
+
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _random_digits(rng, radix, size):
+    return ''.join(rng.choice(DIGITS[:radix]) for _ in range(size))
+
+
+@pytest.mark.parametrize('radix,n,t', [
+    (10, 9, 0),      # SSN
+    (10, 16, 6),     # card with a BIN tweak
+    (10, 1, 0),      # empty left half
+    (10, 40, 20),    # widest one-block MAC
+    (10, 70, 4),     # MAC extension: passed through
+    (10, 200, 8),    # mpz path: passed through
+    (16, 32, 8),
+    (36, 12, 16),
+])
+def test_matches_general_encrypter(standard_key, radix, n, t):
+    rng = random.Random(radix * 1000 + n * 10 + t)
+    general = FFXEncrypter(standard_key.to_bytes(16), radix)
+    shape = ffx.new(standard_key.to_bytes(16), radix, length=n, tweak_length=t)
+
+    for _ in range(20):
+        tweak = FFXInteger(DIGITS[1] + _random_digits(rng, radix, t - 1), radix=radix) if t else 0
+        plain = FFXInteger(_random_digits(rng, radix, n), radix=radix)
+
+        ciphertext = shape.encrypt(tweak, plain)
+
+        assert str(ciphertext) == str(general.encrypt(tweak, plain))
+        assert str(shape.decrypt(tweak, ciphertext)) == str(plain)
+
+
+def test_official_vector(standard_key):
+    """Vector 1 through a compiled (10, 10) shape."""
+    shape = ffx.new(standard_key.to_bytes(16), radix=10, length=10, tweak_length=10)
+    tweak = FFXInteger('9876543210', radix=10, blocksize=10)
+
+    assert str(shape.encrypt(tweak, FFXInteger('0123456789', radix=10))) == '6124200773'
+
+
+def test_uses_compiled_loop_for_common_shapes(decimal_encrypter):
+    assert ShapeEncrypter(decimal_encrypter, 16, 6)._compiled
+    assert not ShapeEncrypter(decimal_encrypter, 200, 0)._compiled
+
+
+def test_defers_to_tables(standard_key):
+    encrypter = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 4)
+    shape = ShapeEncrypter(encrypter, 4)
+    plain = FFXInteger('1234', radix=10)
+
+    assert not shape._compiled
+    assert shape.encrypt(0, plain) == FFXEncrypter(standard_key.to_bytes(16), 10).encrypt(0, plain)
+
+
+def test_zero_valued_tweak_means_no_tweak(decimal_encrypter):
+    """As with the general encrypter, a tweak equal to 0 is no tweak."""
+    shape = ShapeEncrypter(decimal_encrypter, 9, 0)
+    plain = FFXInteger('123456789', radix=10)
+
+    assert shape.encrypt(FFXInteger('000', radix=10), plain) == decimal_encrypter.encrypt(0, plain)
+
+
+class TestShapeMismatch:
+
+    def test_wrong_message_length(self, decimal_encrypter):
+        shape = ShapeEncrypter(decimal_encrypter, 9)
+        with pytest.raises(ValueError, match='length=9'):
+            shape.encrypt(0, FFXInteger('1234', radix=10))
+
+    def test_wrong_tweak_length(self, decimal_encrypter):
+        shape = ShapeEncrypter(decimal_encrypter, 9, 4)
+        with pytest.raises(ValueError, match='tweak_length=4'):
+            shape.encrypt(FFXInteger('123', radix=10), FFXInteger('123456789', radix=10))
+
+    def test_missing_tweak(self, decimal_encrypter):
+        shape = ShapeEncrypter(decimal_encrypter, 9, 4)
+        with pytest.raises(ValueError):
+            shape.decrypt(0, FFXInteger('123456789', radix=10))
+
+    def test_tweak_length_without_length(self, standard_key):
+        with pytest.raises(ValueError):
+            ffx.new(standard_key.to_bytes(16), radix=10, tweak_length=4)
+
+    @pytest.mark.parametrize('text', ['-1234', ' 1234', '١٢٣٤٥'])
+    def test_non_digits(self, decimal_encrypter, text):
+        shape = ShapeEncrypter(decimal_encrypter, 5)
+        with pytest.raises(ValueError, match='radix-10 digits'):
+            shape.encrypt_str(0, text)
+
+    def test_invalid_shape(self, decimal_encrypter):
+        with pytest.raises(ValueError):
+            ShapeEncrypter(decimal_encrypter, 0)
+
+
+@pytest.mark.parametrize('n,options', [(16, {}), (4, {'codebook_threshold': 10 ** 4})])
+def test_raw_entry_points(standard_key, n, options):
+    encrypter = ffx.new(standard_key.to_bytes(16), radix=10, **options)
+    shape = ShapeEncrypter(encrypter, n, 6)
+    plain = '4111111111111111'[:n]
+
+    ciphertext = shape.encrypt_str('411111', plain)
+
+    assert ciphertext == encrypter.encrypt_str('411111', plain)
+    assert shape.decrypt_str('411111', ciphertext) == plain
+    assert shape.encrypt_int('411111', int(plain)) == int(ciphertext)
+    assert shape.decrypt_int('411111', int(ciphertext)) == int(plain)
+    with pytest.raises(ValueError):
+        shape.encrypt_int('411111', 10 ** n)
+
+
+class TestEncrypterState:
+    """Table files loaded after construction and the memo are honoured per call."""
+
+    def test_uses_table_loaded_later(self, standard_key, tmp_path):
+        tweak = FFXInteger('1234', radix=10, blocksize=4)
+        path = ffx.new(standard_key.to_bytes(16), radix=10).save_table(
+            tmp_path / 'table.ffx', 6, tweak, 'round_table'
+        )
+        encrypter = ffx.new(standard_key.to_bytes(16), radix=10)
+        shape = ShapeEncrypter(encrypter, 6, 4)
+        expected = shape.encrypt_str(tweak, '123456')
+        encrypter.load_table(path)
+
+        def compiled(*args):
+            raise AssertionError('compiled loop used for a mapped (n, tweak)')
+        shape._forward = shape._inverse = compiled
+
+        assert shape.encrypt_str(tweak, '123456') == expected
+        assert shape.decrypt_int(tweak, int(expected)) == 123456
+        with pytest.raises(AssertionError):
+            shape.encrypt_str('9999', '123456')
+
+    def test_goes_through_memo(self, standard_key):
+        encrypter = ffx.new(standard_key.to_bytes(16), radix=16, memo_size=64)
+        shape = ShapeEncrypter(encrypter, 8)
+
+        ciphertext = shape.encrypt_str(0, 'DEADBEEF')
+        assert encrypter.decrypt_str(0, ciphertext) == 'deadbeef'
+        assert shape.encrypt_int(0, 0xdeadbeef) == int(ciphertext, 16)
+        stats = encrypter.cache_stats()['memo']
+        assert (stats.hits, stats.misses) == (1, 2)
+        assert ciphertext == FFXEncrypter(standard_key.to_bytes(16), 16).encrypt_str(0, 'deadbeef')
@@ -0,0 +1,332 @@
+"""Tests for precomputed lookup tables (codebooks and round tables)."""
+
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import ffx
+from ffx import FFXInteger
+from ffx.cache import LRUCache
+
+
+class TestCodebook:
+    """A codebook must reproduce the scalar network exactly."""
+
+    @pytest.mark.parametrize('radix,n,tweak', [
+        (10, 3, '1234'),
+        (10, 1, None),
+        (2, 8, '01'),
+        (36, 1, None),
+        (16, 3, 'deadbeef'),
+    ])
+    def test_matches_scalar_over_whole_domain(self, standard_key, radix, n, tweak):
+        reference = ffx.new(standard_key.to_bytes(16), radix)
+        tweak_val = FFXInteger(tweak, radix=radix, blocksize=len(tweak)) if tweak else 0
+
+        codebook = reference.codebook(n, tweak_val)
+
+        for x in range(radix ** n):
+            expected = reference.encrypt(tweak_val, FFXInteger(x, radix=radix, blocksize=n))
+            assert codebook.forward[x] == expected.to_int()
+            assert codebook.inverse[codebook.forward[x]] == x
+
+    def test_compact_storage(self, decimal_encrypter):
+        codebook = decimal_encrypter.codebook(2, 0)
+
+        assert codebook.forward.typecode == 'B'
+        assert codebook.nbytes == 200
+
+
+class TestCodebookMode:
+    """encrypt/decrypt use codebooks only for domains under the threshold."""
+
+    def test_lookups_match_scalar(self, standard_key):
+        scalar = ffx.new(standard_key.to_bytes(16), radix=10)
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 4)
+        tweak = FFXInteger('2718281828', radix=10, blocksize=10)
+
+        for value in ('0000', '0042', '9999', '314'):
+            plain = FFXInteger(value, radix=10, blocksize=len(value))
+            cipher = tabled.encrypt(tweak, plain)
+            assert str(cipher) == str(scalar.encrypt(tweak, plain))
+            assert tabled.decrypt(tweak, cipher) == plain
+
+    def test_threshold_limits_domain(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 3)
+
+        for _ in range(2000):
+            tabled.encrypt_str(0, '1234')
+        assert len(tabled._codebooks) == 0
+
+        for _ in range(2000):
+            tabled.encrypt_str(0, '123')
+        assert len(tabled._codebooks) == 1
+
+    def test_not_built_for_a_few_messages(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, codebook_threshold=10 ** 3)
+
+        for _ in range(10):
+            tabled.encrypt_str(0, '123')
+
+        assert len(tabled._codebooks) == 0
+
+    def test_disabled_by_default(self, decimal_encrypter):
+        decimal_encrypter.encrypt(0, FFXInteger('12', radix=10, blocksize=2))
+
+        assert len(decimal_encrypter._codebooks) == 0
+
+    def test_lru_eviction_across_tweaks(self, standard_key):
+        tabled = ffx.new(
+            standard_key.to_bytes(16), radix=10,
+            codebook_threshold=100, codebook_cache_size=2,
+        )
+        tweaks = [FFXInteger(t, radix=10, blocksize=2) for t in ('11', '22', '33')]
+        plain = FFXInteger('42', radix=10, blocksize=2)
+
+        for tweak in tweaks:
+            for _ in range(200):
+                tabled.encrypt(tweak, plain)
+
+        assert len(tabled._codebooks) == 2
+        assert (2, b'11') not in tabled._codebooks
+        assert (2, b'33') in tabled._codebooks
+
+
+class TestRoundTable:
+    """Round-function tables must reproduce the scalar network exactly."""
+
+    @pytest.mark.parametrize('n', [6, 7, 8])
+    def test_matches_scalar(self, standard_key, n):
+        rng = random.Random(n)
+        scalar = ffx.new(standard_key.to_bytes(16), radix=10)
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, round_table_threshold=10 ** 4)
+        tweak = FFXInteger('2718281828', radix=10, blocksize=10)
+
+        tabled.round_table(n, tweak)
+
+        for _ in range(50):
+            plain = FFXInteger(rng.randrange(10 ** n), radix=10, blocksize=n)
+            cipher = tabled.encrypt(tweak, plain)
+            assert str(cipher) == str(scalar.encrypt(tweak, plain))
+            assert tabled.decrypt(tweak, cipher) == plain
+        assert tabled._planned(n, tweak) == 'round_table'
+
+    def test_reports_size_and_build_time(self, decimal_encrypter):
+        table = decimal_encrypter.round_table(5, 0)
+
+        # Even rounds: 10**3 values of b, outputs mod 10**2 (1 byte each).
+        # Odd rounds: 10**2 values of b, outputs mod 10**3 (2 bytes each).
+        assert [len(t) for t in table.tables] == [1000, 100] * 5
+        assert table.nbytes == 5 * 1000 * 1 + 5 * 100 * 2
+        assert table.build_seconds > 0
+
+    def test_parallel_build_matches_serial(self, decimal_encrypter):
+        tweak = FFXInteger('1234', radix=10, blocksize=4)
+        serial = ffx.RoundTable.build(decimal_encrypter, 6, tweak)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            parallel = ffx.RoundTable.build(decimal_encrypter, 6, tweak, executor)
+
+        assert parallel.tables == serial.tables
+
+    def test_executor_build_reuses_worker_encrypter(self, decimal_encrypter, monkeypatch):
+        workers = LRUCache(8)
+        monkeypatch.setattr('ffx.tables._worker', threading.local())
+        tweak = FFXInteger('1234', radix=10, blocksize=4)
+        decimal_encrypter._BATCH_CHUNK = 64
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(setattr, ffx.tables._worker, 'encrypters', workers).result()
+            table = ffx.RoundTable.build(decimal_encrypter, 6, tweak, executor)
+            ffx.RoundTable.build(decimal_encrypter, 6, tweak, executor)
+
+        assert table.tables == ffx.RoundTable.build(decimal_encrypter, 6, tweak).tables
+        assert len(workers) == 1
+        stats = workers.stats()
+        assert stats.hits > stats.misses == 1
+        (_, worker), = workers.items()
+        assert worker._bulk_backend is decimal_encrypter._bulk_backend
+
+    def test_threshold_limits_half_domain(self, standard_key):
+        tabled = ffx.new(standard_key.to_bytes(16), radix=10, round_table_threshold=100)
+
+        for _ in range(200):
+            tabled.encrypt_str(0, '12345')
+        assert len(tabled._round_tables) == 0
+
+        for _ in range(200):
+            tabled.encrypt_str(0, '1234')
+        assert len(tabled._round_tables) == 1
+
+
+class TestTableFiles:
+    """Tables saved to disk are mapped read-only and used under the same key only."""
+
+    TWEAK = FFXInteger('1234', radix=10, blocksize=4)
+
+    def _plain(self, standard_key):
+        return ffx.new(standard_key.to_bytes(16), radix=10)
+
+    @pytest.mark.parametrize('kind,n', [('codebook', 4), ('round_table', 6)])
+    def test_loaded_table_serves_lookups(self, standard_key, tmp_path, kind, n):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', n, self.TWEAK, kind)
+        reference = self._plain(standard_key)
+        plains = [FFXInteger('%0*d' % (n, v), radix=10) for v in (0, 7, 1234, 10 ** n - 1)]
+        expected = [reference.encrypt(self.TWEAK, p) for p in plains]
+
+        worker = self._plain(standard_key)
+        table = worker.load_table(path)
+
+        assert [worker.encrypt(self.TWEAK, p) for p in plains] == expected
+        assert worker.decrypt_many(self.TWEAK, expected) == plains
+        assert worker.encrypt_int(self.TWEAK, 1234, n) == int(str(expected[2]))
+        assert len(worker._codebooks) == len(worker._round_tables) == 0
+        arrays = [table.forward, table.inverse] if kind == 'codebook' else table.tables
+        assert all(isinstance(a, memoryview) and a.readonly for a in arrays)
+
+    def test_scheduler_uses_loaded_table(self, standard_key, tmp_path):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 6, self.TWEAK, 'round_table')
+        worker = self._plain(standard_key)
+        worker.load_table(path)
+        strategies = []
+        run_str = worker._run_str
+
+        def spy(strategy, *args):
+            strategies.append(strategy)
+            return run_str(strategy, *args)
+
+        worker._run_str = spy
+        plain = FFXInteger('123456', radix=10)
+
+        result = ffx.BatchScheduler(worker).encrypt([(self.TWEAK, plain)])
+
+        assert result == [self._plain(standard_key).encrypt(self.TWEAK, plain)]
+        assert strategies == ['round_table']
+
+    @pytest.mark.parametrize('kind,n', [('codebook', 4), ('round_table', 6)])
+    def test_per_row_tweaks_use_loaded_table(self, standard_key, tmp_path, kind, n):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', n, self.TWEAK, kind)
+        worker = self._plain(standard_key)
+        worker.load_table(path)
+        strategies = []
+        run_str = worker._run_str
+
+        def spy(strategy, *args):
+            strategies.append(strategy)
+            return run_str(strategy, *args)
+
+        worker._run_str = spy
+        other = FFXInteger('4321', radix=10)
+        tweaks = [self.TWEAK, other] * 4
+        plains = [FFXInteger('%0*d' % (n, v), radix=10) for v in range(8)]
+        reference = self._plain(standard_key)
+
+        ciphertexts = worker.encrypt_many(tweaks, plains)
+
+        assert ciphertexts == [reference.encrypt(tw, p) for tw, p in zip(tweaks, plains)]
+        assert strategies[:4] == [kind] * 4
+        assert worker.decrypt_many(tweaks, ciphertexts) == plains
+        assert len(worker._codebooks) == len(worker._round_tables) == 0
+
+    def test_other_tweaks_are_unaffected(self, standard_key, tmp_path):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 4, self.TWEAK)
+        worker = self._plain(standard_key)
+        worker.load_table(path)
+        plain = FFXInteger('0042', radix=10)
+
+        assert worker.encrypt(0, plain) == self._plain(standard_key).encrypt(0, plain)
+        assert len(worker._codebooks) == 0
+
+    def test_rejects_other_key_and_radix(self, standard_key, tmp_path):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 4, self.TWEAK)
+
+        with pytest.raises(ValueError, match='another key'):
+            ffx.new(bytes(16), radix=10).load_table(path)
+        with pytest.raises(ValueError):
+            ffx.new(standard_key.to_bytes(16), radix=16).load_table(path)
+
+    def test_integrity_check(self, standard_key, tmp_path):
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 4, self.TWEAK)
+        data = bytearray(path.read_bytes())
+        data[200] ^= 1
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError, match='integrity'):
+            self._plain(standard_key).load_table(path)
+        assert self._plain(standard_key).load_table(path, verify=False) is not None
+
+    def test_unverified_header_stays_in_the_body(self, standard_key, tmp_path):
+        # Only the MAC covers the header's tweak length, and verify=False skips it.
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 4, self.TWEAK)
+        data = bytearray(path.read_bytes())
+        data[20:24] = (1 << 31).to_bytes(4, 'little')
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError, match='malformed header'):
+            self._plain(standard_key).load_table(path, verify=False)
+
+    @pytest.mark.parametrize('kind', ['codebook', 'round_table'])
+    def test_unverified_length_is_bounded(self, standard_key, tmp_path, kind):
+        # radix ** n for this n would take far longer than the size check.
+        path = self._plain(standard_key).save_table(tmp_path / 'table.ffx', 4, self.TWEAK, kind)
+        data = bytearray(path.read_bytes())
+        data[16:20] = (0xFFFFFFFF).to_bytes(4, 'little')
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError, match='malformed header'):
+            self._plain(standard_key).load_table(path, verify=False)
+
+    def test_unknown_kind(self, decimal_encrypter, tmp_path):
+        with pytest.raises(ValueError):
+            decimal_encrypter.save_table(tmp_path / 'table.ffx', 4, 0, 'bogus')
+
+
+class TestLRUCache:
+    """The bounded cache shared by the encrypter's table and parameter caches."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert cache.get('c') == 3
+
+    def test_rejects_zero_capacity(self):
+        with pytest.raises(ValueError):
+            LRUCache(0)
+
+    def test_counters_and_size(self):
+        cache = LRUCache(2, sizeof=len)
+        cache.put('a', b'x' * 10)
+        cache.put('b', b'x' * 20)
+        cache.get('a')
+        cache.get('z')
+        cache.put('c', b'x' * 30)
+        cache.put('c', b'x' * 5)
+
+        stats = cache.stats()
+        assert (stats.entries, stats.hits, stats.misses, stats.evictions) == (2, 1, 1, 1)
+        assert stats.nbytes == 15
+        assert LRUCache(1).stats().nbytes is None
+
+    def test_shared_across_threads(self):
+        cache = LRUCache(8, sizeof=lambda value: 1)
+
+        def churn(seed):
+            rng = random.Random(seed)
+            for _ in range(5000):
+                key = rng.randrange(32)
+                if cache.get(key) is None:
+                    cache.put(key, key)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(churn, range(8)))
+
+        stats = cache.stats()
+        assert stats.entries == len(cache) == 8
+        assert stats.nbytes == 8
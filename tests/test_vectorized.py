@@ -0,0 +1,89 @@
+"""Tests for the NumPy-vectorized engine."""
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import ffx
+from ffx import FFXInteger
+from ffx.vectorized import VectorizedEncrypter
+
+
+@pytest.mark.parametrize('radix,n,t', [
+    (10, 9, 0),      # SSN, no tweak
+    (10, 16, 10),    # credit card
+    (10, 19, 40),    # widest decimal shape, multi-block Q
+    (16, 16, 8),     # domain of exactly 2**64
+    (2, 64, 8),
+    (36, 12, 16),
+    (10, 1, 0),      # empty left half
+])
+def test_matches_scalar(standard_key, radix, n, t):
+    rng = random.Random(n * 100 + t)
+    ffx_obj = ffx.new(standard_key.to_bytes(16), radix)
+    engine = VectorizedEncrypter(ffx_obj, n)
+    tweak = FFXInteger(rng.randrange(1, radix ** t), radix=radix, blocksize=t) if t else 0
+    values = [rng.randrange(radix ** n) for _ in range(50)] + [0, radix ** n - 1]
+
+    ciphertexts = engine.encrypt(tweak, np.array(values, dtype=np.uint64))
+
+    expected = [
+        ffx_obj.encrypt(tweak, FFXInteger(v, radix=radix, blocksize=n)).to_int()
+        for v in values
+    ]
+    assert [int(c) for c in ciphertexts] == expected
+    assert [int(p) for p in engine.decrypt(tweak, ciphertexts)] == values
+
+
+def test_official_vector(standard_key):
+    """Vector 1 through the vectorized engine."""
+    engine = VectorizedEncrypter(ffx.new(standard_key.to_bytes(16), radix=10), 10)
+    tweak = FFXInteger('9876543210', radix=10, blocksize=10)
+
+    ciphertexts = engine.encrypt(tweak, np.array([123456789], dtype=np.uint64))
+
+    assert int(ciphertexts[0]) == 6124200773
+
+
+def test_out_parameter_is_filled_in_place(decimal_encrypter):
+    engine = VectorizedEncrypter(decimal_encrypter, 9)
+    plaintexts = np.arange(12, dtype=np.uint64).reshape(3, 4)
+    out = np.empty_like(plaintexts)
+
+    result = engine.encrypt(0, plaintexts, out=out)
+
+    assert result is out
+    assert result.shape == (3, 4)
+    assert (engine.decrypt(0, out) == plaintexts).all()
+
+
+def test_rejects_wide_domains(decimal_encrypter):
+    with pytest.raises(ValueError):
+        VectorizedEncrypter(decimal_encrypter, 20)
+
+
+def test_rejects_out_of_range_values(decimal_encrypter):
+    engine = VectorizedEncrypter(decimal_encrypter, 4)
+    with pytest.raises(ValueError):
+        engine.encrypt(0, np.array([10000], dtype=np.uint64))
+
+
+def test_rejects_mismatched_out(decimal_encrypter):
+    engine = VectorizedEncrypter(decimal_encrypter, 4)
+    with pytest.raises(ValueError):
+        engine.encrypt(0, np.arange(4, dtype=np.uint64), out=np.empty(3, dtype=np.uint64))
+
+
+@pytest.mark.parametrize('out', [
+    np.empty(3, dtype=np.uint64),
+    np.empty(4, dtype=np.int64),
+    np.empty(8, dtype=np.uint64)[::2],
+])
+def test_rejects_bad_out_before_any_rounds(decimal_encrypter, monkeypatch, out):
+    engine = VectorizedEncrypter(decimal_encrypter, 4)
+    monkeypatch.setattr(decimal_encrypter, '_prepare', pytest.fail)
+
+    with pytest.raises(ValueError):
+        engine.encrypt(0, np.arange(4, dtype=np.uint64), out=out)